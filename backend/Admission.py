@@ -0,0 +1,250 @@
+# Per-session rate limiting and per-endpoint admission control
+
+from __future__ import annotations
+
+import threading
+import time
+import typing
+
+import Metrics
+
+
+class AdmissionRejected(Exception):
+	"""
+	Raised when a request is refused admission
+	"""
+
+	def __init__(self, status: int, retry_after: float = 1):
+		"""
+		Raised when a request is refused admission\n
+		- Constructor -
+		:param status: The HTTP status to respond with (429 for rate limits, 503 for load shedding)
+		:param retry_after: The suggested number of seconds before retrying
+		"""
+
+		super().__init__(f'HTTP/{status}')
+		self.status: int = int(status)
+		self.retry_after: float = float(retry_after)
+
+
+class TokenBucket:
+	"""
+	Token bucket refilled continuously at a fixed rate
+	"""
+
+	def __init__(self, rate: float, burst: float):
+		"""
+		Token bucket refilled continuously at a fixed rate\n
+		- Constructor -
+		:param rate: The number of tokens added per second
+		:param burst: The bucket capacity
+		"""
+
+		self.__rate__: float = float(rate)
+		self.__burst__: float = float(burst)
+		self.__tokens__: float = float(burst)
+		self.__updated__: float = time.monotonic()
+		self.__lock__: threading.Lock = threading.Lock()
+
+	def take(self, count: float = 1) -> float:
+		"""
+		Takes tokens from this bucket if enough are available
+		:param count: The number of tokens to take
+		:return: 0 if the tokens were taken, otherwise the number of seconds until they will be available
+		"""
+
+		with self.__lock__:
+			now: float = time.monotonic()
+			self.__tokens__ = min(self.__burst__, self.__tokens__ + (now - self.__updated__) * self.__rate__)
+			self.__updated__ = now
+
+			if self.__tokens__ >= count:
+				self.__tokens__ -= count
+				return 0
+			else:
+				return (count - self.__tokens__) / self.__rate__
+
+	@property
+	def idle(self) -> float:
+		"""
+		:return: The number of seconds since this bucket was last used
+		"""
+
+		return time.monotonic() - self.__updated__
+
+
+class EndpointPolicy:
+	"""
+	Admission limits applied to a single endpoint
+	"""
+
+	def __init__(self, rate: typing.Optional[float] = None, burst: typing.Optional[float] = None, *, max_concurrent: typing.Optional[int] = None, max_waiting: int = 0, wait_timeout: float = 1, expensive: bool = False):
+		"""
+		Admission limits applied to a single endpoint\n
+		- Constructor -
+		:param rate: The sustained number of requests per second allowed per session or None for no rate limit
+		:param burst: The number of requests a session may make at once (defaults to 'rate', at least 1)
+		:param max_concurrent: The maximum number of requests handled at once across all sessions or None for no cap
+		:param max_waiting: The maximum number of requests waiting for a concurrency slot before new ones are shed
+		:param wait_timeout: The number of seconds a request waits for a concurrency slot before being shed
+		:param expensive: Whether this endpoint is shed when the server as a whole is overloaded
+		"""
+
+		assert rate is None or (isinstance(rate, (int, float)) and rate > 0), 'Invalid rate'
+		assert max_concurrent is None or (isinstance(max_concurrent, int) and max_concurrent > 0), 'Invalid concurrency cap'
+		self.rate: typing.Optional[float] = None if rate is None else float(rate)
+		self.burst: float = max(1.0, float(self.rate or 1) if burst is None else float(burst))
+		self.max_concurrent: typing.Optional[int] = max_concurrent
+		self.max_waiting: int = int(max_waiting)
+		self.wait_timeout: float = float(wait_timeout)
+		self.expensive: bool = bool(expensive)
+
+
+class AdmissionTicket:
+	"""
+	Admission granted to a single request\n
+	Must be released once the request completes (usable as a context manager)
+	"""
+
+	def __init__(self, controller: AdmissionController, slot: typing.Optional[threading.Semaphore]):
+		self.__controller__: AdmissionController = controller
+		self.__slot__: typing.Optional[threading.Semaphore] = slot
+		self.__released__: bool = False
+
+	def __enter__(self) -> AdmissionTicket:
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		self.release()
+
+	def release(self) -> None:
+		"""
+		Releases this admission, freeing its concurrency slot
+		"""
+
+		if self.__released__:
+			return
+
+		self.__released__ = True
+
+		if self.__slot__ is not None:
+			self.__slot__.release()
+
+		self.__controller__.__finish__()
+
+
+class AdmissionController:
+	"""
+	Applies per-session token bucket rate limits and per-endpoint concurrency caps\n
+	Expensive endpoints are shed with 503 once the number of admitted requests reaches the shedding threshold
+	"""
+
+	def __init__(self, policies: dict[str, EndpointPolicy], *, default: typing.Optional[EndpointPolicy] = None, shed_threshold: typing.Optional[int] = None, bucket_ttl: float = 600):
+		"""
+		Applies per-session token bucket rate limits and per-endpoint concurrency caps\n
+		- Constructor -
+		:param policies: The policy for each endpoint route (for example '/chatbot')
+		:param default: The policy for routes not in 'policies' or None for no limits
+		:param shed_threshold: The number of requests in progress at which expensive endpoints are shed or None to never shed
+		:param bucket_ttl: The number of idle seconds after which a session's buckets are dropped
+		"""
+
+		self.__policies__: dict[str, EndpointPolicy] = {f'/{str(route).strip('/\\')}': policy for route, policy in policies.items()}
+		self.__default__: EndpointPolicy = EndpointPolicy() if default is None else default
+		self.__shed_threshold__: typing.Optional[int] = shed_threshold
+		self.__bucket_ttl__: float = float(bucket_ttl)
+		self.__buckets__: dict[tuple[str, typing.Any], TokenBucket] = {}
+		self.__semaphores__: dict[str, threading.Semaphore] = {route: threading.Semaphore(policy.max_concurrent) for route, policy in self.__policies__.items() if policy.max_concurrent is not None}
+		self.__waiting__: dict[str, int] = {}
+		self.__active__: int = 0
+		self.__lock__: threading.Lock = threading.Lock()
+		self.__last_sweep__: float = time.monotonic()
+		self.__rejections__: Metrics.Counter = Metrics.register(Metrics.Counter('api_admission_rejected_total', 'Requests refused by admission control', ('endpoint', 'status')))
+
+	def __finish__(self) -> None:
+		with self.__lock__:
+			self.__active__ -= 1
+
+	def __reject__(self, endpoint: str, status: int, retry_after: float) -> typing.NoReturn:
+		self.__rejections__.inc(endpoint=endpoint, status=status)
+		raise AdmissionRejected(status, retry_after)
+
+	def __sweep__(self, now: float) -> None:
+		if now - self.__last_sweep__ < self.__bucket_ttl__:
+			return
+
+		self.__last_sweep__ = now
+
+		for key, bucket in tuple(self.__buckets__.items()):
+			if bucket.idle > self.__bucket_ttl__:
+				del self.__buckets__[key]
+
+	def policy(self, endpoint: str) -> EndpointPolicy:
+		"""
+		:param endpoint: The endpoint route
+		:return: The policy applied to the endpoint
+		"""
+
+		return self.__policies__.get(endpoint, self.__default__)
+
+	def admit(self, endpoint: str, client: typing.Any) -> AdmissionTicket:
+		"""
+		Admits a request or rejects it quickly
+		:param endpoint: The endpoint route
+		:param client: The key rate limits are tracked under (the session token)
+		:return: The admission ticket, to be released when the request completes
+		:raises AdmissionRejected: If the request is rate limited (429) or shed (503)
+		"""
+
+		policy: EndpointPolicy = self.policy(endpoint)
+
+		if policy.rate is not None:
+			key: tuple[str, typing.Any] = (endpoint, client)
+			bucket: typing.Optional[TokenBucket] = self.__buckets__.get(key)
+
+			if bucket is None:
+				with self.__lock__:
+					self.__sweep__(time.monotonic())
+					bucket = self.__buckets__.setdefault(key, TokenBucket(policy.rate, policy.burst))
+
+			if (wait := bucket.take()) > 0:
+				self.__reject__(endpoint, 429, wait)
+
+		with self.__lock__:
+			if policy.expensive and self.__shed_threshold__ is not None and self.__active__ >= self.__shed_threshold__:
+				shed: bool = True
+			else:
+				shed = False
+				self.__active__ += 1
+
+		if shed:
+			self.__reject__(endpoint, 503, 1)
+
+		slot: typing.Optional[threading.Semaphore] = self.__semaphores__.get(endpoint)
+
+		if slot is not None and not slot.acquire(blocking=False):
+			with self.__lock__:
+				queued: bool = self.__waiting__.get(endpoint, 0) < policy.max_waiting
+
+				if queued:
+					self.__waiting__[endpoint] = self.__waiting__.get(endpoint, 0) + 1
+
+			acquired: bool = queued and slot.acquire(timeout=policy.wait_timeout)
+
+			if queued:
+				with self.__lock__:
+					self.__waiting__[endpoint] -= 1
+
+			if not acquired:
+				self.__finish__()
+				self.__reject__(endpoint, 503, policy.wait_timeout)
+
+		return AdmissionTicket(self, slot)
+
+	@property
+	def active(self) -> int:
+		"""
+		:return: The number of admitted requests in progress
+		"""
+
+		return self.__active__
@@ -0,0 +1,254 @@
+# Local answer cache for repeated chatbot questions
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import math
+import re
+import threading
+import time
+import typing
+
+
+class AnswerCache:
+	"""
+	Bounded, time-limited cache mapping normalized questions to answers\n
+	Lookups try an exact hash match first and fall back to TF-IDF cosine similarity over cached questions\n
+	Intent words ('why', 'how', 'explain', ...) stay in the vectors since they select how an answer is pitched, but only other shared words count towards a fuzzy match's minimum overlap
+	"""
+
+	__WORD: re.Pattern = re.compile(r'[a-z0-9]+')
+	__STRIP: re.Pattern = re.compile(r'[^\w\s]')
+	__STOP_WORDS: frozenset[str] = frozenset((
+		'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'am', 'do', 'does', 'did',
+		'can', 'could', 'would', 'should', 'will', 'you', 'your', 'me', 'my', 'i', 'im', 'we', 'us', 'it', 'its', 'of', 'to', 'in', 'on', 'for',
+		'and', 'or', 'about', 'please', 'tell', 'exactly', 'really', 'just', 'so'
+	))
+	__INTENT_WORDS: frozenset[str] = frozenset((
+		'what', 'whats', 'how', 'why', 'who', 'which', 'when', 'where', 'explain', 'mean', 'means', 'meaning', 'define', 'definition', 'compare', 'difference'
+	))
+
+	class __Entry__:
+		"""
+		INTERNAL CLASS
+		"""
+
+		def __init__(self, question: str, tokens: dict[str, int], answer: str, expires: float):
+			self.question: str = question
+			self.tokens: dict[str, int] = tokens
+			self.answer: str = answer
+			self.expires: float = expires
+
+	def __init__(self, max_entries: int = 1024, ttl: float = 86400, similarity: float = 0.85, max_question_length: int = 200, min_shared: int = 2):
+		"""
+		Bounded, time-limited cache mapping normalized questions to answers\n
+		- Constructor -
+		:param max_entries: The maximum number of cached answers (least recently used are evicted first)
+		:param ttl: The number of seconds an answer stays valid
+		:param similarity: The minimum cosine similarity for a fuzzy match (1 disables fuzzy matching)
+		:param max_question_length: Questions longer than this are never cached
+		:param min_shared: The minimum number of words other than intent words a fuzzy match must share with the cached question
+		"""
+
+		assert isinstance(max_entries, int) and max_entries > 0, 'Invalid cache size'
+		assert isinstance(ttl, (int, float)) and ttl > 0, 'Invalid cache TTL'
+		assert isinstance(similarity, (int, float)) and 0 < similarity <= 1, 'Invalid similarity threshold'
+		assert isinstance(min_shared, int) and min_shared > 0, 'Invalid minimum overlap'
+		self.__entries__: collections.OrderedDict[str, AnswerCache.__Entry__] = collections.OrderedDict()
+		self.__postings__: dict[str, set[str]] = {}
+		self.__lock__: threading.Lock = threading.Lock()
+		self.__max_entries__: int = int(max_entries)
+		self.__ttl__: float = float(ttl)
+		self.__similarity__: float = float(similarity)
+		self.__max_length__: int = int(max_question_length)
+		self.__min_shared__: int = int(min_shared)
+		self.__hits__: int = 0
+		self.__fuzzy_hits__: int = 0
+		self.__misses__: int = 0
+
+	@classmethod
+	def normalize(cls: type[AnswerCache], question: str) -> str:
+		"""
+		Normalizes a question for comparison (case, punctuation and whitespace are ignored)
+		:param question: The raw question
+		:return: The normalized question
+		"""
+
+		return ' '.join(cls.__STRIP.sub('', str(question).lower()).split())
+
+	@classmethod
+	def __tokenize__(cls: type[AnswerCache], normalized: str) -> dict[str, int]:
+		tokens: dict[str, int] = {}
+
+		for word in cls.__WORD.findall(normalized):
+			if word not in cls.__STOP_WORDS:
+				tokens[word] = tokens.get(word, 0) + 1
+
+		return tokens
+
+	@staticmethod
+	def __key__(normalized: str) -> str:
+		return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+	def __idf__(self, token: str) -> float:
+		return math.log((1 + len(self.__entries__)) / (1 + len(self.__postings__.get(token, ())))) + 1
+
+	def __weights__(self, tokens: dict[str, int]) -> dict[str, float]:
+		return {token: count * self.__idf__(token) for token, count in tokens.items()}
+
+	def __remove__(self, key: str) -> None:
+		entry: typing.Optional[AnswerCache.__Entry__] = self.__entries__.pop(key, None)
+
+		if entry is None:
+			return
+
+		for token in entry.tokens:
+			keys: set[str] = self.__postings__.get(token)
+			keys.discard(key)
+
+			if len(keys) == 0:
+				del self.__postings__[token]
+
+	def __fuzzy_match__(self, tokens: dict[str, int], now: float) -> typing.Optional[str]:
+		content: tuple[str, ...] = tuple(token for token in tokens if token not in AnswerCache.__INTENT_WORDS)
+
+		if self.__similarity__ >= 1 or len(content) < self.__min_shared__:
+			return None
+
+		candidates: set[str] = set()
+
+		for token in content:
+			candidates.update(self.__postings__.get(token, ()))
+
+		query: dict[str, float] = self.__weights__(tokens)
+		query_norm: float = math.sqrt(sum(weight * weight for weight in query.values()))
+		best_key: typing.Optional[str] = None
+		best_score: float = self.__similarity__
+
+		for key in candidates:
+			entry: AnswerCache.__Entry__ = self.__entries__[key]
+
+			if entry.expires <= now or sum(token in entry.tokens for token in content) < self.__min_shared__:
+				continue
+
+			weights: dict[str, float] = self.__weights__(entry.tokens)
+			dot: float = sum(weight * weights.get(token, 0) for token, weight in query.items())
+			score: float = dot / (query_norm * math.sqrt(sum(weight * weight for weight in weights.values())))
+
+			if score >= best_score:
+				best_key = key
+				best_score = score
+
+		return best_key
+
+	def lookup(self, question: str) -> typing.Optional[str]:
+		"""
+		Finds a cached answer for the specified question
+		:param question: The raw question
+		:return: The cached answer or None if no valid entry matches
+		"""
+
+		normalized: str = AnswerCache.normalize(question)
+
+		if len(normalized) == 0 or len(normalized) > self.__max_length__:
+			return None
+
+		key: str = AnswerCache.__key__(normalized)
+		now: float = time.monotonic()
+
+		with self.__lock__:
+			entry: typing.Optional[AnswerCache.__Entry__] = self.__entries__.get(key)
+
+			if entry is not None and entry.expires <= now:
+				self.__remove__(key)
+				entry = None
+
+			if entry is None and (fuzzy := self.__fuzzy_match__(AnswerCache.__tokenize__(normalized), now)) is not None:
+				key = fuzzy
+				entry = self.__entries__[fuzzy]
+				self.__fuzzy_hits__ += 1
+
+			if entry is None:
+				self.__misses__ += 1
+				return None
+
+			self.__hits__ += 1
+			self.__entries__.move_to_end(key)
+			return entry.answer
+
+	def store(self, question: str, answer: str) -> None:
+		"""
+		Caches an answer for the specified question
+		:param question: The raw question
+		:param answer: The answer to cache
+		"""
+
+		normalized: str = AnswerCache.normalize(question)
+
+		if len(normalized) == 0 or len(normalized) > self.__max_length__ or not isinstance(answer, str) or len(answer) == 0:
+			return
+
+		key: str = AnswerCache.__key__(normalized)
+		entry: AnswerCache.__Entry__ = AnswerCache.__Entry__(normalized, AnswerCache.__tokenize__(normalized), answer, time.monotonic() + self.__ttl__)
+
+		with self.__lock__:
+			self.__remove__(key)
+			self.__entries__[key] = entry
+
+			for token in entry.tokens:
+				self.__postings__.setdefault(token, set()).add(key)
+
+			while len(self.__entries__) > self.__max_entries__:
+				self.__remove__(next(iter(self.__entries__)))
+
+	def clear(self) -> None:
+		"""
+		Removes all cached answers and resets statistics
+		"""
+
+		with self.__lock__:
+			self.__entries__.clear()
+			self.__postings__.clear()
+			self.__hits__ = 0
+			self.__fuzzy_hits__ = 0
+			self.__misses__ = 0
+
+	def stats(self) -> dict[str, int | float]:
+		"""
+		:return: A snapshot of this cache's size and hit statistics
+		"""
+
+		with self.__lock__:
+			return {
+				'entries': len(self.__entries__),
+				'hits': self.__hits__,
+				'fuzzy_hits': self.__fuzzy_hits__,
+				'misses': self.__misses__,
+				'hit_rate': self.hit_rate
+			}
+
+	@property
+	def hits(self) -> int:
+		"""
+		:return: The number of lookups answered from this cache
+		"""
+
+		return self.__hits__
+
+	@property
+	def misses(self) -> int:
+		"""
+		:return: The number of lookups not answered from this cache
+		"""
+
+		return self.__misses__
+
+	@property
+	def hit_rate(self) -> float:
+		"""
+		:return: The fraction of lookups answered from this cache
+		"""
+
+		total: int = self.__hits__ + self.__misses__
+		return 0 if total == 0 else self.__hits__ / total
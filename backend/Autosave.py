@@ -0,0 +1,193 @@
+# Background checkpointing of modified database sectors
+
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+import traceback
+import typing
+
+import Database
+import Metrics
+
+
+class AutosaveScheduler:
+	"""
+	Periodically saves opened sectors whose unsaved modifications exceed a count or age threshold\n
+	Saves run on a small dedicated pool so request threads never wait on sector I/O
+	"""
+
+	def __init__(self, *, interval: float = 5, max_pending: int = 256, max_age: float = 60, max_concurrent: int = 2):
+		"""
+		Periodically saves opened sectors whose unsaved modifications exceed a count or age threshold\n
+		- Constructor -
+		:param interval: The seconds between threshold checks
+		:param max_pending: The number of pending modifications after which a sector is saved
+		:param max_age: The seconds after which a sector with any pending modification is saved
+		:param max_concurrent: The maximum number of sectors saved at once
+		"""
+
+		assert interval > 0 and max_age > 0, 'Invalid autosave interval'
+		assert isinstance(max_pending, int) and max_pending > 0, 'Invalid autosave modification threshold'
+		assert isinstance(max_concurrent, int) and max_concurrent > 0, 'Invalid autosave concurrency'
+		self.__interval__: float = float(interval)
+		self.__max_pending__: int = int(max_pending)
+		self.__max_age__: float = float(max_age)
+		self.__executor__: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='MyDatabase-autosave')
+		self.__max_concurrent__: int = int(max_concurrent)
+		self.__saving__: set[str] = set()
+		self.__lock__: threading.Lock = threading.Lock()
+		self.__stopped__: threading.Event = threading.Event()
+		self.__thread__: typing.Optional[threading.Thread] = None
+		self.__durations__: Metrics.Timing = Metrics.register(Metrics.Timing('database_autosave_seconds', 'Time taken by background sector saves', ('sector', 'trigger')))
+		self.__failures__: Metrics.Counter = Metrics.register(Metrics.Counter('database_autosave_errors_total', 'Background sector saves raising an error', ('sector',)))
+
+	def __save__(self, name: str, sector: Database.MyDatabase | Database.PartitionedDatabase, trigger: str) -> None:
+		start: float = time.perf_counter()
+
+		try:
+			sector.save()
+		except Exception as e:
+			self.__failures__.inc(sector=name)
+			sys.stderr.write(f'Autosave of sector \'{name}\' failed:\n{''.join(traceback.format_exception(e))}')
+		finally:
+			self.__durations__.observe(time.perf_counter() - start, sector=name, trigger=trigger)
+
+			with self.__lock__:
+				self.__saving__.discard(name)
+
+	def __refresh__(self, name: str, sector: Database.MyDatabase | Database.PartitionedDatabase) -> None:
+		try:
+			sector.refresh()
+		except Exception as e:
+			sys.stderr.write(f'Refresh of sector \'{name}\' failed:\n{''.join(traceback.format_exception(e))}')
+
+	def __run__(self) -> None:
+		# A failed check must not end the thread, or sectors would silently stop being saved
+		while not self.__stopped__.wait(self.__interval__):
+			try:
+				self.check()
+			except Exception as e:
+				sys.stderr.write(f'Autosave check failed:\n{''.join(traceback.format_exception(e))}')
+
+	def check(self) -> list[str]:
+		"""
+		Schedules a save of every sector past a threshold that is not already being saved\n
+		Idle chunks of partitioned sectors and idle sectors released by all their users are evicted on the way,
+		and unmodified sectors are refreshed with changes other processes saved\n
+		Errors while evicting or trimming are written to stderr and do not stop the check
+		:return: The names of the sectors scheduled
+		"""
+
+		scheduled: list[str] = []
+
+		try:
+			Database.MyDatabase.evict()
+		except Exception as e:
+			sys.stderr.write(f'Eviction of idle sectors failed:\n{''.join(traceback.format_exception(e))}')
+
+		for name, sector in Database.MyDatabase.sectors().items():
+			if isinstance(sector, Database.PartitionedDatabase) and not sector.closed:
+				try:
+					sector.trim()
+				except Exception as e:
+					sys.stderr.write(f'Trim of sector \'{name}\' failed:\n{''.join(traceback.format_exception(e))}')
+
+			if sector.closed:
+				continue
+			elif (pending := sector.pending_modifications) == 0:
+				# Sectors with pending modifications catch up with other processes when saved
+				self.__refresh__(name, sector)
+				continue
+			elif pending >= self.__max_pending__:
+				trigger: str = 'pending'
+			elif sector.unsaved_seconds >= self.__max_age__:
+				trigger = 'age'
+			else:
+				continue
+
+			with self.__lock__:
+				if len(self.__saving__) >= self.__max_concurrent__:
+					break
+				elif name in self.__saving__:
+					continue
+
+				self.__saving__.add(name)
+
+			self.__executor__.submit(self.__save__, name, sector, trigger)
+			scheduled.append(name)
+
+		return scheduled
+
+	def start(self) -> None:
+		"""
+		Starts the background check thread
+		"""
+
+		if self.__thread__ is None:
+			self.__thread__ = threading.Thread(target=self.__run__, name='MyDatabase-autosave-scheduler', daemon=True)
+			self.__thread__.start()
+
+	def stop(self) -> None:
+		"""
+		Stops the background check thread and waits for saves in progress
+		"""
+
+		self.__stopped__.set()
+
+		if self.__thread__ is not None:
+			self.__thread__.join()
+
+		self.__executor__.shutdown(wait=True)
+
+	@property
+	def saving(self) -> tuple[str, ...]:
+		"""
+		:return: The names of the sectors currently being saved
+		"""
+
+		with self.__lock__:
+			return tuple(self.__saving__)
+
+
+_SCHEDULER: typing.Optional[AutosaveScheduler] = None
+_SCHEDULER_LOCK: threading.Lock = threading.Lock()
+Metrics.register(Metrics.Gauge('database_pending_modifications', 'Unsaved modifications across opened sectors', function=lambda: sum(sector.pending_modifications for sector in Database.MyDatabase.sectors().values() if not sector.closed)))
+
+
+def start() -> typing.Optional[AutosaveScheduler]:
+	"""
+	Starts the shared scheduler from the environment if not already running\n
+	'DATABASE_AUTOSAVE' set to 'off' disables it; 'DATABASE_AUTOSAVE_INTERVAL', 'DATABASE_AUTOSAVE_PENDING', 'DATABASE_AUTOSAVE_AGE' and 'DATABASE_AUTOSAVE_WORKERS' size it
+	:return: The shared scheduler or None if disabled
+	"""
+
+	global _SCHEDULER
+
+	with _SCHEDULER_LOCK:
+		if _SCHEDULER is None and os.getenv('DATABASE_AUTOSAVE', 'on').lower() != 'off':
+			_SCHEDULER = AutosaveScheduler(
+				interval=float(os.getenv('DATABASE_AUTOSAVE_INTERVAL', '5')),
+				max_pending=int(os.getenv('DATABASE_AUTOSAVE_PENDING', '256')),
+				max_age=float(os.getenv('DATABASE_AUTOSAVE_AGE', '60')),
+				max_concurrent=int(os.getenv('DATABASE_AUTOSAVE_WORKERS', '2'))
+			)
+			_SCHEDULER.start()
+
+		return _SCHEDULER
+
+
+def shutdown() -> None:
+	"""
+	Stops the shared scheduler if it was started
+	"""
+
+	global _SCHEDULER
+
+	with _SCHEDULER_LOCK:
+		if _SCHEDULER is not None:
+			_SCHEDULER.stop()
+			_SCHEDULER = None
@@ -1,7 +1,11 @@
 import os
+import typing
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+import AnswerCache
+import Gateway
+import Metrics
 
 load_dotenv()
 
@@ -30,12 +34,17 @@ class ChatBot:
     This app teaches investing through paper trading, charts, market data, and AI tutoring for students.
     """
 
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY is missing. Check your .env file.")
+    # Shared by every session; only first-turn questions are cached since later turns depend on history
+    answer_cache = AnswerCache.AnswerCache(
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+        similarity=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.85")),
+        min_shared=int(os.getenv("ANSWER_CACHE_MIN_SHARED", "2")),
+    )
 
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self):
+        # Upstream calls go through the shared, concurrency-limited gateway
+        self.gateway = Gateway.instance()
         self.model = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
         self.history = []
 
@@ -43,10 +52,17 @@ class ChatBot:
         """
         Main method the backend calls.
         Takes user input, sends the full chat history, and returns plain text.
+        Raises Gateway.GatewayBusyError when the gateway queue is full.
         """
         if not user_input or not user_input.strip():
             return "Please type a message so I can help."
 
+        first_turn = not self.history
+
+        if first_turn and (cached := self.answer_cache.lookup(user_input)) is not None:
+            self._append_history(user_input, cached)
+            return cached
+
         input_messages = [
             *self.history,
             {
@@ -55,19 +71,63 @@ class ChatBot:
             },
         ]
 
-        response = self.client.responses.create(
-            model=self.model,
-            instructions=self.system_instruction,
-            input=input_messages,
-        )
-        model_response = (response.output_text or "").strip()
+        with Metrics.upstream("openai"):
+            model_response = self.gateway.complete(self.model, self.system_instruction, input_messages).strip()
 
         if not model_response:
             model_response = "I'm sorry, I couldn't generate a response right now."
+        elif first_turn:
+            self.answer_cache.store(user_input, model_response)
 
         self._append_history(user_input, model_response)
         return model_response
 
+    def stream_response(self, user_input: str) -> typing.Generator[str, None, None]:
+        """
+        Streaming variant of get_response.
+        Yields reply text deltas as the model produces them.
+        Closing the generator early cancels the upstream request and leaves the history untouched.
+        """
+        if not user_input or not user_input.strip():
+            yield "Please type a message so I can help."
+            return
+
+        first_turn = not self.history
+
+        if first_turn and (cached := self.answer_cache.lookup(user_input)) is not None:
+            self._append_history(user_input, cached)
+            yield cached
+            return
+
+        input_messages = [
+            *self.history,
+            {
+                "role": "user",
+                "content": user_input,
+            },
+        ]
+
+        stream = self.gateway.stream(self.model, self.system_instruction, input_messages)
+        chunks = []
+
+        try:
+            with Metrics.upstream("openai"):
+                for delta in stream:
+                    chunks.append(delta)
+                    yield delta
+        finally:
+            stream.close()
+
+        model_response = "".join(chunks).strip()
+
+        if not model_response:
+            model_response = "I'm sorry, I couldn't generate a response right now."
+            yield model_response
+        elif first_turn:
+            self.answer_cache.store(user_input, model_response)
+
+        self._append_history(user_input, model_response)
+
     def set_history(self, history: list):
         """
         Optional: restore history from storage using OpenAI Responses input format.
@@ -90,3 +150,7 @@ class ChatBot:
                 "content": model_response,
             }
         )
+
+
+Metrics.register(Metrics.Gauge("chatbot_answer_cache_hit_ratio", "Fraction of first-turn questions answered from the local cache", function=lambda: ChatBot.answer_cache.hit_rate))
+Metrics.register(Metrics.Gauge("chatbot_answer_cache_entries", "Answers held in the local cache", function=lambda: ChatBot.answer_cache.stats()["entries"]))
@@ -0,0 +1,180 @@
+# Storage codecs for database sector files
+
+from __future__ import annotations
+
+import json
+import marshal
+import os
+import typing
+
+
+class Codec:
+	"""
+	Base class converting sector contents to and from the bytes stored on disk
+	"""
+
+	NAME: str = ''
+	MAGIC: bytes = b''
+
+	def encode(self, contents: typing.Mapping[str, typing.Any]) -> bytes:
+		"""
+		Serializes sector contents
+		:param contents: The sector contents
+		:return: The encoded bytes
+		:raises TypeError: If the contents hold values JSON cannot represent
+		"""
+
+		raise NotImplementedError()
+
+	def decode(self, data: bytes) -> dict[str, typing.Any]:
+		"""
+		Deserializes sector contents
+		:param data: The encoded bytes
+		:return: The sector contents
+		:raises ValueError: If the data is not valid for this codec
+		"""
+
+		raise NotImplementedError()
+
+	def matches(self, data: bytes) -> bool:
+		"""
+		:param data: The start of an encoded file
+		:return: Whether the data was written by this codec
+		"""
+
+		return len(self.MAGIC) > 0 and data.startswith(self.MAGIC)
+
+
+class JsonCodec(Codec):
+	"""
+	Plain JSON text, the original sector format
+	"""
+
+	NAME: str = 'json'
+
+	def encode(self, contents: typing.Mapping[str, typing.Any]) -> bytes:
+		return json.dumps(contents).encode('utf-8')
+
+	def decode(self, data: bytes) -> dict[str, typing.Any]:
+		return json.loads(data) if len(data) > 0 else {}
+
+	def matches(self, data: bytes) -> bool:
+		return len(data.lstrip()) == 0 or data.lstrip()[:1] == b'{'
+
+
+class MarshalVersionError(ValueError):
+	"""
+	Raised when a binary sector file was written with a marshal format version other than this interpreter's
+	"""
+
+
+class BinaryCodec(Codec):
+	"""
+	Compact typed binary format: a magic header and the marshal format version followed by Python's marshal encoding\n
+	Every value is a type tag followed by its length-prefixed payload, encoded and decoded in C\n
+	Marshal's format is not guaranteed across Python versions, so files are only read back by interpreters with the same marshal version
+	(migrate sectors to 'json' before upgrading). Only JSON values are accepted so a sector can always be migrated back
+	"""
+
+	NAME: str = 'binary'
+	MAGIC: bytes = b'MDBB'
+
+	def encode(self, contents: typing.Mapping[str, typing.Any]) -> bytes:
+		validate(contents)
+
+		try:
+			return self.MAGIC + bytes((marshal.version,)) + marshal.dumps(contents)
+		except ValueError:
+			# Subclasses such as frozen values are not marshallable; fall back to plain containers
+			return self.MAGIC + bytes((marshal.version,)) + marshal.dumps(plain(contents))
+
+	def decode(self, data: bytes) -> dict[str, typing.Any]:
+		if not self.matches(data) or len(data) <= len(self.MAGIC):
+			raise ValueError('Not a binary sector file')
+		elif (version := data[len(self.MAGIC)]) != marshal.version:
+			raise MarshalVersionError(f'Binary sector file was written with marshal version {version} but this interpreter uses version {marshal.version}; migrate it to \'json\' with the interpreter that wrote it')
+
+		try:
+			contents: typing.Any = marshal.loads(data[len(self.MAGIC) + 1:])
+		except (EOFError, TypeError) as e:
+			raise ValueError('Corrupt binary sector file') from e
+
+		if not isinstance(contents, dict):
+			raise ValueError('Corrupt binary sector file')
+
+		return contents
+
+
+def validate(value: typing.Any) -> None:
+	"""
+	Checks that a value round-trips through JSON unchanged (apart from tuples becoming lists)
+	:param value: The value
+	:raises TypeError: If the value or anything it contains is not a string, number, boolean, None, list or dictionary with string keys
+	"""
+
+	pending: list[typing.Any] = [value]
+	extend: typing.Callable[[typing.Iterable[typing.Any]], None] = pending.extend
+
+	while len(pending) > 0:
+		item: typing.Any = pending.pop()
+
+		if type(item) in _SCALARS:
+			continue
+		elif isinstance(item, dict):
+			for key in item:
+				if not isinstance(key, str):
+					raise TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\'')
+
+			extend(item.values())
+		elif isinstance(item, (list, tuple)):
+			extend(item)
+		elif not isinstance(item, (str, int, float)):
+			raise TypeError(f'Object of type \'{type(item).__name__}\' is not JSON serializable')
+
+
+def plain(value: typing.Any) -> typing.Any:
+	"""
+	Recursively converts mapping and sequence subclasses to plain dictionaries and lists
+	:param value: The JSON value
+	:return: The value built from built-in containers
+	"""
+
+	if isinstance(value, dict):
+		return {key: plain(item) for key, item in value.items()}
+	elif isinstance(value, (list, tuple)):
+		return [plain(item) for item in value]
+	else:
+		return value
+
+
+_SCALARS: frozenset[type] = frozenset((str, int, float, bool, type(None)))
+CODECS: dict[str, Codec] = {codec.NAME: codec for codec in (JsonCodec(), BinaryCodec())}
+DEFAULT: str = os.getenv('DATABASE_CODEC', JsonCodec.NAME)
+
+
+def get(name: typing.Optional[str] = None) -> Codec:
+	"""
+	:param name: The codec name or None for the default ('DATABASE_CODEC', 'json' if unset)
+	:return: The codec
+	:raises ValueError: If no codec has that name
+	"""
+
+	name = DEFAULT if name is None else name
+
+	if name not in CODECS:
+		raise ValueError(f'No such codec: \'{name}\'')
+
+	return CODECS[name]
+
+
+def detect(data: bytes) -> typing.Optional[Codec]:
+	"""
+	:param data: The start of an encoded file
+	:return: The codec that wrote the data or None if unknown
+	"""
+
+	for codec in CODECS.values():
+		if codec.matches(data):
+			return codec
+
+	return None
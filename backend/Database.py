@@ -1,11 +1,24 @@
 from __future__ import annotations
 
 import base64
+import bisect
+import collections
+import concurrent.futures
+import contextlib
 import copy
 import Crypto.Cipher.AES
+import enum
+import functools
+import hashlib
 import json
 import os
+import secrets
+import shutil
+import struct
+import threading
+import time
 import typing
+import zlib
 
 import CustomMethodsVI.Concurrent as Concurrent
 import CustomMethodsVI.FileSystem as FileSystem
@@ -13,15 +26,375 @@ import CustomMethodsVI.Misc as Misc
 import CustomMethodsVI.Stream as Stream
 import CustomMethodsVI.Synchronization.Threading as Synchronization
 
+import Codec
+import Feed
+import FileLock
+import Index
+import Journal
+import Registry
+
+
+class ReadMode(enum.StrEnum):
+	"""
+	How sector reads hand out stored values
+	"""
+
+	COPY = 'copy'
+	"""Reads return deep copies the caller may modify (default)"""
+	FROZEN = 'frozen'
+	"""Values are frozen once when written and reads return them directly without copying"""
+
+
+class FrozenDict(dict):
+	"""
+	Immutable dictionary used for values of sectors in 'ReadMode.FROZEN'\n
+	All mutating methods raise TypeError
+	"""
+
+	def __readonly__(self, *args, **kwargs) -> typing.NoReturn:
+		raise TypeError('FrozenDict is immutable')
+
+	__setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = __readonly__
+
+	def __copy__(self) -> FrozenDict:
+		return self
+
+	def __deepcopy__(self, memo: dict[int, typing.Any]) -> FrozenDict:
+		return self
+
+	def __reduce__(self) -> tuple[type[FrozenDict], tuple[dict[str, typing.Any]]]:
+		return FrozenDict, (dict(self),)
+
+	def thaw(self) -> dict[str, typing.Any]:
+		"""
+		:return: A mutable deep copy of this dictionary
+		"""
+
+		return thaw(self)
+
+
+def freeze(value: typing.Any) -> typing.Any:
+	"""
+	Recursively converts a JSON value to an immutable equivalent (dictionaries become FrozenDict and lists become tuples)
+	:param value: The value to freeze
+	:return: The frozen value
+	"""
+
+	if isinstance(value, FrozenDict):
+		return value
+	elif isinstance(value, dict):
+		return FrozenDict((key, freeze(item)) for key, item in value.items())
+	elif isinstance(value, (list, tuple)):
+		return tuple(freeze(item) for item in value)
+	else:
+		return value
+
+
+def thaw(value: typing.Any) -> typing.Any:
+	"""
+	Recursively converts a frozen JSON value back to a mutable equivalent
+	:param value: The value to thaw
+	:return: The mutable value
+	"""
+
+	if isinstance(value, dict):
+		return {key: thaw(item) for key, item in value.items()}
+	elif isinstance(value, (list, tuple)):
+		return [thaw(item) for item in value]
+	else:
+		return value
+
+
+_MAGIC: bytes = b'MDBE'
+_SEALED: bytes = _MAGIC + b'\x01'
+_CHUNKED: bytes = _MAGIC + b'\x02'
+_CHUNK_HEADER: struct.Struct = struct.Struct('>II')
+_CHUNK_FRAME: struct.Struct = struct.Struct('>I')
+_CHECKPOINT: bytes = b'MDBC'
+_CHECKPOINT_HEADER: struct.Struct = struct.Struct('>4sQ')
+
+
+def _cipher_key(crypt: str) -> bytes:
+	password: bytes = base64.b64encode(str(crypt).encode())
+	remaining: int = max(0, 32 - len(password))
+	password += b'\x00' * remaining
+	return password[:32]
+
+
+@functools.lru_cache(maxsize=64)
+def _derive(crypt: str, salt: bytes, iterations: int) -> bytes:
+	return hashlib.pbkdf2_hmac('sha256', crypt.encode('utf-8'), salt, iterations, 32)
+
+
+def _unseal(data: bytes, crypt: str) -> bytes:
+	# Single-block layouts written before chunked encryption
+	if data.startswith(_SEALED):
+		mac_length, nonce_length = data[len(_SEALED)], data[len(_SEALED) + 1]
+		start: int = len(_SEALED) + 2
+		mac: bytes = data[start:start + mac_length]
+		nonce: bytes = data[start + mac_length:start + mac_length + nonce_length]
+		cipher: bytes = data[start + mac_length + nonce_length:]
+	else:
+		# Base64 encoded layout written before the sealed binary container
+		data = base64.b64decode(data)
+		mac_length: int = int.from_bytes(data[:8], 'big', signed=False)
+		nonce_length: int = int.from_bytes(data[8:16], 'little', signed=False)
+		mac: bytes = data[16:16 + mac_length]
+		cipher: bytes = data[16 + mac_length:-nonce_length]
+		nonce: bytes = data[-nonce_length:]
+
+	crypter = Crypto.Cipher.AES.new(_cipher_key(crypt), Crypto.Cipher.AES.MODE_EAX, nonce=nonce)
+
+	try:
+		return crypter.decrypt_and_verify(cipher, mac)
+	except ValueError:
+		raise PermissionError('Crypt key is incorrect')
+
+
+def _checkpoint(data: bytes) -> tuple[int, bytes]:
+	# Snapshots written before checkpoint generations have none and are generation 0
+	if not data.startswith(_CHECKPOINT) or len(data) < _CHECKPOINT_HEADER.size:
+		return 0, data
+
+	return _CHECKPOINT_HEADER.unpack_from(data)[1], data[_CHECKPOINT_HEADER.size:]
+
+
+def _successor(prefix: str) -> typing.Optional[str]:
+	# Smallest string greater than every string starting with 'prefix' or None if there is none
+	prefix = prefix.rstrip(chr(0x10FFFF))
+	return None if len(prefix) == 0 else prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SectorCipher:
+	"""
+	AES-GCM cipher of an encrypted sector\n
+	The key is derived from the password and the sector's random salt with PBKDF2 once per process and then cached in memory
+	"""
+
+	ITERATIONS: int = int(os.getenv('DATABASE_KDF_ITERATIONS', '200000'))
+
+	def __init__(self, crypt: str, salt: typing.Optional[bytes] = None, iterations: typing.Optional[int] = None):
+		"""
+		AES-GCM cipher of an encrypted sector\n
+		- Constructor -
+		:param crypt: The password
+		:param salt: The sector's salt or None to generate a new one
+		:param iterations: The PBKDF2 iteration count or None for 'DATABASE_KDF_ITERATIONS' (200000 if unset)
+		"""
+
+		assert isinstance(crypt, str) and len(crypt) >= 8, 'Invalid file crypt key'
+		self.__salt__: bytes = os.urandom(16) if salt is None else bytes(salt)
+		self.__iterations__: int = SectorCipher.ITERATIONS if iterations is None else int(iterations)
+		self.__key__: bytes = _derive(crypt, self.__salt__, self.__iterations__)
+
+	def encrypt(self, payload: bytes) -> bytes:
+		"""
+		Encrypts and authenticates a block with a fresh nonce
+		:param payload: The plain bytes
+		:return: The nonce, tag and cipher text
+		"""
+
+		crypter = Crypto.Cipher.AES.new(self.__key__, Crypto.Cipher.AES.MODE_GCM)
+		cipher, mac = crypter.encrypt_and_digest(payload)
+		return crypter.nonce + mac + cipher
+
+	def decrypt(self, data: bytes) -> bytes:
+		"""
+		Decrypts a block written by 'SectorCipher.encrypt'
+		:param data: The nonce, tag and cipher text
+		:return: The plain bytes
+		:raises PermissionError: If the password is incorrect or the block was altered
+		"""
+
+		crypter = Crypto.Cipher.AES.new(self.__key__, Crypto.Cipher.AES.MODE_GCM, nonce=data[:16])
+
+		try:
+			return crypter.decrypt_and_verify(data[32:], data[16:32])
+		except ValueError:
+			raise PermissionError('Crypt key is incorrect')
+
+	@property
+	def salt(self) -> bytes:
+		"""
+		:return: The salt the key was derived with
+		"""
+
+		return self.__salt__
+
+	@property
+	def iterations(self) -> int:
+		"""
+		:return: The PBKDF2 iteration count the key was derived with
+		"""
+
+		return self.__iterations__
+
+
+class InlineFunction:
+	"""
+	Counterpart of 'Concurrent.ThreadedFunction' calling the function on the calling thread\n
+	Used for in-memory operations too short to be worth a thread
+	"""
+
+	def __init__(self, function: typing.Callable):
+		"""
+		Counterpart of 'Concurrent.ThreadedFunction' calling the function on the calling thread\n
+		- Constructor -
+		:param function: A callable object
+		"""
+
+		assert callable(function), 'Function is not callable'
+		self.__cb__: typing.Callable = function
+
+	def __call__(self, *args, **kwargs) -> Concurrent.Promise:
+		"""
+		Calls the underlying function immediately
+		:param args: The positional arguments to call with
+		:param kwargs: The keyword arguments to call with
+		:return: A promise already fulfilled with the function's result or error
+		"""
+
+		promise: Concurrent.Promise = Concurrent.Promise()
+
+		try:
+			promise.resolve(self.__cb__(*args, **kwargs))
+		except Exception as err:
+			promise.throw(err)
+
+		return promise
+
+
+class VersionConflictError(ValueError):
+	"""
+	Raised when a conditional batch operation finds its key at another version than expected
+	"""
+
+
+class SectorBatch:
+	"""
+	Puts and deletes applied to a sector atomically under a single writer lock acquisition by 'SectorBatch.commit'\n
+	Operations may be conditional on the version of their key (see 'MyDatabase.get_versioned'); if any condition fails nothing is applied\n
+	Used as a context manager the batch commits on exit unless an exception was raised
+	"""
+
+	def __init__(self, sector: MyDatabase):
+		"""
+		Puts and deletes applied to a sector atomically under a single writer lock acquisition by 'SectorBatch.commit'\n
+		- Constructor -
+		:param sector: The sector
+		"""
+
+		self.__sector__: MyDatabase = sector
+		self.__operations__: list[tuple[str, typing.Any, typing.Optional[int]]] = []
+
+	def __enter__(self) -> SectorBatch:
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		if exc_type is None:
+			self.commit().wait()
+
+	def __len__(self) -> int:
+		"""
+		:return: The number of pending operations
+		"""
+
+		return len(self.__operations__)
+
+	def put(self, key: str, value: typing.Any, *, expect: typing.Optional[int] = None) -> SectorBatch:
+		"""
+		Queues setting a key
+		:param key: The key
+		:param value: The value
+		:param expect: The version the key must have when committed (0 if it must not exist) or None for an unconditional put
+		:return: This batch
+		:raises TypeError: If 'key' is not a string
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		self.__operations__.append((str(key), self.__sector__.__store__(value), expect))
+		return self
+
+	def delete(self, key: str, *, expect: typing.Optional[int] = None) -> SectorBatch:
+		"""
+		Queues removing a key (a missing key is ignored)
+		:param key: The key
+		:param expect: The version the key must have when committed or None for an unconditional delete
+		:return: This batch
+		:raises TypeError: If 'key' is not a string
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		self.__operations__.append((str(key), Index.MISSING, expect))
+		return self
+
+	def commit(self) -> Concurrent.Promise[dict[str, int]]:
+		"""
+		Applies all queued operations at once and empties this batch\n
+		The sector counts the batch as a single modification and the next save journals it as a single record\n
+		On a sector shared with other processes, a batch with conditional operations is checked against their saved changes and saved before it returns
+		:return: The new version of every key in the batch (0 for deleted keys)
+		:raises VersionConflictError: If a key is not at its expected version (nothing is applied)
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.__sector__.closed, IOError('Operation on closed sector'))
+		operations: list[tuple[str, typing.Any, typing.Optional[int]]] = self.__operations__
+		self.__operations__ = []
+		return InlineFunction(self.__sector__.__commit__)(operations)
+
+
+class SectorWriterLock(Synchronization.ReaderWriterLock.Lock):
+	"""
+	Writer lock handed out by 'MyDatabase.writer'\n
+	Changes made under it are unknown to the sector, so on release its indexes are rebuilt and its next save writes a full snapshot
+	"""
+
+	def __init__(self, sector: MyDatabase, lock: Synchronization.ReaderWriterLock):
+		"""
+		Writer lock handed out by 'MyDatabase.writer'\n
+		- Constructor -
+		:param sector: The sector the lock belongs to
+		:param lock: The sector's reader-writer lock
+		"""
+
+		super().__init__(lock, True)
+		self.__sector__: MyDatabase = sector
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		try:
+			self.__sector__.__invalidate__()
+		finally:
+			super().__exit__(exc_type, exc_val, exc_tb)
+
 
 class MyDatabase:
 	"""
-	Database implementation using JSON files
+	Database implementation using JSON (or 'Codec.BinaryCodec') files\n
+	In-memory operations run on the calling thread; file writes requested with 'save_async' share a bounded thread pool\n
+	Saves append only the changed keys to a '<sector>.journal' file which is replayed on open;
+	once the journal outgrows the snapshot it is compacted into a new snapshot swapped in by atomic rename\n
+	Snapshots carry the generation of the checkpoint that wrote them and journals start with the generation they extend,
+	so a journal left behind by a crash right after a checkpoint is discarded instead of replayed over the newer snapshot\n
+	Encrypted sectors store their snapshot as independently encrypted chunks of keys so a snapshot re-encrypts only the chunks holding changed keys,
+	and encrypt each record of their '<sector>.sealed.journal' file\n
+	Loaded with 'shared' (or 'DATABASE_SHARED' set to 'on'), several processes may open the same root: saves hold an OS lock on '<sector>.lock',
+	first catch up with writes made by other processes and then bump the (generation, epoch) stamp stored in the lock file;
+	'MyDatabase.refresh' compares that stamp and replays only the journal records appended since, reloading the snapshot only after another process compacted it\n
+	Once subscribed to or read with 'MyDatabase.changes', every change is also published as numbered key events (see 'Feed.ChangeFeed')
 	"""
 
 	__ROOT: FileSystem.Directory = ...
-	__SECTORS: dict[str, MyDatabase] = {}
-	__SECTOR_LOCK: Synchronization.SpinLock = Synchronization.SpinLock()
+	__REGISTRY: Registry.SectorRegistry = Registry.SectorRegistry(
+		budget=int(os.getenv('DATABASE_SECTOR_BUDGET', str(256 << 20))),
+		idle=float(os.getenv('DATABASE_SECTOR_IDLE', '600')),
+		on_evict=lambda sector: sector.__unload__()
+	)
+	__EXECUTOR: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.getenv('DATABASE_IO_WORKERS', '4')), thread_name_prefix='MyDatabase-io')
+	__JOURNAL_MIN: int = int(os.getenv('DATABASE_JOURNAL_MIN', str(1 << 20)))
+	__JOURNAL_RATIO: float = float(os.getenv('DATABASE_JOURNAL_RATIO', '1'))
+	__CRYPT_CHUNK: int = int(os.getenv('DATABASE_CRYPT_CHUNK', '64'))
+	__SHARED: bool = os.getenv('DATABASE_SHARED', 'off').lower() == 'on'
 
 	@classmethod
 	def __file_for(cls: type[MyDatabase], sector: str) -> FileSystem.File:
@@ -40,186 +413,1501 @@ class MyDatabase:
 		raise FileNotFoundError(f'No such sector: \'{sector}\'')
 
 	@classmethod
-	def __close_sector_handle(cls: type[MyDatabase], sector: MyDatabase) -> None:
-		name: str = Stream.LinqStream(cls.__SECTORS.items()).filter(lambda pair: pair[1] is sector).transform(lambda pair: pair[0]).first_or_default(None)
-		cls.__SECTORS.pop(name, None)
+	def __journal_for(cls: type[MyDatabase], file: FileSystem.File, sealed: bool = False) -> str:
+		return f'{os.path.splitext(file.filepath)[0]}.sealed.journal' if sealed else f'{os.path.splitext(file.filepath)[0]}.journal'
+
+	@classmethod
+	def __lock_for(cls: type[MyDatabase], file: FileSystem.File) -> str:
+		return f'{os.path.splitext(file.filepath)[0]}.lock'
 
 	@classmethod
-	def load(cls: type[MyDatabase], root: FileSystem.Directory | str) -> bool:
+	def __parts_for(cls: type[MyDatabase], file: FileSystem.File) -> str:
+		return f'{os.path.splitext(file.filepath)[0]}.parts'
+
+	@classmethod
+	def __release_sector_handle(cls: type[MyDatabase], sector: MyDatabase | PartitionedDatabase) -> bool:
+		if not cls.__REGISTRY.release(sector):
+			return False
+		elif cls.__REGISTRY.over_budget:
+			cls.__EXECUTOR.submit(cls.__REGISTRY.evict)
+
+		return True
+
+	@classmethod
+	def load(cls: type[MyDatabase], root: FileSystem.Directory | str, *, shared: typing.Optional[bool] = None) -> bool:
 		"""
 		Loads the database (content is not stored in memory)
 		:param root: The database root directory
+		:param shared: Whether other processes may open the same root at once or None for the default ('DATABASE_SHARED', off if unset); partitioned sectors cannot be opened while shared
 		:return: Whether database was loaded
 		"""
 
 		cls.__ROOT = root if isinstance(root, FileSystem.Directory) else FileSystem.Directory(root)
+		cls.__SHARED = cls.__SHARED if shared is None else bool(shared)
 		return cls.__ROOT.exists()
 
 	@classmethod
 	def sector_exists(cls, name: str) -> bool:
 		"""
-		:param name: The sector name
-		:return: Whether the specified sector file exists
-		:raises AssertionError: If database is not loaded
-		:raises NameError: If sector name is invalid
-		:raises FileNotFoundError: If sector does not exist
+		:param name: The sector name
+		:return: Whether the specified sector file (or partitioned sector manifest) exists
+		:raises AssertionError: If database is not loaded
+		:raises NameError: If sector name is invalid
+		:raises FileNotFoundError: If sector does not exist
+		"""
+
+		file: FileSystem.File = cls.__file_for(name)
+		return file.exists() or PartitionedDatabase.is_partitioned(cls.__parts_for(file))
+
+	@classmethod
+	def open(cls: type[MyDatabase], name: str, *, create_if_not_found: bool = True, crypt: typing.Optional[str] = None, read_mode: typing.Optional[ReadMode] = None, codec: typing.Optional[str] = None) -> MyDatabase | PartitionedDatabase:
+		"""
+		Opens the specified sector for IO operators\n
+		Handles are shared and reference counted: each call must be paired with a 'close' of the returned handle; while shared with other processes, an already loaded handle is refreshed first\n
+		Partitioned sectors (see 'MyDatabase.create') are detected by their manifest and opened as 'PartitionedDatabase'
+		:param name: The sector name
+		:param create_if_not_found: Whether sector file will be created if not found
+		:param crypt: The password to decrypt with if encrypted or None if plain JSON
+		:param read_mode: How reads hand out values or None to accept the mode of an already opened sector ('ReadMode.COPY' for new handles)
+		:param codec: The codec new handles save with or None for the default ('DATABASE_CODEC', 'json' if unset); files stored in another format are rewritten on the next save
+		:return: The new sector interface
+		:raises AssertionError: If database is not loaded
+		:raises NameError: If sector name is invalid
+		:raises FileNotFoundError: If sector does not exist
+		:raises ValueError: If the sector is in use with a different read mode, a password is given for a partitioned sector or a partitioned sector is opened while shared
+		"""
+
+		assert cls.is_loaded(), 'Database not loaded'
+
+		with cls.__REGISTRY.lock:
+			sector: typing.Optional[MyDatabase | PartitionedDatabase] = cls.__REGISTRY.acquire(name)
+
+			if sector is not None and read_mode is not None and read_mode != sector.read_mode:
+				if cls.__REGISTRY.references(name) > 1:
+					cls.__REGISTRY.release(sector)
+					raise ValueError(f'Sector \'{name}\' is already opened in {sector.read_mode} mode')
+
+				# Loaded but released by every user; reload it in the requested mode
+				try:
+					sector.save()
+				except BaseException:
+					cls.__REGISTRY.release(sector)
+					raise
+
+				cls.__REGISTRY.remove(name)
+				sector.__unload__()
+				sector = None
+
+			if sector is not None:
+				try:
+					sector.refresh()
+				except BaseException:
+					cls.__REGISTRY.release(sector)
+					raise
+
+				return sector
+
+			file: FileSystem.File = cls.__file_for(name)
+
+			if PartitionedDatabase.is_partitioned(parts := cls.__parts_for(file)):
+				Misc.raise_ifn(crypt is None, ValueError('Partitioned sectors cannot be encrypted'))
+				Misc.raise_if(cls.__SHARED, ValueError('Partitioned sectors cannot be shared across processes'))
+				sector = PartitionedDatabase(parts, read_mode=ReadMode.COPY if read_mode is None else read_mode, executor=cls.__EXECUTOR, on_release=cls.__release_sector_handle)
+				return cls.__REGISTRY.register(name, sector)
+			elif not file.exists() and create_if_not_found:
+				return cls.create(name, crypt=crypt, read_mode=ReadMode.COPY if read_mode is None else read_mode, codec=codec)
+
+			Misc.raise_ifn(file.exists(), FileNotFoundError(f'No such sector: \'{name}\''))
+			sector = MyDatabase(file, crypt=crypt, read_mode=ReadMode.COPY if read_mode is None else read_mode, codec=codec, shared=cls.__SHARED)
+			return cls.__REGISTRY.register(name, sector)
+
+	@classmethod
+	def create(cls: type[MyDatabase], name: str, *, crypt: typing.Optional[str] = None, read_mode: ReadMode = ReadMode.COPY, partitions: typing.Optional[int] = None, codec: typing.Optional[str] = None) -> MyDatabase | PartitionedDatabase:
+		"""
+		Creates a new sector in the database
+		:param name: The sector name
+		:param crypt: The password to decrypt with if encrypted or None if plain JSON
+		:param read_mode: How reads hand out values
+		:param partitions: The number of chunk files keys are sharded across or None for a single-file sector
+		:param codec: The codec the sector is saved with or None for the default ('DATABASE_CODEC', 'json' if unset); partitioned chunks are always JSON
+		:return: The new sector interface
+		:raises AssertionError: If database is not loaded
+		:raises NameError: If sector name is invalid
+		:raises FileExistsError: If sector already exists
+		:raises ValueError: If a password is given for a partitioned sector or a partitioned sector is created while shared
+		"""
+
+		assert cls.is_loaded(), 'Database not loaded'
+
+		with cls.__REGISTRY.lock:
+			file: FileSystem.File = cls.__file_for(name)
+			parts: str = cls.__parts_for(file)
+			Misc.raise_if(file.exists() or PartitionedDatabase.is_partitioned(parts) or name in cls.__REGISTRY, FileExistsError('Sector already exists'))
+
+			if partitions is not None:
+				Misc.raise_ifn(crypt is None, ValueError('Partitioned sectors cannot be encrypted'))
+				Misc.raise_if(cls.__SHARED, ValueError('Partitioned sectors cannot be shared across processes'))
+				PartitionedDatabase.initialize(parts, partitions)
+				sector: PartitionedDatabase = PartitionedDatabase(parts, read_mode=read_mode, executor=cls.__EXECUTOR, on_release=cls.__release_sector_handle)
+				return cls.__REGISTRY.register(name, sector)
+
+			file.parent.create()
+			file.create()
+			sector: MyDatabase = MyDatabase(file, crypt=crypt, read_mode=read_mode, codec=codec, shared=cls.__SHARED)
+			return cls.__REGISTRY.register(name, sector)
+
+	@classmethod
+	def delete(cls: type[MyDatabase], name: str, *, force_close_handles: bool = False) -> None:
+		"""
+		Deletes a sector from the database
+		:param name: The sector name
+		:param force_close_handles: If false, will raise an error if this sector is opened (and not yet released by all its users), otherwise, closes all handles to this sector
+		:raises AssertionError: If database is not loaded
+		:raises NameError: If sector name is invalid
+		:raises IOError: If sector is opened and 'force_close_handles' is False
+		:raises FileNotFoundError: If sector does not exist
+		"""
+
+		assert cls.is_loaded(), 'Database not loaded'
+
+		with cls.__REGISTRY.lock:
+			file: FileSystem.File = cls.__file_for(name)
+			parts: str = cls.__parts_for(file)
+			Misc.raise_if(cls.__REGISTRY.references(name) > 0 and not force_close_handles, IOError('Sector is opened'))
+			sector: typing.Optional[MyDatabase | PartitionedDatabase] = cls.__REGISTRY.remove(name)
+
+			if sector is not None:
+				sector.__unload__()
+			elif not file.exists() and not PartitionedDatabase.is_partitioned(parts):
+				raise FileNotFoundError(f'No such sector: \'{name}\'')
+
+			if file.exists():
+				file.delete()
+
+			if os.path.isdir(parts):
+				shutil.rmtree(parts)
+
+			for path in (cls.__journal_for(file), cls.__journal_for(file, True), cls.__lock_for(file)):
+				if os.path.isfile(path):
+					os.remove(path)
+
+	@classmethod
+	def unload(cls: type[MyDatabase], *, save: bool = True) -> None:
+		"""
+		Closes the database - All sector handles are closed
+		:param save: Whether to save sectors before close
+		"""
+
+		with cls.__REGISTRY.lock:
+			for name, sector in cls.__REGISTRY.handles().items():
+				cls.__REGISTRY.remove(name)
+
+				if not sector.closed:
+					try:
+						if save:
+							sector.save()
+					finally:
+						sector.__unload__()
+
+			cls.__ROOT = ...
+
+	@classmethod
+	def evict(cls: type[MyDatabase], *, force: bool = False) -> list[str]:
+		"""
+		Saves and unloads sectors released by all their users once idle for 'DATABASE_SECTOR_IDLE' seconds (default 600),
+		then the least recently released ones while loaded sectors exceed 'DATABASE_SECTOR_BUDGET' bytes (default 256 MiB)
+		:param force: Whether to evict every released sector
+		:return: The names of the evicted sectors
+		"""
+
+		return cls.__REGISTRY.evict(force=force)
+
+	@classmethod
+	def sectors(cls: type[MyDatabase]) -> dict[str, MyDatabase | PartitionedDatabase]:
+		"""
+		:return: The currently loaded sectors by name, including those released by all their users but not yet evicted
+		"""
+
+		return cls.__REGISTRY.handles()
+
+	@classmethod
+	def is_loaded(cls: type[MyDatabase]) -> bool:
+		"""
+		:return: Whether database root exists
+		"""
+
+		return isinstance(cls.__ROOT, FileSystem.Directory) and cls.__ROOT.exists()
+
+	def __init__(self, file: FileSystem.File, *, crypt: typing.Optional[str] = None, read_mode: ReadMode = ReadMode.COPY, codec: typing.Optional[str] = None, shared: bool = False):
+		assert isinstance(file, FileSystem.File) and file.exists() and file.extension == 'json', 'Invalid file'
+		assert crypt is None or (isinstance(crypt, str) and len(crypt) >= 8), 'Invalid file crypt key'
+		self.__handle__: typing.Optional[FileSystem.File] = file
+		self.__contents__: dict[str, typing.Any] = {}
+		self.__crypt__: typing.Optional[None] = crypt
+		self.__lock__: Synchronization.ReaderWriterLock = Synchronization.ReaderWriterLock()
+		self.__modifications__: int = 0
+		self.__modified_at__: typing.Optional[float] = None
+		self.__read_mode__: ReadMode = ReadMode(read_mode)
+		self.__snapshot__: typing.Optional[FrozenDict] = None
+		self.__save_lock__: threading.Lock = threading.Lock()
+		self.__dirty__: dict[str, None] = {}
+		self.__cleared__: bool = False
+		self.__rewrite__: bool = False
+		self.__journal__: typing.Optional[Journal.Journal] = None
+		self.__indexes__: dict[str, Index.SectorIndex] = {}
+		self.__codec__: Codec.Codec = Codec.get(codec)
+		self.__cipher__: typing.Optional[SectorCipher] = None
+		self.__sealed__: typing.Optional[list[typing.Optional[bytes]]] = None
+		self.__sorted__: typing.Optional[list[str]] = None
+		self.__versions__: dict[str, int] = {}
+		# Versions start at a random base so an 'expect' read before the sector was reloaded cannot match a later write; 52 bits keep them exact as JSON numbers
+		self.__clock__: int = secrets.randbits(52) + 1
+		self.__epoch__: int = self.__clock__
+		self.__file_lock__: typing.Optional[FileLock.FileLock] = FileLock.FileLock(MyDatabase.__lock_for(file)) if shared else None
+		self.__stamp__: tuple[int, int] = (0, 0)
+		self.__offset__: int = 0
+		self.__generation__: int = 0
+		self.__feed__: typing.Optional[Feed.ChangeFeed] = None
+
+		try:
+			with self.__exclusive__():
+				migrate: bool = self.__load__(True)
+				self.__journal__ = Journal.Journal(MyDatabase.__journal_for(file, self.encrypted), cipher=self.__cipher__)
+				self.__stamp__ = (0, 0) if self.__file_lock__ is None else self.__file_lock__.stamp
+		except BaseException:
+			if self.__file_lock__ is not None:
+				self.__file_lock__.close()
+
+			raise
+
+		if migrate:
+			# Written in another format; the next save rewrites it with this sector's codec
+			self.__rewrite__ = True
+			self.__touch__()
+
+	def __exclusive__(self) -> typing.ContextManager:
+		# Under the save lock a sector cannot be unloaded past this check
+		Misc.raise_if(self.__handle__ is None, IOError('Operation on closed sector'))
+		return contextlib.nullcontext() if self.__file_lock__ is None else self.__file_lock__.exclusive()
+
+	def __sync__(self) -> bool:
+		# Callers hold the save lock and the file lock
+		if self.__file_lock__ is None or (stamp := self.__file_lock__.stamp) == self.__stamp__:
+			return False
+
+		with self.__lock__.writer():
+			# Unsaved local writes are newer than anything another process saved
+			pending: dict[str, typing.Any] = {key: self.__contents__.get(key, Index.MISSING) for key in self.__dirty__}
+			keys: dict[str, None] = {}
+
+			if stamp[1] == self.__stamp__[1]:
+				# Same epoch: the journal was only appended to since the last catch-up
+				records, self.__offset__ = Journal.Journal.read(self.__journal__.path, self.__journal__.cipher, self.__offset__)
+				cleared: bool = False
+
+				for record in records:
+					self.__apply__(record)
+
+					for change in (record['ops'] if record.get('op') == 'batch' else (record,)):
+						if change.get('op') == 'clear':
+							cleared = True
+						elif 'key' in change:
+							keys[change['key']] = None
+
+				if self.__read_mode__ == ReadMode.FROZEN:
+					for key in (self.__contents__ if cleared else keys):
+						if key in self.__contents__:
+							self.__contents__[key] = freeze(self.__contents__[key])
+			else:
+				# Compacted by another process: the snapshot was replaced and the journal emptied
+				self.__load__(False)
+				self.__journal__.cipher = self.__cipher__
+				cleared = False
+
+			if self.__cleared__:
+				self.__contents__.clear()
+
+			for key, value in pending.items():
+				if value is Index.MISSING:
+					self.__contents__.pop(key, None)
+				else:
+					self.__contents__[key] = value
+
+			self.__changed__(*(key for key in keys if key not in pending), everything=cleared or stamp[1] != self.__stamp__[1], cleared=cleared)
+			self.__stamp__ = stamp
+
+		self.__journal__.refresh()
+		return True
+
+	def __stamped__(self, checkpoint: bool) -> None:
+		# Callers hold the file lock exclusively after writing the journal (or a snapshot when checkpointing)
+		if self.__file_lock__ is None:
+			return
+
+		generation, epoch = self.__stamp__
+		self.__stamp__ = (generation + 1, epoch + 1 if checkpoint else epoch)
+		self.__file_lock__.stamp = self.__stamp__
+		self.__journal__.refresh()
+		self.__offset__ = self.__journal__.size
+
+	def __load__(self, truncate: bool) -> bool:
+		data: bytes = self.__handle__.single_read(True)
+		crypt: typing.Optional[str] = self.__crypt__
+		self.__snapshot_size__ = len(data)
+		self.__generation__, data = _checkpoint(data)
+		self.__cipher__ = None
+		self.__sealed__ = None
+		self.__sorted__ = None
+
+		if len(data) > 0 and (self.encrypted or data.startswith(_MAGIC)):
+			Misc.raise_ifn(self.encrypted, PermissionError('Sector is encrypted'))
+
+			if data.startswith(_CHUNKED):
+				migrate: bool = self.__unchunk__(data, crypt)
+			else:
+				payload: bytes = _unseal(data, crypt)
+				stored: typing.Optional[Codec.Codec] = Codec.detect(payload)
+				Misc.raise_if(stored is None, ValueError('Unknown sector file format'))
+				self.__contents__ = stored.decode(payload)
+				self.__cipher__ = SectorCipher(crypt)
+				migrate: bool = True
+		elif len(data) > 0:
+			stored: typing.Optional[Codec.Codec] = Codec.detect(data)
+			Misc.raise_if(stored is None, ValueError('Unknown sector file format'))
+			self.__contents__ = stored.decode(data)
+			migrate: bool = stored is not self.__codec__
+		else:
+			self.__contents__ = {}
+			migrate: bool = False
+
+			if self.encrypted:
+				# The salt is only stored with a snapshot, so journal records may not be written before the first one
+				self.__cipher__ = SectorCipher(crypt)
+				self.__rewrite__ = True
+
+		for sealed in ((False, True) if self.encrypted else (False,)):
+			journal: str = MyDatabase.__journal_for(self.__handle__, sealed)
+			cipher: typing.Optional[SectorCipher] = self.__cipher__ if sealed else None
+
+			if truncate:
+				records: list[dict[str, typing.Any]] = Journal.Journal.replay(journal, cipher)
+				self.__offset__ = os.path.getsize(journal) if os.path.isfile(journal) else 0
+			else:
+				# Torn tails are only cut off while no other process may be appending
+				records, self.__offset__ = Journal.Journal.read(journal, cipher)
+
+			# Journals written before checkpoint generations have no header and extend generation 0
+			extends: int = records[0]['generation'] if len(records) > 0 and records[0].get('op') == 'checkpoint' else 0
+
+			if len(records) > 0 and extends < self.__generation__:
+				# Already part of the snapshot: a checkpoint was interrupted before it emptied the journal
+				records = []
+				self.__offset__ = 0
+
+				if truncate:
+					with open(journal, 'r+b') as source:
+						source.truncate(0)
+						os.fsync(source.fileno())
+
+					if self.__file_lock__ is not None:
+						# Processes still reading from their old offset must reload
+						generation, epoch = self.__file_lock__.stamp
+						self.__file_lock__.stamp = (generation + 1, epoch + 1)
+
+			for record in records:
+				self.__apply__(record)
+
+			if self.encrypted and not sealed and os.path.isfile(journal):
+				# Left over from before the sector was encrypted; fold it into the next save
+				self.__rewrite__ = True
+				self.__touch__()
+
+		if self.__read_mode__ == ReadMode.FROZEN:
+			self.__contents__ = {key: freeze(value) for key, value in self.__contents__.items()}
+
+		return migrate
+
+	def __len__(self) -> int:
+		"""
+		:return: The length of this sector
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		with self.__lock__.reader():
+			return len(self.__contents__)
+
+	def __repr__(self) -> str:
+		return str(self)
+
+	def __str__(self) -> str:
+		return str({k: v for k, v in self})
+
+	def __setitem__(self, key: str, value: typing.Any) -> None:
+		"""
+		Sets the specified key to the specified value
+		:param key: The key
+		:param value: The value
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		value = self.__store__(value)
+
+		with self.__lock__.writer():
+			self.__contents__[str(key)] = value
+			self.__touch__(str(key))
+
+	def __delitem__(self, key: str) -> None:
+		"""
+		Deletes the specified key from the sector
+		:param key: The key
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		:raises KeyError: If the key does not exist
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		with self.__lock__.writer():
+			del self.__contents__[str(key)]
+			self.__touch__(str(key))
+
+	def __contains__(self, key: str) -> bool:
+		"""
+		Checks if the key exists in this sector map
+		:param key: The key
+		:return: Whether 'key' exists
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		with self.__lock__.reader():
+			return str(key) in self.__contents__
+
+	def __getitem__(self, key: str) -> typing.Any:
+		"""
+		Gets the value of the specified value
+		:param key: The key
+		:return: A copy of the bound value
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		:raises KeyError: If the key does not exist
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		with self.__lock__.reader():
+			return self.__read__(self.__contents__[str(key)])
+
+	def __iter__(self) -> MyDatabaseIterator:
+		"""
+		Iterates the key-value pairs of this sector
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		return MyDatabaseIterator(self)
+
+	def __sorted_keys__(self) -> list[str]:
+		if self.__sorted__ is None:
+			self.__sorted__ = sorted(self.__contents__)
+
+		return self.__sorted__
+
+	def __resort__(self, *keys: str, everything: bool = False) -> None:
+		if self.__sorted__ is None:
+			return
+		elif everything:
+			self.__sorted__ = None
+			return
+
+		for key in keys:
+			position: int = bisect.bisect_left(self.__sorted__, key)
+			present: bool = position < len(self.__sorted__) and self.__sorted__[position] == key
+
+			if present and key not in self.__contents__:
+				del self.__sorted__[position]
+			elif not present and key in self.__contents__:
+				self.__sorted__.insert(position, key)
+
+	def __items__(self, low: typing.Optional[str] = None, high: typing.Optional[str] = None, *, prefix: typing.Optional[str] = None, inclusive: tuple[bool, bool] = (True, True), ordered: bool = False) -> list[tuple[str, typing.Any]]:
+		with self.__lock__.reader():
+			if not ordered and low is None and high is None and prefix is None:
+				return list(self.__contents__.items())
+
+			keys: list[str] = self.__sorted_keys__()
+			start: int = 0
+			stop: int = len(keys)
+
+			if prefix is not None:
+				start = bisect.bisect_left(keys, prefix)
+				stop = len(keys) if (successor := _successor(prefix)) is None else bisect.bisect_left(keys, successor, start)
+
+			if low is not None:
+				start = max(start, (bisect.bisect_left if inclusive[0] else bisect.bisect_right)(keys, low, start, stop))
+
+			if high is not None:
+				stop = min(stop, (bisect.bisect_right if inclusive[1] else bisect.bisect_left)(keys, high, start, stop))
+
+			return [(key, self.__contents__[key]) for key in keys[start:stop]]
+
+	def __touch__(self, *keys: str, cleared: bool = False) -> None:
+		self.__modifications__ += 1
+
+		if self.__modified_at__ is None:
+			self.__modified_at__ = time.monotonic()
+
+		if cleared:
+			self.__cleared__ = True
+			self.__dirty__.clear()
+
+		self.__dirty__.update(dict.fromkeys(keys))
+		self.__changed__(*keys, everything=cleared or len(keys) == 0, cleared=cleared)
+
+	def __changed__(self, *keys: str, everything: bool = False, cleared: bool = False) -> None:
+		self.__snapshot__ = None
+		self.__reseal__(*keys, everything=everything)
+		self.__resort__(*keys, everything=everything)
+		self.__clock__ += 1
+
+		if everything:
+			# Keys not written since are at the epoch version, so unknown changes move every key to a new version
+			self.__versions__.clear()
+			self.__epoch__ = self.__clock__
+
+		for key in keys:
+			if key in self.__contents__:
+				self.__versions__[key] = self.__clock__
+			else:
+				self.__versions__.pop(key, None)
+
+		for index in self.__indexes__.values():
+			if everything or index.root in keys:
+				self.__rebuild__(index)
+			elif index.root is None:
+				for key in keys:
+					index.update(key, self.__contents__.get(key, Index.MISSING))
+
+		if self.__feed__ is not None:
+			changes: list[tuple[Feed.ChangeType, typing.Optional[str]]] = [(Feed.ChangeType.CLEAR if cleared else Feed.ChangeType.RESET, None)] if everything else []
+			changes.extend((Feed.ChangeType.SET if key in self.__contents__ else Feed.ChangeType.DELETE, key) for key in keys)
+			self.__feed__.publish(changes)
+
+	def __rebuild__(self, index: Index.SectorIndex) -> None:
+		index.rebuild(self.__contents__ if index.root is None else self.__contents__.get(index.root))
+
+	def __invalidate__(self) -> None:
+		self.__rewrite__ = True
+		self.__touch__()
+
+	def __reseal__(self, *keys: str, everything: bool = False) -> None:
+		if self.__sealed__ is None:
+			return
+		elif everything:
+			self.__sealed__ = None
+			return
+
+		for key in keys:
+			self.__sealed__[zlib.crc32(key.encode('utf-8')) % len(self.__sealed__)] = None
+
+	def __apply__(self, record: dict[str, typing.Any]) -> None:
+		operation: str = record.get('op')
+
+		if operation == 'set':
+			self.__contents__[record['key']] = record['value']
+			self.__reseal__(record['key'])
+		elif operation == 'delete':
+			self.__contents__.pop(record['key'], None)
+			self.__reseal__(record['key'])
+		elif operation == 'clear':
+			self.__contents__.clear()
+			self.__reseal__(everything=True)
+		elif operation == 'batch':
+			for change in record['ops']:
+				self.__apply__(change)
+
+	def __version__(self, key: str) -> int:
+		return self.__versions__.get(key, self.__epoch__) if key in self.__contents__ else 0
+
+	def __commit__(self, operations: list[tuple[str, typing.Any, typing.Optional[int]]]) -> dict[str, int]:
+		if self.__file_lock__ is None or all(expect is None for _, _, expect in operations):
+			return self.__apply_batch__(operations)
+
+		# Shared conditional batches check versions against what other processes saved and are saved before the file lock is released,
+		# otherwise two processes could both pass their check and the later save would silently replace the other's write
+		with self.__save_lock__, self.__exclusive__():
+			self.__sync__()
+			versions: dict[str, int] = self.__apply_batch__(operations)
+			journal: typing.Optional[Journal.Journal] = self.__journal__
+			ticket: typing.Optional[int] = self.__persist__(self.__crypt__)
+
+		if ticket is not None:
+			journal.sync(ticket)
+
+		return versions
+
+	def __apply_batch__(self, operations: list[tuple[str, typing.Any, typing.Optional[int]]]) -> dict[str, int]:
+		with self.__lock__.writer():
+			for key, _, expect in operations:
+				if expect is not None and (version := self.__version__(key)) != expect:
+					raise VersionConflictError(f'Key \'{key}\' is at version {version}, expected {expect}')
+
+			changed: dict[str, None] = {}
+
+			for key, value, _ in operations:
+				if value is not Index.MISSING:
+					self.__contents__[key] = value
+					changed[key] = None
+				elif key in self.__contents__:
+					del self.__contents__[key]
+					changed[key] = None
+
+			if len(changed) > 0:
+				self.__touch__(*changed)
+
+			return {key: self.__version__(key) for key, _, _ in operations}
+
+	def __unchunk__(self, data: bytes, crypt: str) -> bool:
+		offset: int = len(_CHUNKED) + 1 + data[len(_CHUNKED)]
+		salt: bytes = data[len(_CHUNKED) + 1:offset]
+		iterations, count = _CHUNK_HEADER.unpack_from(data, offset)
+		offset += _CHUNK_HEADER.size
+		frames: list[bytes] = []
+
+		while offset + _CHUNK_FRAME.size <= len(data):
+			length: int = _CHUNK_FRAME.unpack_from(data, offset)[0]
+			frames.append(data[offset + _CHUNK_FRAME.size:offset + _CHUNK_FRAME.size + length])
+			offset += _CHUNK_FRAME.size + length
+
+		Misc.raise_if(offset != len(data) or len(frames) != count + 1, ValueError('Corrupt sector file'))
+		self.__cipher__ = SectorCipher(crypt, salt, iterations)
+		order: list[str] = json.loads(self.__cipher__.decrypt(frames[0]))
+		contents: dict[str, typing.Any] = {}
+		migrate: bool = False
+
+		for frame in frames[1:]:
+			payload: bytes = self.__cipher__.decrypt(frame)
+			stored: typing.Optional[Codec.Codec] = Codec.detect(payload)
+			Misc.raise_if(stored is None, ValueError('Unknown sector file format'))
+			contents.update(stored.decode(payload))
+			migrate = migrate or stored is not self.__codec__
+
+		# Chunks group keys by hash; the first frame restores insertion order
+		self.__contents__ = {key: contents[key] for key in order}
+		self.__sealed__ = None if migrate else frames[1:]
+		return migrate
+
+	def __chunk__(self, cipher: SectorCipher) -> bytes:
+		chunks: int = max(1, -(-len(self.__contents__) // MyDatabase.__CRYPT_CHUNK))
+		reuse: bool = cipher is self.__cipher__ and self.__sealed__ is not None and chunks // 4 <= len(self.__sealed__) <= chunks * 4
+		sealed: list[typing.Optional[bytes]] = list(self.__sealed__) if reuse else [None] * chunks
+		stale: dict[int, dict[str, typing.Any]] = {shard: {} for shard, frame in enumerate(sealed) if frame is None}
+
+		if len(stale) > 0:
+			for key, value in self.__contents__.items():
+				if (shard := zlib.crc32(key.encode('utf-8')) % len(sealed)) in stale:
+					stale[shard][key] = value
+
+		for shard, chunk in stale.items():
+			sealed[shard] = cipher.encrypt(self.__codec__.encode(chunk))
+
+		if cipher is self.__cipher__:
+			self.__sealed__ = sealed
+
+		frames: list[bytes] = [cipher.encrypt(json.dumps(list(self.__contents__)).encode('utf-8')), *sealed]
+		header: bytes = _CHUNKED + bytes((len(cipher.salt),)) + cipher.salt + _CHUNK_HEADER.pack(cipher.iterations, len(sealed))
+		return b''.join((header, *(_CHUNK_FRAME.pack(len(frame)) + frame for frame in frames)))
+
+	def __changes__(self) -> list[dict[str, typing.Any]]:
+		records: list[dict[str, typing.Any]] = [{'op': 'clear'}] if self.__cleared__ else []
+
+		for key in self.__dirty__:
+			if key in self.__contents__:
+				records.append({'op': 'set', 'key': key, 'value': self.__contents__[key]})
+			elif not self.__cleared__:
+				records.append({'op': 'delete', 'key': key})
+
+		self.__dirty__.clear()
+		self.__cleared__ = False
+		self.__modifications__ = 0
+		self.__modified_at__ = None
+		return records
+
+	def __checkpoint__(self, crypt: typing.Optional[str]) -> None:
+		cipher: typing.Optional[SectorCipher] = self.__cipher__ if crypt == self.__crypt__ else None if crypt is None else SectorCipher(crypt)
+
+		with self.__lock__.writer():
+			payload: bytes = _CHECKPOINT_HEADER.pack(_CHECKPOINT, self.__generation__ + 1) + (self.__codec__.encode(self.__contents__) if cipher is None else self.__chunk__(cipher))
+			self.__changes__()
+			# Written with another password; the next save rewrites the snapshot with this sector's own
+			self.__rewrite__ = cipher is not self.__cipher__
+
+		try:
+			Journal.atomic_write(self.__handle__.filepath, payload)
+			self.__snapshot_size__ = len(payload)
+			self.__generation__ += 1
+
+			if self.__journal__ is not None:
+				self.__journal__.reset()
+
+			if self.encrypted and os.path.isfile(journal := MyDatabase.__journal_for(self.__handle__)):
+				os.remove(journal)
+		except BaseException:
+			with self.__lock__.writer():
+				self.__rewrite__ = True
+				self.__touch__()
+
+			raise
+		finally:
+			# Bumped even after a failure, as other processes cannot tell how far it got
+			self.__stamped__(True)
+
+	def __store__(self, value: typing.Any) -> typing.Any:
+		return freeze(value) if self.__read_mode__ == ReadMode.FROZEN else value
+
+	def __read__(self, value: typing.Any) -> typing.Any:
+		return value if self.__read_mode__ == ReadMode.FROZEN else copy.deepcopy(value)
+
+	def __unload__(self) -> None:
+		# Waits for a running save (autosave, eviction) instead of closing its files underneath it
+		with self.__save_lock__:
+			self.__handle__ = None
+			self.__contents__ = None
+
+			if self.__journal__ is not None:
+				self.__journal__.close()
+				self.__journal__ = None
+
+			if self.__file_lock__ is not None:
+				self.__file_lock__.close()
+				self.__file_lock__ = None
+
+			if self.__feed__ is not None:
+				self.__feed__.close()
+				self.__feed__ = None
+
+	def close(self) -> None:
+		"""
+		Releases this sector handle\n
+		Handles from 'MyDatabase.open' and 'MyDatabase.create' stay loaded until released by every user and evicted; other handles are closed immediately
+		"""
+
+		if not type(self).__release_sector_handle(self):
+			self.__unload__()
+
+	def save(self, *, crypt: typing.Optional[str] = ...) -> None:
+		"""
+		Saves cached data to file\n
+		The keys changed since the last save are appended to the journal, sharing fsync calls with concurrent saves;
+		a changed password or an outgrown journal write a snapshot instead\n
+		While shared with other processes, changes they saved are applied first; keys changed here replace theirs
+		:param crypt: The password to encrypt with, ... for current password or None for plain JSON
+		:raises IOError: If sector is closed
+		"""
+
+		if self.closed:
+			raise IOError('Operation on closed sector')
+		elif self.pending_modifications == 0 and crypt is ...:
+			return
+
+		crypt = self.__crypt__ if crypt is ... else crypt
+
+		with self.__save_lock__, self.__exclusive__():
+			self.__sync__()
+			journal: typing.Optional[Journal.Journal] = self.__journal__
+			ticket: typing.Optional[int] = self.__persist__(crypt)
+
+		if ticket is not None:
+			journal.sync(ticket)
+
+	def __persist__(self, crypt: typing.Optional[str]) -> typing.Optional[int]:
+		# Callers hold the save lock and the file lock exclusively, after catching up; returns the journal ticket still to be synced
+		journal: typing.Optional[Journal.Journal] = self.__journal__
+
+		if self.__file_lock__ is not None and journal is not None:
+			journal.refresh()
+
+			if journal.size > self.__offset__:
+				# Torn by a process that died while appending; later records would never be read past it
+				journal.truncate(self.__offset__)
+
+		if crypt != self.__crypt__ or journal is None or self.__rewrite__ or self.__cleared__:
+			self.__checkpoint__(crypt)
+			return None
+
+		with self.__lock__.writer():
+			records: list[dict[str, typing.Any]] = self.__changes__()
+
+		if len(records) == 0:
+			return None
+
+		try:
+			# One frame per save, so a torn write never leaves part of a batch applied; a new journal first records the snapshot it extends
+			header: tuple[dict[str, typing.Any], ...] = ({'op': 'checkpoint', 'generation': self.__generation__},) if journal.size == 0 else ()
+			ticket: int = journal.write((*header, {'op': 'batch', 'ops': records}))
+		except BaseException:
+			with self.__lock__.writer():
+				self.__rewrite__ = True
+				self.__touch__()
+
+			raise
+		finally:
+			self.__stamped__(False)
+
+		if journal.size > max(MyDatabase.__JOURNAL_MIN, self.__snapshot_size__ * MyDatabase.__JOURNAL_RATIO):
+			self.__checkpoint__(crypt)
+			return None
+
+		return ticket
+
+	def compact(self) -> None:
+		"""
+		Writes a full snapshot of this sector and empties its journal
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		with self.__save_lock__, self.__exclusive__():
+			self.__sync__()
+			self.__checkpoint__(self.__crypt__)
+
+	def refresh(self) -> bool:
+		"""
+		Applies changes other processes saved to this sector since it was loaded or last refreshed\n
+		Costs a single small read unless the sector changed; unsaved changes made here are kept
+		:return: Whether the sector was changed by another process
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		file_lock: typing.Optional[FileLock.FileLock] = self.__file_lock__
+
+		if file_lock is None or file_lock.stamp == self.__stamp__:
+			return False
+
+		with self.__save_lock__, file_lock.shared():
+			return self.__sync__()
+
+	def writer(self) -> SectorWriterLock:
+		"""
+		Acquires this sector's internal writer lock\n
+		Modification count will be increased regardless of whether a write operation occurred, indexes are rebuilt and every key version changes on release and the next save writes a full snapshot\n
+		Prefer 'MyDatabase.batch' for multi-key writes
+		:return: The writer lock
+		"""
+
+		return SectorWriterLock(self, self.__lock__)
+
+	def batch(self) -> SectorBatch:
+		"""
+		Starts an atomic multi-key write
+		:return: An empty batch for this sector
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		return SectorBatch(self)
+
+	def get_versioned(self, *keys: str) -> Concurrent.Promise[dict[str, tuple[typing.Any, int]]]:
+		"""
+		Reads keys together with their versions under a single reader lock acquisition\n
+		A key's version changes on every write to it; pass it as 'expect' to a batch operation to write only if the key is unchanged
+		:param keys: The keys
+		:return: The value and version of each key (None and 0 for missing keys)
+		:raises TypeError: If a key is not a string
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(all(isinstance(key, str) for key in keys), TypeError('JSON keys must be a string'))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> dict[str, tuple[typing.Any, int]]:
+			with self.__lock__.reader():
+				return {key: (self.__read__(self.__contents__.get(key)), self.__version__(key)) for key in keys}
+
+		return __operation__()
+
+	def __changefeed__(self) -> Feed.ChangeFeed:
+		with self.__lock__.writer():
+			if self.__feed__ is None:
+				self.__feed__ = Feed.ChangeFeed()
+
+			return self.__feed__
+
+	def subscribe(self, callback: typing.Callable[[tuple[Feed.ChangeEvent, ...]], None], *, since: typing.Optional[int] = None, epoch: typing.Optional[str] = None, prefix: typing.Optional[str] = None, coalesce: bool = True) -> Feed.Subscription:
+		"""
+		Delivers this sector's change events to a callback on a background dispatcher\n
+		Events are numbered from the first use of this sector's feed; the last 'DATABASE_FEED_HISTORY' events (default 4096) are kept to resume from.
+		A sector loaded again (after eviction or a reload) numbers its events under a new 'feed_epoch', so resuming from an older position raises.
+		Events raised while a delivery is pending are delivered together and, when coalescing, only the latest event of each key is kept\n
+		Subscriptions end when the sector is unloaded, so keep the handle opened while subscribed
+		:param callback: The callback receiving each batch of events
+		:param since: The sequence number to resume after (the missed events are delivered first) or None for new events only
+		:param epoch: The feed epoch 'since' was numbered by (required unless it is None or 0)
+		:param prefix: The prefix of the keys to receive events for or None for all keys ('CLEAR' and 'RESET' events are always received)
+		:param coalesce: Whether to keep only the latest pending event of each key
+		:return: The subscription
+		:raises IOError: If sector is closed
+		:raises Feed.SequenceExpiredError: If the events following 'since' are no longer kept or were numbered by another feed epoch
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		return self.__changefeed__().subscribe(callback, since=since, epoch=epoch, prefix=prefix, coalesce=coalesce)
+
+	def changes(self, since: int = 0, epoch: typing.Optional[str] = None) -> tuple[Feed.ChangeEvent, ...]:
+		"""
+		Gets the change events following a sequence number without subscribing
+		:param since: The sequence number of the last event already seen
+		:param epoch: The feed epoch 'since' was numbered by (required unless it is 0)
+		:return: The events in order
+		:raises IOError: If sector is closed
+		:raises Feed.SequenceExpiredError: If the events following 'since' are no longer kept or were numbered by another feed epoch
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		return self.__changefeed__().since(since, epoch)
+
+	def reader(self) -> Synchronization.ReaderWriterLock.Lock:
+		"""
+		Acquires this sector's internal reader lock
+		:return: The reader lock
+		"""
+
+		return self.__lock__.reader()
+
+	def save_async(self, *, crypt: typing.Optional[str] = ...) -> Concurrent.Promise[None]:
+		"""
+		Saves cached data to file on the shared database I/O pool\n
+		:param crypt: The password to encrypt with, ... for current password or None for plain JSON
+		:return: A promise fulfilled once the file is written
+		"""
+
+		promise: Concurrent.Promise[None] = Concurrent.Promise()
+		future: concurrent.futures.Future = MyDatabase.__EXECUTOR.submit(self.save, crypt=crypt)
+		future.add_done_callback(lambda done: promise.resolve(None) if done.exception() is None else promise.throw(done.exception()))
+		return promise
+
+	def clear(self) -> Concurrent.Promise[None]:
+		"""
+		Clears all data in this sector
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> None:
+			with self.__lock__.writer():
+				self.__contents__.clear()
+				self.__touch__(cleared=True)
+
+		return __operation__()
+
+	def update(self, mapping: typing.Mapping[str, typing.Any]) -> Concurrent.Promise[None]:
+		"""
+		Updates the internal dictionary with the key-value pairs from 'mapping'
+		:param mapping: The dictionary to update with
+		:raises TypeError: If 'mapping' is not a Mapping
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(mapping, typing.Mapping), TypeError(f'Specified object must be a mapping instance, got object of type \'{type(mapping).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> None:
+			values: dict[str, typing.Any] = {key: self.__store__(value) for key, value in mapping.items()}
+
+			with self.__lock__.writer():
+				self.__contents__.update(values)
+				self.__touch__(*values)
+
+		return __operation__()
+
+	def set(self, mapping: typing.Mapping[str, typing.Any]) -> Concurrent.Promise[None]:
+		"""
+		Sets the internal dictionary to the key-value pairs from 'mapping'\n
+		Old data is cleared and replaced with data in 'mapping'
+		:param mapping: The dictionary to update with
+		:raises TypeError: If 'mapping' is not a Mapping
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(mapping, typing.Mapping), TypeError(f'Specified object must be a mapping instance, got object of type \'{type(mapping).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> None:
+			values: dict[str, typing.Any] = {key: self.__store__(value) for key, value in mapping.items()}
+
+			with self.__lock__.writer():
+				self.__contents__.clear()
+				self.__contents__.update(values)
+				self.__touch__(*values, cleared=True)
+
+		return __operation__()
+
+	def length(self) -> Concurrent.Promise[int]:
+		"""
+		:return: The length of this sector
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> typing.Any:
+			with self.__lock__.reader():
+				return len(self.__contents__)
+
+		return __operation__()
+
+	def get_or_default(self, key: str, default: typing.Any = None) -> Concurrent.Promise[typing.Any]:
+		"""
+		Gets and returns the item with the specified key or 'default' if key does not exist
+		:param key: The key
+		:param default: The default value
+		:return: The bound item or 'default'
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> typing.Any:
+			with self.__lock__.reader():
+				return self.__read__(self.__contents__.get(str(key), default))
+
+		return __operation__()
+
+	def get_or_insert(self, key: str, default: typing.Any = None) -> Concurrent.Promise[typing.Any]:
+		"""
+		Gets and returns the item with the specified key or inserts and returns 'default' if key does not exist
+		:param key: The key
+		:param default: The default value
+		:return: The bound item
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> typing.Any:
+			value: typing.Any = self.__store__(default)
+
+			with self.__lock__.writer():
+				if str(key) in self.__contents__:
+					return self.__read__(self.__contents__[str(key)])
+
+				self.__contents__[str(key)] = value
+				self.__touch__(str(key))
+				return self.__read__(value)
+
+		return __operation__()
+
+	def pop(self, key: str, default: typing.Any = ...) -> Concurrent.Promise[typing.Any]:
+		"""
+		Removes and returns the item with the specified key or 'default' if key does not exist
+		:param key: The key
+		:param default: The default value
+		:return: The bound item
+		:raises TypeError: If 'key' is not a string
+		:raises IOError: If sector is closed
+		:raises KeyError: If 'default' is not specified and key is not found
+		"""
+
+		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> typing.Any:
+			with self.__lock__.writer():
+				if str(key) in self.__contents__:
+					value: typing.Any = self.__contents__.pop(str(key))
+					self.__touch__(str(key))
+					return value
+				elif default is ...:
+					raise KeyError(key)
+				else:
+					return default
+
+		return __operation__()
+
+	def pop_last(self) -> Concurrent.Promise[tuple[str, typing.Any]]:
+		"""
+		Gets and returns the last key-value pair added to this sector
+		:return: The last added key-value pair
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> tuple[str, typing.Any]:
+			with self.__lock__.writer():
+				key, value = self.__contents__.popitem()
+				self.__touch__(key)
+				return key, value
+
+		return __operation__()
+
+	def keys(self) -> Concurrent.Promise[tuple[str, ...]]:
+		"""
+		:return: The keys stored in this sector
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> tuple[str, ...]:
+			with self.__lock__.reader():
+				return tuple(self.__contents__.keys())
+
+		return __operation__()
+
+	def values(self) -> Concurrent.Promise[tuple[typing.Any, ...]]:
+		"""
+		:return: The values stored in this sector
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> tuple[typing.Any, ...]:
+			with self.__lock__.reader():
+				return tuple(self.__contents__.values())
+
+		return __operation__()
+
+	def create_index(self, name: str, path: str | tuple[str, ...], *, root: typing.Optional[str] = None) -> Concurrent.Promise[None]:
+		"""
+		Declares a secondary index on a nested field of this sector's records, maintained on every write\n
+		Records are the top-level values or, with 'root', the values of the mapping under that top-level key (re-indexed whenever that key is written)
+		:param name: The index name
+		:param path: The dotted field path ('Meta Data.3. Sector') or a tuple of keys, relative to each record
+		:param root: The top-level key holding the records or None to index top-level values
+		:raises TypeError: If 'name' is not a string
+		:raises ValueError: If an index with the same name but another definition exists
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(isinstance(name, str), TypeError(f'Index names must be a string, got object of type \'{type(name).__name__}\''))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> None:
+			with self.__lock__.writer():
+				if (existing := self.__indexes__.get(name)) is not None:
+					Misc.raise_ifn(existing.path == path and existing.root == root, ValueError(f'Index \'{name}\' already exists with another definition'))
+					return
+
+				index: Index.SectorIndex = Index.SectorIndex(path, root=root)
+				self.__rebuild__(index)
+				self.__indexes__[name] = index
+
+		return __operation__()
+
+	def drop_index(self, name: str) -> Concurrent.Promise[None]:
+		"""
+		Removes a secondary index
+		:param name: The index name
+		:raises KeyError: If the index does not exist
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> None:
+			with self.__lock__.writer():
+				del self.__indexes__[name]
+
+		return __operation__()
+
+	def query(self, index: str, value: typing.Any = ..., *, low: typing.Any = None, high: typing.Any = None, inclusive: tuple[bool, bool] = (True, True), limit: typing.Optional[int] = None) -> Concurrent.Promise[dict[str, typing.Any]]:
+		"""
+		Looks up records through a secondary index without scanning the sector\n
+		Pass 'value' for an equality lookup or 'low'/'high' for a range lookup ordered by field value
+		:param index: The index name
+		:param value: The field value to match (list fields match any element) or ... for a range lookup
+		:param low: The lower range bound or None if unbounded
+		:param high: The upper range bound or None if unbounded
+		:param inclusive: Whether the lower and upper range bounds are inclusive
+		:param limit: The maximum number of records returned or None for all
+		:return: The matching records by key
+		:raises KeyError: If the index does not exist
+		:raises TypeError: If a range bound cannot be indexed or the bounds are of different types
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> dict[str, typing.Any]:
+			with self.__lock__.reader():
+				Misc.raise_ifn(index in self.__indexes__, KeyError(f'No such index: \'{index}\''))
+				selected: Index.SectorIndex = self.__indexes__[index]
+				keys: list[str] = selected.equal(value) if value is not ... else selected.range(low, high, inclusive=inclusive)
+				records: typing.Mapping[str, typing.Any] = self.__contents__ if selected.root is None else self.__contents__.get(selected.root, {})
+				return {key: self.__read__(records[key]) for key in (keys if limit is None else keys[:limit])}
+
+		return __operation__()
+
+	def scan(self, low: typing.Optional[str] = None, high: typing.Optional[str] = None, *, prefix: typing.Optional[str] = None, inclusive: tuple[bool, bool] = (True, True), batch: int = 256) -> MyDatabaseIterator:
+		"""
+		Iterates the key-value pairs of this sector in key order, optionally restricted to a key range or prefix\n
+		Keys are located by bisecting a sorted key list kept up to date on every write instead of sorting on every scan
+		:param low: The lowest key or None if unbounded
+		:param high: The highest key or None if unbounded
+		:param prefix: The prefix all returned keys start with or None
+		:param inclusive: Whether the lower and upper bounds are inclusive
+		:param batch: The number of values copied at a time
+		:return: The iterator
+		:raises TypeError: If a bound or the prefix is not a string
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_ifn(all(bound is None or isinstance(bound, str) for bound in (low, high, prefix)), TypeError('Scan bounds must be strings'))
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		return MyDatabaseIterator(self, low, high, prefix=prefix, inclusive=inclusive, ordered=True, batch=batch)
+
+	def stream(self) -> Stream.LinqStream[tuple[str, typing.Any]]:
+		"""
+		:return: This collection as a LINQ stream over a snapshot taken when the stream is first consumed
+		"""
+
+		return Stream.LinqStream(iter(self))
+
+	def copy(self) -> Concurrent.Promise[dict[str, typing.Any]]:
+		"""
+		In 'ReadMode.FROZEN' the copy is an immutable snapshot shared by all readers until the next write
+		:return: A copy of this sector's internal mapping
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		@InlineFunction
+		def __operation__() -> dict[str, typing.Any]:
+			with self.__lock__.reader():
+				if self.__read_mode__ != ReadMode.FROZEN:
+					return copy.deepcopy(self.__contents__)
+				elif self.__snapshot__ is None:
+					self.__snapshot__ = FrozenDict(self.__contents__)
+
+				return self.__snapshot__
+
+		return __operation__()
+
+	@property
+	def closed(self) -> bool:
+		"""
+		:return: Whether the sector is closed
+		"""
+
+		return self.__handle__ is None or not self.exists
+
+	@property
+	def sequence(self) -> int:
+		"""
+		:return: The sequence number of the latest change event or 0 if the change feed is unused
+		"""
+
+		return 0 if self.__feed__ is None else self.__feed__.sequence
+
+	@property
+	def feed_epoch(self) -> str:
+		"""
+		:return: The epoch numbering this sector's change events (pass it with a sequence number to resume from)
+		:raises IOError: If sector is closed
+		"""
+
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		return self.__changefeed__().epoch
+
+	@property
+	def exists(self) -> bool:
+		"""
+		:return: Whether the sector file exists
+		"""
+
+		return self.__handle__.exists()
+
+	@property
+	def encrypted(self) -> bool:
+		"""
+		:return: Whether this sector is encrypted
+		"""
+
+		return self.__crypt__ is not None
+
+	@property
+	def pending_modifications(self) -> int:
+		"""
+		:return: The number of writes acquired since last save
+		"""
+
+		return self.__modifications__
+
+	@property
+	def unsaved_seconds(self) -> float:
+		"""
+		:return: The number of seconds since the oldest modification not yet saved (0 if there is none)
 		"""
 
-		return cls.__file_for(name).exists()
+		modified: typing.Optional[float] = self.__modified_at__
+		return 0 if modified is None else time.monotonic() - modified
 
-	@classmethod
-	def open(cls: type[MyDatabase], name: str, *, create_if_not_found: bool = True, crypt: typing.Optional[str] = None) -> MyDatabase:
+	@property
+	def codec(self) -> str:
 		"""
-		Opens the specified sector for IO operators
-		:param name: The sector name
-		:param create_if_not_found: Whether sector file will be created if not found
-		:param crypt: The password to decrypt with if encrypted or None if plain JSON
-		:return: The new sector interface
-		:raises AssertionError: If database is not loaded
-		:raises NameError: If sector name is invalid
-		:raises FileNotFoundError: If sector does not exist
+		:return: The name of the codec this sector is saved with
 		"""
 
-		assert cls.is_loaded(), 'Database not loaded'
+		return self.__codec__.NAME
 
-		with cls.__SECTOR_LOCK:
-			sector: MyDatabase = cls.__SECTORS.get(name)
+	@property
+	def indexes(self) -> tuple[str, ...]:
+		"""
+		:return: The names of this sector's secondary indexes
+		"""
 
-			if sector is None:
-				file: FileSystem.File = cls.__file_for(name)
+		return tuple(self.__indexes__.keys())
 
-				if not file.exists() and create_if_not_found:
-					return cls.create(name)
+	@property
+	def journal_size(self) -> int:
+		"""
+		:return: The size in bytes of this sector's journal
+		"""
 
-				Misc.raise_ifn(file.exists(), FileNotFoundError(f'No such sector: \'{name}\''))
-				sector = MyDatabase(file, crypt=crypt)
-				cls.__SECTORS[name] = sector
-				return sector
-			else:
-				return sector
+		return 0 if self.__journal__ is None else self.__journal__.size
 
-	@classmethod
-	def create(cls: type[MyDatabase], name: str, *, crypt: typing.Optional[str] = None) -> MyDatabase:
+	@property
+	def footprint(self) -> int:
 		"""
-		Creates a new sector in the database
-		:param name: The sector name
-		:param crypt: The password to decrypt with if encrypted or None if plain JSON
-		:return: The new sector interface
-		:raises AssertionError: If database is not loaded
-		:raises NameError: If sector name is invalid
-		:raises FileExistsError: If sector already exists
+		:return: The approximate number of bytes this sector holds in memory, estimated from its snapshot and journal sizes
 		"""
 
-		assert cls.is_loaded(), 'Database not loaded'
+		return self.__snapshot_size__ + self.journal_size
 
-		with cls.__SECTOR_LOCK:
-			file: FileSystem.File = cls.__file_for(name)
-			Misc.raise_if(file.exists() or name in cls.__SECTORS, FileExistsError('Sector already exists'))
-			file.parent.create()
-			file.create()
-			return MyDatabase(file, crypt=crypt)
+	@property
+	def read_mode(self) -> ReadMode:
+		"""
+		:return: How reads of this sector hand out values
+		"""
 
-	@classmethod
-	def delete(cls: type[MyDatabase], name: str, *, force_close_handles: bool = False) -> None:
+		return self.__read_mode__
+
+	@property
+	def password(self) -> str:
 		"""
-		Deletes a sector from the database
-		:param name: The sector name
-		:param force_close_handles: If false, will raise an error if this sector is opened, otherwise, closes all handles to this sector
-		:raises AssertionError: If database is not loaded
-		:raises NameError: If sector name is invalid
-		:raises IOError: If sector is opened and 'force_close_handles' is False
-		:raises FileNotFoundError: If sector does not exist
+		:return: The password used to encrypt this sector
 		"""
 
-		assert cls.is_loaded(), 'Database not loaded'
+		return self.__crypt__
 
-		with cls.__SECTOR_LOCK:
-			file: FileSystem.File = cls.__file_for(name)
-			sector: MyDatabase = cls.__SECTORS.pop(name, None)
 
-			if sector is not None and not force_close_handles:
-				raise IOError('Sector is opened')
-			elif sector is not None and force_close_handles:
-				sector.close()
-				file.delete()
-			elif not file.exists():
-				raise FileNotFoundError(f'No such sector: \'{name}\'')
-			else:
-				file.delete()
+class PartitionedDatabase:
+	"""
+	Sector whose keys are hash-sharded across chunk files in a '<sector>.parts' directory described by a small manifest\n
+	Chunks load on first access and are evicted least-recently-used, or once idle, writing them back if modified, so memory tracks the working set rather than the dataset\n
+	Each chunk and the manifest are replaced atomically on save; only modified chunks are written. A modified chunk written back on eviction is durable from then on,
+	and the manifest is rewritten with it so its counts always match the chunk files
+	"""
 
-	@classmethod
-	def unload(cls: type[MyDatabase], *, save: bool = True) -> None:
+	FORMAT: int = 1
+	MANIFEST: str = 'manifest.json'
+
+	@staticmethod
+	def is_partitioned(directory: str) -> bool:
 		"""
-		Closes the database - All sector handles are closed
-		:param save: Whether to save sectors before close
+		:param directory: The '<sector>.parts' directory
+		:return: Whether the directory holds a partitioned sector manifest
 		"""
 
-		with cls.__SECTOR_LOCK:
-			for sector in tuple(v for k, v in cls.__SECTORS.items()):
-				if not sector.closed:
-					if save:
-						sector.save()
+		return os.path.isfile(os.path.join(directory, PartitionedDatabase.MANIFEST))
 
-					sector.close()
+	@staticmethod
+	def initialize(directory: str, partitions: int) -> None:
+		"""
+		Writes the manifest of a new, empty partitioned sector
+		:param directory: The '<sector>.parts' directory
+		:param partitions: The number of chunk files keys are sharded across
+		"""
 
-			cls.__SECTORS.clear()
-			cls.__ROOT = ...
+		assert isinstance(partitions, int) and 0 < partitions <= 0x10000, 'Invalid partition count'
+		os.makedirs(directory, exist_ok=True)
+		Journal.atomic_write(os.path.join(directory, PartitionedDatabase.MANIFEST), json.dumps({'format': PartitionedDatabase.FORMAT, 'sharding': 'crc32', 'partitions': partitions, 'counts': [0] * partitions}).encode('utf-8'))
 
-	@classmethod
-	def is_loaded(cls: type[MyDatabase]) -> bool:
+	def __init__(self, directory: str, *, read_mode: ReadMode = ReadMode.COPY, max_chunks: typing.Optional[int] = None, idle: typing.Optional[float] = None, executor: typing.Optional[concurrent.futures.Executor] = None, on_release: typing.Optional[typing.Callable[[PartitionedDatabase], bool]] = None):
 		"""
-		:return: Whether database root exists
+		Sector whose keys are hash-sharded across chunk files in a '<sector>.parts' directory described by a small manifest\n
+		- Constructor -
+		:param directory: The '<sector>.parts' directory
+		:param read_mode: How reads hand out stored values
+		:param max_chunks: The maximum number of chunks held in memory or None to read 'DATABASE_PARTITION_CACHE' (default 16)
+		:param idle: The seconds after which an unused chunk is evicted or None to read 'DATABASE_PARTITION_IDLE' (default 300)
+		:param executor: The pool 'save_async' runs on or None to save on a new thread
+		:param on_release: A callback invoked with this sector on close returning whether it stays loaded for other users
+		:raises ValueError: If the manifest format is not supported
 		"""
 
-		return isinstance(cls.__ROOT, FileSystem.Directory) and cls.__ROOT.exists()
+		assert PartitionedDatabase.is_partitioned(directory), 'Invalid partitioned sector'
 
-	def __init__(self, file: FileSystem.File, *, crypt: typing.Optional[str] = None):
-		assert isinstance(file, FileSystem.File) and file.exists() and file.extension == 'json', 'Invalid file'
-		assert crypt is None or (isinstance(crypt, str) and len(crypt) >= 8), 'Invalid file crypt key'
-		self.__handle__: typing.Optional[FileSystem.File] = file
-		self.__contents__: dict[str, typing.Any] = {}
-		self.__crypt__: typing.Optional[None] = crypt
-		self.__lock__: Synchronization.ReaderWriterLock = Synchronization.ReaderWriterLock()
+		with open(os.path.join(directory, PartitionedDatabase.MANIFEST)) as source:
+			manifest: dict[str, typing.Any] = json.load(source)
+
+		Misc.raise_ifn(manifest.get('format') == PartitionedDatabase.FORMAT and manifest.get('sharding') == 'crc32', ValueError('Unsupported partitioned sector manifest'))
+		self.__directory__: typing.Optional[str] = str(directory)
+		self.__partitions__: int = int(manifest['partitions'])
+		self.__counts__: list[int] = [int(count) for count in manifest['counts']]
+		self.__written__: list[int] = list(self.__counts__)
+		self.__chunks__: collections.OrderedDict[int, dict[str, typing.Any]] = collections.OrderedDict()
+		self.__accessed__: dict[int, float] = {}
+		self.__dirty__: set[int] = set()
+		self.__lock__: threading.RLock = threading.RLock()
 		self.__modifications__: int = 0
-		data: str = file.single_read()
-
-		if len(data) > 0 and self.encrypted:
-			password: bytes = base64.b64encode(crypt.encode())
-			remaining: int = max(0, 32 - len(password))
-			password += b'\x00' * remaining
-			password = password[:32]
-			payload: bytes = base64.b64decode(file.single_read(True))
-			mac_length: int = int.from_bytes(payload[:8], 'big', signed=False)
-			nonce_length: int = int.from_bytes(payload[8:16], 'little', signed=False)
-			mac: bytes = payload[16:16 + mac_length]
-			cipher: bytes = payload[16 + mac_length:-nonce_length]
-			nonce: bytes = payload[-nonce_length:]
-			crypter = Crypto.Cipher.AES.new(password, Crypto.Cipher.AES.MODE_EAX, nonce=nonce)
-
-			try:
-				payload = crypter.decrypt_and_verify(cipher, mac)
-				self.__contents__ = json.loads(payload.decode('utf-8'))
-			except ValueError:
-				raise PermissionError('Crypt key is incorrect')
-		elif len(data) > 0:
-			self.__contents__ = json.loads(data)
-		else:
-			self.__contents__ = {}
+		self.__modified_at__: typing.Optional[float] = None
+		self.__read_mode__: ReadMode = ReadMode(read_mode)
+		self.__max_chunks__: int = max(1, int(os.getenv('DATABASE_PARTITION_CACHE', '16')) if max_chunks is None else int(max_chunks))
+		self.__idle__: float = float(os.getenv('DATABASE_PARTITION_IDLE', '300')) if idle is None else float(idle)
+		self.__executor__: typing.Optional[concurrent.futures.Executor] = executor
+		self.__on_release__: typing.Optional[typing.Callable[[PartitionedDatabase], bool]] = on_release
 
 	def __len__(self) -> int:
 		"""
 		:return: The length of this sector
 		"""
 
-		return self.length().wait()
+		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+
+		with self.__lock__:
+			return sum(self.__counts__)
 
 	def __repr__(self) -> str:
 		return str(self)
 
 	def __str__(self) -> str:
-		return str({k: v for k, v in self})
+		return f'<PartitionedDatabase {self.__directory__} ({self.__partitions__} partitions)>'
 
-	def __setitem__(self, key: str, value: typing.Any) -> Concurrent.ThreadedPromise[None]:
+	def __setitem__(self, key: str, value: typing.Any) -> None:
 		"""
 		Sets the specified key to the specified value
 		:param key: The key
@@ -230,39 +1918,33 @@ class MyDatabase:
 
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
+		value = self.__store__(value)
 
-		@Concurrent.ThreadedFunction
-		def __operation__() -> None:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				self.__contents__[str(key)] = value
-
-		return __operation__()
+		with self.__lock__:
+			self.__chunk__(shard := self.__shard__(str(key)))[str(key)] = value
+			self.__touch__(shard)
 
-	def __delitem__(self, key: str) -> None | Concurrent.ThreadedPromise[None]:
+	def __delitem__(self, key: str) -> None:
 		"""
 		Deletes the specified key from the sector
 		:param key: The key
 		:raises TypeError: If 'key' is not a string
 		:raises IOError: If sector is closed
+		:raises KeyError: If the key does not exist
 		"""
 
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
-		def __operation__() -> None:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				del self.__contents__[str(key)]
-
-		return __operation__()
+		with self.__lock__:
+			del self.__chunk__(shard := self.__shard__(str(key)))[str(key)]
+			self.__touch__(shard)
 
-	def __contains__(self, key: str) -> bool | Concurrent.ThreadedPromise[bool]:
+	def __contains__(self, key: str) -> bool:
 		"""
 		Checks if the key exists in this sector map
 		:param key: The key
-		:return Whether 'key' exists:
+		:return: Whether 'key' exists
 		:raises TypeError: If 'key' is not a string
 		:raises IOError: If sector is closed
 		"""
@@ -270,100 +1952,194 @@ class MyDatabase:
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
-		def __operation__() -> bool:
-			with self.__lock__.reader():
-				return str(key) in self.__contents__
-
-		return __operation__()
+		with self.__lock__:
+			return str(key) in self.__chunk__(self.__shard__(str(key)))
 
-	def __getitem__(self, key: str) -> typing.Any | Concurrent.ThreadedPromise[typing.Any]:
+	def __getitem__(self, key: str) -> typing.Any:
 		"""
 		Gets the value of the specified value
 		:param key: The key
+		:return: A copy of the bound value
 		:raises TypeError: If 'key' is not a string
 		:raises IOError: If sector is closed
+		:raises KeyError: If the key does not exist
 		"""
 
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
-		def __operation__() -> typing.Any:
-			with self.__lock__.reader():
-				return copy.deepcopy(self.__contents__[str(key)])
+		with self.__lock__:
+			value: typing.Any = self.__chunk__(self.__shard__(str(key)))[str(key)]
 
-		return __operation__()
+		return self.__read__(value)
 
-	def __iter__(self) -> MyDatabaseIterator:
+	def __iter__(self) -> typing.Iterator[tuple[str, typing.Any]]:
 		"""
-		Iterates the key-value pairs of this sector
+		Iterates the key-value pairs of this sector one chunk at a time
 		:raises IOError: If sector is closed
 		"""
 
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
-		return MyDatabaseIterator(self)
+
+		for shard in range(self.__partitions__):
+			with self.__lock__:
+				items: tuple[tuple[str, typing.Any], ...] = tuple(self.__chunk__(shard).items())
+
+			for key, value in items:
+				yield key, self.__read__(value)
+
+	def __shard__(self, key: str) -> int:
+		return zlib.crc32(key.encode('utf-8')) % self.__partitions__
+
+	def __chunk_path__(self, shard: int) -> str:
+		return os.path.join(self.__directory__, f'{shard:04x}.json')
+
+	def __chunk__(self, shard: int, load: bool = True) -> dict[str, typing.Any]:
+		now: float = time.monotonic()
+		chunk: typing.Optional[dict[str, typing.Any]] = self.__chunks__.get(shard)
+		self.__accessed__[shard] = now
+
+		if chunk is not None:
+			self.__chunks__.move_to_end(shard)
+			return chunk
+		elif load and os.path.isfile(path := self.__chunk_path__(shard)):
+			with open(path) as source:
+				chunk = json.load(source)
+
+			chunk = {key: self.__store__(value) for key, value in chunk.items()} if self.__read_mode__ == ReadMode.FROZEN else chunk
+		else:
+			chunk = {}
+
+		self.__chunks__[shard] = chunk
+		self.__counts__[shard] = len(chunk)
+		self.__evict__(now)
+		return chunk
+
+	def __evict__(self, now: float) -> None:
+		written: bool = False
+
+		for shard in tuple(self.__chunks__.keys())[:-1]:
+			if len(self.__chunks__) <= self.__max_chunks__ and now - self.__accessed__[shard] < self.__idle__:
+				break
+
+			if shard in self.__dirty__:
+				self.__write__(shard)
+				written = True
+
+			del self.__chunks__[shard]
+			del self.__accessed__[shard]
+
+		if written:
+			self.__manifest__()
+
+	def __write__(self, shard: int) -> None:
+		Journal.atomic_write(self.__chunk_path__(shard), json.dumps(self.__chunks__[shard]).encode('utf-8'))
+		self.__dirty__.discard(shard)
+		self.__written__[shard] = len(self.__chunks__[shard])
+
+	def __manifest__(self) -> None:
+		# Counts of chunks modified but not yet written stay at their on-disk values
+		Journal.atomic_write(os.path.join(self.__directory__, PartitionedDatabase.MANIFEST), json.dumps({'format': PartitionedDatabase.FORMAT, 'sharding': 'crc32', 'partitions': self.__partitions__, 'counts': self.__written__}).encode('utf-8'))
+
+	def __touch__(self, *shards: int) -> None:
+		self.__modifications__ += 1
+
+		if self.__modified_at__ is None:
+			self.__modified_at__ = time.monotonic()
+
+		for shard in shards:
+			self.__dirty__.add(shard)
+			self.__counts__[shard] = len(self.__chunks__[shard])
+
+	def __store__(self, value: typing.Any) -> typing.Any:
+		return freeze(value) if self.__read_mode__ == ReadMode.FROZEN else value
+
+	def __read__(self, value: typing.Any) -> typing.Any:
+		return value if self.__read_mode__ == ReadMode.FROZEN else copy.deepcopy(value)
+
+	def __unload__(self) -> None:
+		with self.__lock__:
+			self.__directory__ = None
+			self.__chunks__.clear()
+			self.__accessed__.clear()
+			self.__dirty__.clear()
 
 	def close(self) -> None:
 		"""
-		Closes this sector handle
+		Releases this sector handle\n
+		Unless it stays loaded for other users, the handle is closed; modifications neither saved nor written back on eviction are discarded
 		"""
 
-		self.__handle__ = None
-		self.__contents__ = None
-		type(self).__close_sector_handle(self)
+		if self.__on_release__ is None or not self.__on_release__(self):
+			self.__unload__()
 
-	def save(self, *, crypt: typing.Optional[str] = ...) -> None:
+	def refresh(self) -> bool:
 		"""
-		Saves cached data to file\n
-		:param crypt: The password to encrypt with, ... for current password or None for plain JSON
+		Partitioned sectors are never shared across processes
+		:return: False
+		"""
+
+		return False
+
+	def save(self) -> None:
+		"""
+		Writes the modified chunks and the manifest
 		:raises IOError: If sector is closed
 		"""
 
 		if self.closed:
 			raise IOError('Operation on closed sector')
-		elif self.pending_modifications == 0 and crypt is ...:
+		elif self.pending_modifications == 0:
 			return
-		elif crypt is not None:
-			password: bytes = base64.b64encode((self.__crypt__ if crypt is ... else str(crypt)).encode())
-			remaining: int = max(0, 32 - len(password))
-			password += b'\x00' * remaining
-			password = password[:32]
-			payload: bytes = json.dumps(self.__contents__).encode('utf-8')
-			crypter = Crypto.Cipher.AES.new(password, Crypto.Cipher.AES.MODE_EAX)
-			nonce: bytes = crypter.nonce
-			cipher, mac = crypter.encrypt_and_digest(payload)
-			result: bytes = len(mac).to_bytes(8, 'big', signed=False) + len(nonce).to_bytes(8, 'little', signed=False) + mac + cipher + nonce
 
-			with self.__lock__.writer():
-				self.__handle__.single_write(base64.b64encode(result))
-				self.__modifications__ = 0
-		else:
-			with self.__lock__.writer():
-				self.__handle__.single_write(json.dumps(self.__contents__))
-				self.__modifications__ = 0
+		with self.__lock__:
+			for shard in sorted(self.__dirty__):
+				self.__write__(shard)
+
+			self.__manifest__()
+			self.__modifications__ = 0
+			self.__modified_at__ = None
 
-	def writer(self) -> Synchronization.ReaderWriterLock.Lock:
+	def save_async(self) -> Concurrent.Promise[None]:
 		"""
-		Acquires this sector's internal writer lock\n
-		Modification count will be increased regardless of whether a write operation occurred
-		:return: The writer lock
+		Saves modified chunks on the shared database I/O pool
+		:return: A promise fulfilled once the files are written
 		"""
-		self.__modifications__ += 1
-		return self.__lock__.writer()
 
-	def reader(self) -> Synchronization.ReaderWriterLock.Lock:
+		if self.__executor__ is None:
+			return Concurrent.ThreadedFunction(self.save)()
+
+		promise: Concurrent.Promise[None] = Concurrent.Promise()
+		future: concurrent.futures.Future = self.__executor__.submit(self.save)
+		future.add_done_callback(lambda done: promise.resolve(None) if done.exception() is None else promise.throw(done.exception()))
+		return promise
+
+	def trim(self) -> int:
 		"""
-		Acquires this sector's internal reader lock
-		:return: The reader lock
+		Evicts every chunk idle for longer than the idle limit, writing back modified ones
+		:return: The number of chunks still loaded
 		"""
 
-		return self.__lock__.reader()
+		with self.__lock__:
+			now: float = time.monotonic()
+			written: bool = False
+
+			for shard in tuple(self.__chunks__.keys()):
+				if now - self.__accessed__[shard] < self.__idle__:
+					break
+				elif shard in self.__dirty__:
+					self.__write__(shard)
+					written = True
+
+				del self.__chunks__[shard]
+				del self.__accessed__[shard]
+
+			if written:
+				self.__manifest__()
 
-	def save_async(self, *, crypt: typing.Optional[str] = ...) -> Concurrent.ThreadedPromise[None]:
-		return Concurrent.ThreadedFunction(self.save)(crypt=crypt)
+			return len(self.__chunks__)
 
-	def clear(self) -> Concurrent.ThreadedPromise[None]:
+	def clear(self) -> Concurrent.Promise[None]:
 		"""
 		Clears all data in this sector
 		:raises IOError: If sector is closed
@@ -371,17 +2147,19 @@ class MyDatabase:
 
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
+		@InlineFunction
 		def __operation__() -> None:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				self.__contents__.clear()
+			with self.__lock__:
+				for shard in range(self.__partitions__):
+					if self.__counts__[shard] > 0 or shard in self.__chunks__:
+						self.__chunk__(shard, False).clear()
+						self.__touch__(shard)
 
 		return __operation__()
 
-	def update(self, mapping: typing.Mapping[str, typing.Any]) -> Concurrent.ThreadedPromise[None]:
+	def update(self, mapping: typing.Mapping[str, typing.Any]) -> Concurrent.Promise[None]:
 		"""
-		Updates the internal dictionary with the key-value pairs from 'mapping'
+		Updates the sector with the key-value pairs from 'mapping', loading each affected chunk once
 		:param mapping: The dictionary to update with
 		:raises TypeError: If 'mapping' is not a Mapping
 		:raises IOError: If sector is closed
@@ -390,17 +2168,23 @@ class MyDatabase:
 		Misc.raise_ifn(isinstance(mapping, typing.Mapping), TypeError(f'Specified object must be a mapping instance, got object of type \'{type(mapping).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
+		@InlineFunction
 		def __operation__() -> None:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				self.__contents__.update(mapping)
+			shards: dict[int, dict[str, typing.Any]] = {}
+
+			for key, value in mapping.items():
+				shards.setdefault(self.__shard__(str(key)), {})[str(key)] = self.__store__(value)
+
+			with self.__lock__:
+				for shard, values in shards.items():
+					self.__chunk__(shard).update(values)
+					self.__touch__(shard)
 
 		return __operation__()
 
-	def set(self, mapping: typing.Mapping[str, typing.Any]) -> Concurrent.ThreadedPromise[None]:
+	def set(self, mapping: typing.Mapping[str, typing.Any]) -> Concurrent.Promise[None]:
 		"""
-		Sets the internal dictionary to the key-value pairs from 'mapping'\n
+		Sets the sector to the key-value pairs from 'mapping'\n
 		Old data is cleared and replaced with data in 'mapping'
 		:param mapping: The dictionary to update with
 		:raises TypeError: If 'mapping' is not a Mapping
@@ -410,31 +2194,23 @@ class MyDatabase:
 		Misc.raise_ifn(isinstance(mapping, typing.Mapping), TypeError(f'Specified object must be a mapping instance, got object of type \'{type(mapping).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
+		@InlineFunction
 		def __operation__() -> None:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				self.__contents__.clear()
-				self.__contents__.update(mapping)
+			with self.__lock__:
+				self.clear().wait()
+				self.update(mapping).wait()
 
 		return __operation__()
 
-	def length(self) -> Concurrent.ThreadedPromise[int]:
+	def length(self) -> Concurrent.Promise[int]:
 		"""
 		:return: The length of this sector
 		:raises IOError: If sector is closed
 		"""
 
-		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
-
-		@Concurrent.ThreadedFunction
-		def __operation__() -> typing.Any:
-			with self.__lock__.reader():
-				return len(self.__contents__)
-
-		return __operation__()
+		return InlineFunction(self.__len__)()
 
-	def get_or_default(self, key: str, default: typing.Any = None) -> Concurrent.ThreadedPromise[typing.Any]:
+	def get_or_default(self, key: str, default: typing.Any = None) -> Concurrent.Promise[typing.Any]:
 		"""
 		Gets and returns the item with the specified key or 'default' if key does not exist
 		:param key: The key
@@ -447,14 +2223,16 @@ class MyDatabase:
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
+		@InlineFunction
 		def __operation__() -> typing.Any:
-			with self.__lock__.reader():
-				return copy.deepcopy(self.__contents__.get(str(key)))
+			with self.__lock__:
+				value: typing.Any = self.__chunk__(self.__shard__(str(key))).get(str(key), default)
+
+			return self.__read__(value)
 
 		return __operation__()
 
-	def get_or_insert(self, key: str, default: typing.Any = None) -> Concurrent.ThreadedPromise[typing.Any]:
+	def get_or_insert(self, key: str, default: typing.Any = None) -> Concurrent.Promise[typing.Any]:
 		"""
 		Gets and returns the item with the specified key or inserts and returns 'default' if key does not exist
 		:param key: The key
@@ -467,15 +2245,24 @@ class MyDatabase:
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
+		@InlineFunction
 		def __operation__() -> typing.Any:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				return copy.deepcopy(self.__contents__.setdefault(str(key)))
+			value: typing.Any = self.__store__(default)
+
+			with self.__lock__:
+				chunk: dict[str, typing.Any] = self.__chunk__(shard := self.__shard__(str(key)))
+
+				if str(key) in chunk:
+					value = chunk[str(key)]
+				else:
+					chunk[str(key)] = value
+					self.__touch__(shard)
+
+			return self.__read__(value)
 
 		return __operation__()
 
-	def pop(self, key: str, default: typing.Any = ...) -> Concurrent.ThreadedPromise[typing.Any]:
+	def pop(self, key: str, default: typing.Any = ...) -> Concurrent.Promise[typing.Any]:
 		"""
 		Removes and returns the item with the specified key or 'default' if key does not exist
 		:param key: The key
@@ -489,60 +2276,48 @@ class MyDatabase:
 		Misc.raise_ifn(isinstance(key, str), TypeError(f'JSON keys must be a string, got object of type \'{type(key).__name__}\''))
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
+		@InlineFunction
 		def __operation__() -> typing.Any:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				self.__contents__.pop(str(key), default)
-
-		return __operation__()
-
-	def pop_last(self) -> Concurrent.ThreadedPromise[tuple[str, typing.Any]]:
-		"""
-		Gets and returns the last key-value pair added to this sector
-		:return: The last added key-value pair
-		:raises IOError: If sector is closed
-		"""
-
-		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
-
-		@Concurrent.ThreadedFunction
-		def __operation__() -> tuple[str, typing.Any]:
-			with self.__lock__.writer():
-				self.__modifications__ += 1
-				return self.__contents__.popitem()
+			with self.__lock__:
+				chunk: dict[str, typing.Any] = self.__chunk__(shard := self.__shard__(str(key)))
+
+				if str(key) in chunk:
+					value: typing.Any = chunk.pop(str(key))
+					self.__touch__(shard)
+					return value
+				elif default is ...:
+					raise KeyError(key)
+				else:
+					return default
 
 		return __operation__()
 
-	def keys(self) -> Concurrent.ThreadedPromise[tuple[str, ...]]:
+	def keys(self) -> Concurrent.Promise[tuple[str, ...]]:
 		"""
+		Loads every chunk in turn
 		:return: The keys stored in this sector
 		:raises IOError: If sector is closed
 		"""
 
-		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
-
-		@Concurrent.ThreadedFunction
-		def __operation__() -> tuple[str, ...]:
-			with self.__lock__.reader():
-				return tuple(self.__contents__.keys())
-
-		return __operation__()
+		return InlineFunction(lambda: tuple(key for key, _ in self.__items__()))()
 
-	def values(self) -> Concurrent.ThreadedPromise[tuple[typing.Any, ...]]:
+	def values(self) -> Concurrent.Promise[tuple[typing.Any, ...]]:
 		"""
+		Loads every chunk in turn
 		:return: The values stored in this sector
 		:raises IOError: If sector is closed
 		"""
 
+		return InlineFunction(lambda: tuple(value for _, value in self.__items__()))()
+
+	def __items__(self) -> typing.Iterator[tuple[str, typing.Any]]:
 		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
 
-		@Concurrent.ThreadedFunction
-		def __operation__() -> tuple[typing.Any, ...]:
-			with self.__lock__.reader():
-				return tuple(self.__contents__.values())
+		for shard in range(self.__partitions__):
+			with self.__lock__:
+				items: tuple[tuple[str, typing.Any], ...] = tuple(self.__chunk__(shard).items())
 
-		return __operation__()
+			yield from items
 
 	def stream(self) -> Stream.LinqStream[tuple[str, typing.Any]]:
 		"""
@@ -551,20 +2326,14 @@ class MyDatabase:
 
 		return Stream.LinqStream(iter(self))
 
-	def copy(self) -> Concurrent.ThreadedPromise[dict[str, typing.Any]]:
+	def copy(self) -> Concurrent.Promise[dict[str, typing.Any]]:
 		"""
-		:return: A copy of this sector's internal mapping
+		Loads every chunk in turn
+		:return: A copy of this sector's contents
 		:raises IOError: If sector is closed
 		"""
 
-		Misc.raise_if(self.closed, IOError('Operation on closed sector'))
-
-		@Concurrent.ThreadedFunction
-		def __operation__() -> dict[str, typing.Any]:
-			with self.__lock__.reader():
-				return copy.deepcopy(self.__contents__)
-
-		return __operation__()
+		return InlineFunction(lambda: {key: self.__read__(value) for key, value in self.__items__()})()
 
 	@property
 	def closed(self) -> bool:
@@ -572,23 +2341,23 @@ class MyDatabase:
 		:return: Whether the sector is closed
 		"""
 
-		return self.__handle__ is None or not self.exists
+		return self.__directory__ is None or not self.exists
 
 	@property
 	def exists(self) -> bool:
 		"""
-		:return: Whether the sector file exists
+		:return: Whether the sector manifest exists
 		"""
 
-		return self.__handle__.exists()
+		return self.__directory__ is not None and PartitionedDatabase.is_partitioned(self.__directory__)
 
 	@property
 	def encrypted(self) -> bool:
 		"""
-		:return: Whether this sector is encrypted
+		:return: Whether this sector is encrypted (never for partitioned sectors)
 		"""
 
-		return self.__crypt__ is not None
+		return False
 
 	@property
 	def pending_modifications(self) -> int:
@@ -599,34 +2368,119 @@ class MyDatabase:
 		return self.__modifications__
 
 	@property
-	def password(self) -> str:
+	def unsaved_seconds(self) -> float:
 		"""
-		:return: The password used to encrypt this sector
+		:return: The number of seconds since the oldest modification not yet saved (0 if there is none)
 		"""
 
-		return self.__crypt__
+		modified: typing.Optional[float] = self.__modified_at__
+		return 0 if modified is None else time.monotonic() - modified
+
+	@property
+	def read_mode(self) -> ReadMode:
+		"""
+		:return: How reads of this sector hand out values
+		"""
+
+		return self.__read_mode__
+
+	@property
+	def partitions(self) -> int:
+		"""
+		:return: The number of chunk files keys are sharded across
+		"""
+
+		return self.__partitions__
+
+	@property
+	def loaded_chunks(self) -> int:
+		"""
+		:return: The number of chunks currently held in memory
+		"""
+
+		return len(self.__chunks__)
+
+	@property
+	def footprint(self) -> int:
+		"""
+		:return: The approximate number of bytes this sector holds in memory, estimated from the file sizes of its loaded chunks
+		"""
+
+		with self.__lock__:
+			return 0 if self.closed else sum(os.path.getsize(path) for shard in self.__chunks__ if os.path.isfile(path := self.__chunk_path__(shard)))
 
 
 class MyDatabaseIterator(typing.Iterator[tuple[str, typing.Any]]):
-	def __init__(self, sector: MyDatabase):
-		self.__keys__: tuple[str, ...] = ...
-		self.__iterator__: typing.Iterator[str] = ...
+	"""
+	Iterator over a consistent snapshot of a sector's key-value pairs\n
+	The pairs are captured under a single reader lock acquisition when iteration starts; values are then copied (unless the sector is frozen) one batch at a time,
+	each batch under the reader lock. Keys set, deleted or replaced later never show up, but a copy-mode value mutated in place under 'writer' before its batch
+	is copied is seen with that mutation; only frozen sectors give an exact snapshot of the values
+	"""
+
+	def __init__(self, sector: MyDatabase, low: typing.Optional[str] = None, high: typing.Optional[str] = None, *, prefix: typing.Optional[str] = None, inclusive: tuple[bool, bool] = (True, True), ordered: bool = False, batch: int = 256):
+		"""
+		Iterator over a consistent snapshot of a sector's key-value pairs\n
+		- Constructor -
+		:param sector: The sector
+		:param low: The lowest key or None if unbounded
+		:param high: The highest key or None if unbounded
+		:param prefix: The prefix all keys start with or None
+		:param inclusive: Whether the lower and upper bounds are inclusive
+		:param ordered: Whether pairs are yielded in key order rather than insertion order
+		:param batch: The number of values copied at a time
+		"""
+
+		assert isinstance(batch, int) and batch > 0, 'Invalid batch size'
 		self.__sector__: MyDatabase = sector
+		self.__scan__: tuple[typing.Optional[str], typing.Optional[str], typing.Optional[str], tuple[bool, bool], bool] = (low, high, prefix, inclusive, ordered)
+		self.__items__: typing.Optional[list[tuple[str, typing.Any]]] = None
+		self.__batch__: int = int(batch)
+		self.__position__: int = 0
+		self.__pending__: typing.Iterator[tuple[str, typing.Any]] = iter(())
 
 	def __iter__(self) -> MyDatabaseIterator:
 		return self
 
 	def __next__(self) -> tuple[str, typing.Any]:
-		if self.__iterator__ is ... or self.__keys__ is ...:
-			self.__keys__ = self.__sector__.keys().wait()
-			self.__iterator__ = iter(self.__keys__)
-
-		while True:
-			try:
-				key: str = next(self.__iterator__)
-				data: typing.Any = self.__sector__[key].wait()
-				return key, data
-			except KeyError:
-				continue
-
-		raise StopIteration
+		if (item := next(self.__pending__, None)) is not None:
+			return item
+
+		self.__pending__ = iter(self.next_batch())
+		item = next(self.__pending__, None)
+
+		if item is None:
+			raise StopIteration
+
+		return item
+
+	def next_batch(self) -> tuple[tuple[str, typing.Any], ...]:
+		"""
+		Takes the snapshot if not yet taken and returns the next batch of pairs\n
+		Pairs already handed out by '__next__' are not repeated
+		:return: Up to 'batch' key-value pairs, empty once exhausted
+		"""
+
+		if self.__items__ is None:
+			low, high, prefix, inclusive, ordered = self.__scan__
+			self.__items__ = self.__sector__.__items__(low, high, prefix=prefix, inclusive=inclusive, ordered=ordered)
+
+		pending: tuple[tuple[str, typing.Any], ...] = tuple(self.__pending__)
+		self.__pending__ = iter(())
+		start: int = self.__position__
+		self.__position__ = min(len(self.__items__), start + self.__batch__ - len(pending))
+		items: list[tuple[str, typing.Any]] = self.__items__[start:self.__position__]
+
+		if self.__sector__.read_mode == ReadMode.FROZEN:
+			return pending + tuple(items)
+
+		with self.__sector__.__lock__.reader():
+			return pending + tuple(copy.deepcopy(items))
+
+	def batches(self) -> typing.Iterator[tuple[tuple[str, typing.Any], ...]]:
+		"""
+		:return: The remaining pairs in batches of up to 'batch'
+		"""
+
+		while len(batch := self.next_batch()) > 0:
+			yield batch
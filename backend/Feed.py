@@ -0,0 +1,377 @@
+# Change feeds of database sector keys
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import enum
+import os
+import secrets
+import sys
+import threading
+import traceback
+import typing
+
+import Metrics
+
+
+class ChangeType(enum.StrEnum):
+	"""
+	What a change event reports\n
+	'RESET' events carry no key and mean any key may have changed (raw writer locks, reloads after another process compacted the sector, delivery overflow)
+	"""
+
+	SET = 'set'
+	DELETE = 'delete'
+	CLEAR = 'clear'
+	RESET = 'reset'
+
+
+class SequenceExpiredError(LookupError):
+	"""
+	Raised when resuming from a sequence number no longer (or never) held in a feed's history, or numbered by another feed epoch
+	"""
+
+
+class ChangeEvent:
+	"""
+	A single change to a sector key, numbered in the order changes were made
+	"""
+
+	def __init__(self, sequence: int, change: ChangeType, key: typing.Optional[str], epoch: str):
+		"""
+		A single change to a sector key, numbered in the order changes were made\n
+		- Constructor -
+		:param sequence: The sequence number
+		:param change: The change type
+		:param key: The changed key or None for 'CLEAR' and 'RESET' events
+		:param epoch: The epoch of the feed that numbered the event
+		"""
+
+		self.__sequence__: int = sequence
+		self.__change__: ChangeType = change
+		self.__key__: typing.Optional[str] = key
+		self.__epoch__: str = epoch
+
+	def __repr__(self) -> str:
+		return f'<ChangeEvent {self.__epoch__}#{self.__sequence__} {self.__change__}{'' if self.__key__ is None else f' \'{self.__key__}\''}>'
+
+	@property
+	def sequence(self) -> int:
+		"""
+		:return: The sequence number
+		"""
+
+		return self.__sequence__
+
+	@property
+	def change(self) -> ChangeType:
+		"""
+		:return: The change type
+		"""
+
+		return self.__change__
+
+	@property
+	def key(self) -> typing.Optional[str]:
+		"""
+		:return: The changed key or None for 'CLEAR' and 'RESET' events
+		"""
+
+		return self.__key__
+
+	@property
+	def epoch(self) -> str:
+		"""
+		:return: The epoch of the feed that numbered the event, to resume from together with the sequence number
+		"""
+
+		return self.__epoch__
+
+
+class Subscription:
+	"""
+	A callback receiving a feed's events in order on the shared dispatcher\n
+	Events raised while a delivery is queued or running are delivered together in the next call;
+	when coalescing, only the latest event of each key is kept and a 'CLEAR' or 'RESET' event drops those before it,
+	otherwise every event is delivered unless more than the feed's capacity are waiting, which are replaced by a single 'RESET' event
+	"""
+
+	def __init__(self, feed: ChangeFeed, callback: typing.Callable[[tuple[ChangeEvent, ...]], None], *, prefix: typing.Optional[str] = None, coalesce: bool = True):
+		"""
+		A callback receiving a feed's events in order on the shared dispatcher\n
+		- Constructor -
+		:param feed: The feed
+		:param callback: The callback receiving each batch of events
+		:param prefix: The prefix of the keys to receive events for or None for all keys ('CLEAR' and 'RESET' events are always received)
+		:param coalesce: Whether to keep only the latest pending event of each key
+		"""
+
+		assert callable(callback), 'Subscription callback is not callable'
+		assert prefix is None or isinstance(prefix, str), 'Invalid key prefix'
+		self.__feed__: typing.Optional[ChangeFeed] = feed
+		self.__callback__: typing.Callable[[tuple[ChangeEvent, ...]], None] = callback
+		self.__prefix__: typing.Optional[str] = prefix
+		self.__coalesce__: bool = bool(coalesce)
+		self.__pending__: collections.OrderedDict[typing.Optional[str], ChangeEvent] | list[ChangeEvent] = collections.OrderedDict() if coalesce else []
+		self.__scheduled__: bool = False
+		self.__sequence__: int = 0
+		self.__epoch__: str = feed.epoch
+		self.__idle__: threading.Condition = threading.Condition(feed.lock)
+
+	def __push__(self, event: ChangeEvent) -> bool:
+		# Called with the feed lock held; returns whether a delivery must be scheduled
+		if self.__feed__ is None or (event.key is not None and self.__prefix__ is not None and not event.key.startswith(self.__prefix__)):
+			return False
+		elif self.__coalesce__:
+			if event.key is None:
+				self.__pending__.clear()
+			else:
+				self.__pending__.pop(event.key, None)
+
+			self.__pending__[event.key] = event
+		elif len(self.__pending__) >= self.__feed__.capacity:
+			# Too far behind to deliver every event; the receiver rescans instead
+			self.__pending__ = [ChangeEvent(event.sequence, ChangeType.RESET, None, event.epoch)]
+		else:
+			self.__pending__.append(event)
+
+		if self.__scheduled__:
+			return False
+
+		self.__scheduled__ = True
+		return True
+
+	def __drain__(self) -> None:
+		while True:
+			with self.__idle__:
+				if self.__feed__ is None or len(self.__pending__) == 0:
+					self.__scheduled__ = False
+					self.__idle__.notify_all()
+					return
+
+				events: tuple[ChangeEvent, ...] = tuple(self.__pending__.values() if self.__coalesce__ else self.__pending__)
+				self.__pending__.clear()
+
+			try:
+				self.__callback__(events)
+			except Exception as e:
+				_FAILURES.inc()
+				sys.stderr.write(f'Change feed callback failed:\n{''.join(traceback.format_exception(e))}')
+
+			self.__sequence__ = events[-1].sequence
+
+	def wait(self, timeout: typing.Optional[float] = None) -> bool:
+		"""
+		Blocks until every event raised so far was delivered
+		:param timeout: The maximum seconds to wait or None to wait indefinitely
+		:return: Whether all events were delivered
+		"""
+
+		with self.__idle__:
+			return self.__idle__.wait_for(lambda: not self.__scheduled__, timeout)
+
+	def close(self) -> None:
+		"""
+		Stops delivery; pending events are dropped
+		"""
+
+		with self.__idle__:
+			if self.__feed__ is not None:
+				self.__feed__.unsubscribe(self)
+				self.__feed__ = None
+				self.__pending__.clear()
+
+	@property
+	def closed(self) -> bool:
+		"""
+		:return: Whether delivery stopped (by 'close' or because the sector was unloaded)
+		"""
+
+		return self.__feed__ is None
+
+	@property
+	def sequence(self) -> int:
+		"""
+		:return: The sequence number of the last delivered event (to resume from after re-subscribing with 'epoch') or 0
+		"""
+
+		return self.__sequence__
+
+	@property
+	def epoch(self) -> str:
+		"""
+		:return: The epoch of the subscribed feed, which numbers 'sequence'
+		"""
+
+		return self.__epoch__
+
+	@property
+	def pending(self) -> int:
+		"""
+		:return: The number of events waiting for delivery
+		"""
+
+		with self.__idle__:
+			return len(self.__pending__)
+
+
+class ChangeFeed:
+	"""
+	Numbered log of the changes made to one sector\n
+	The latest events are kept so readers can resume from a sequence number; publishing without subscribers only appends to that history\n
+	Numbering restarts with every feed (a sector reloaded after eviction or by another process gets a new one), so positions are resumed from
+	together with the random epoch of the feed that numbered them
+	"""
+
+	def __init__(self, *, capacity: typing.Optional[int] = None):
+		"""
+		Numbered log of the changes made to one sector\n
+		- Constructor -
+		:param capacity: The number of events kept to resume from or None for the default ('DATABASE_FEED_HISTORY', 4096 if unset)
+		"""
+
+		self.__capacity__: int = int(os.getenv('DATABASE_FEED_HISTORY', '4096')) if capacity is None else int(capacity)
+		assert self.__capacity__ > 0, 'Invalid feed capacity'
+		self.__lock__: threading.RLock = threading.RLock()
+		self.__history__: collections.deque[ChangeEvent] = collections.deque(maxlen=self.__capacity__)
+		self.__subscriptions__: list[Subscription] = []
+		self.__sequence__: int = 0
+		self.__epoch__: str = secrets.token_hex(8)
+
+	def __events__(self, since: int, epoch: typing.Optional[str]) -> list[ChangeEvent]:
+		# Called with the lock held
+		if epoch is None and since > 0:
+			raise SequenceExpiredError(f'Sequence {since} cannot be resumed from without the epoch that numbered it (now {self.__epoch__})')
+		elif epoch is not None and epoch != self.__epoch__:
+			raise SequenceExpiredError(f'Sequence {since} was numbered by feed epoch {epoch} (now {self.__epoch__})')
+
+		oldest: int = self.__history__[0].sequence if len(self.__history__) > 0 else self.__sequence__ + 1
+
+		if since > self.__sequence__ or since < oldest - 1:
+			raise SequenceExpiredError(f'Sequence {since} is not in the feed history (holding {oldest} to {self.__sequence__})')
+
+		return list(self.__history__)[len(self.__history__) - (self.__sequence__ - since):]
+
+	def publish(self, changes: typing.Iterable[tuple[ChangeType, typing.Optional[str]]]) -> None:
+		"""
+		Numbers and records changes, then schedules their delivery to subscribers
+		:param changes: The (change type, key) pairs in the order they were made
+		"""
+
+		with self.__lock__:
+			ready: list[Subscription] = []
+
+			for change, key in changes:
+				self.__sequence__ += 1
+				event: ChangeEvent = ChangeEvent(self.__sequence__, change, key, self.__epoch__)
+				self.__history__.append(event)
+				ready.extend(subscription for subscription in self.__subscriptions__ if subscription.__push__(event))
+
+		for subscription in ready:
+			_DISPATCHER.submit(subscription.__drain__)
+
+	def since(self, sequence: int, epoch: typing.Optional[str] = None) -> tuple[ChangeEvent, ...]:
+		"""
+		:param sequence: The sequence number of the last event already seen (0 for the whole history of a new feed)
+		:param epoch: The epoch of the feed that numbered 'sequence' (required unless it is 0)
+		:return: The events following it
+		:raises SequenceExpiredError: If events following it are no longer held or it was numbered by another epoch
+		"""
+
+		with self.__lock__:
+			return tuple(self.__events__(int(sequence), epoch))
+
+	def subscribe(self, callback: typing.Callable[[tuple[ChangeEvent, ...]], None], *, since: typing.Optional[int] = None, epoch: typing.Optional[str] = None, prefix: typing.Optional[str] = None, coalesce: bool = True) -> Subscription:
+		"""
+		Delivers this feed's events to a callback on the shared dispatcher
+		:param callback: The callback receiving each batch of events
+		:param since: The sequence number to resume after (events following it are delivered first) or None for new events only
+		:param epoch: The epoch of the feed that numbered 'since' (required unless it is None or 0)
+		:param prefix: The prefix of the keys to receive events for or None for all keys
+		:param coalesce: Whether to keep only the latest pending event of each key
+		:return: The subscription
+		:raises SequenceExpiredError: If the events following 'since' are no longer held or it was numbered by another epoch
+		"""
+
+		subscription: Subscription = Subscription(self, callback, prefix=prefix, coalesce=coalesce)
+
+		with self.__lock__:
+			schedule: bool = False
+
+			for event in ([] if since is None else self.__events__(int(since), epoch)):
+				schedule = subscription.__push__(event) or schedule
+
+			subscription.__sequence__ = self.__sequence__ if since is None else int(since)
+			self.__subscriptions__.append(subscription)
+
+		if schedule:
+			_DISPATCHER.submit(subscription.__drain__)
+
+		return subscription
+
+	def unsubscribe(self, subscription: Subscription) -> None:
+		"""
+		Removes a subscription (use 'Subscription.close')
+		:param subscription: The subscription
+		"""
+
+		with self.__lock__:
+			if subscription in self.__subscriptions__:
+				self.__subscriptions__.remove(subscription)
+
+	def close(self) -> None:
+		"""
+		Ends every subscription
+		"""
+
+		with self.__lock__:
+			subscriptions: list[Subscription] = list(self.__subscriptions__)
+
+		for subscription in subscriptions:
+			subscription.close()
+
+	@property
+	def sequence(self) -> int:
+		"""
+		:return: The sequence number of the latest event or 0
+		"""
+
+		return self.__sequence__
+
+	@property
+	def epoch(self) -> str:
+		"""
+		:return: The random id of this feed, which numbers its events
+		"""
+
+		return self.__epoch__
+
+	@property
+	def capacity(self) -> int:
+		"""
+		:return: The number of events kept to resume from
+		"""
+
+		return self.__capacity__
+
+	@property
+	def subscribers(self) -> int:
+		"""
+		:return: The number of open subscriptions
+		"""
+
+		with self.__lock__:
+			return len(self.__subscriptions__)
+
+	@property
+	def lock(self) -> threading.RLock:
+		"""
+		:return: The feed lock, shared by its subscriptions
+		"""
+
+		return self.__lock__
+
+
+_DISPATCHER: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.getenv('DATABASE_FEED_WORKERS', '2')), thread_name_prefix='MyDatabase-feed')
+_FAILURES: Metrics.Counter = Metrics.register(Metrics.Counter('database_feed_errors_total', 'Change feed callbacks raising an error'))
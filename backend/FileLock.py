@@ -0,0 +1,149 @@
+# Cross-process advisory file locks carrying a version stamp
+
+from __future__ import annotations
+
+import contextlib
+import os
+import struct
+import threading
+import typing
+
+if os.name == 'nt':
+	import msvcrt
+else:
+	import fcntl
+
+
+class FileLock:
+	"""
+	Lock shared by every process opening the same lock file, which also stores a (generation, epoch) version stamp\n
+	Threads of one process take turns on an internal lock before the OS lock is requested; waiting blocks in the kernel instead of spinning\n
+	A forked child reopens the file on first use, since a descriptor inherited from the parent would share the parent's lock\n
+	On Windows shared holds are exclusive
+	"""
+
+	__STAMP: struct.Struct = struct.Struct('>QQ')
+
+	def __init__(self, path: str):
+		"""
+		Lock shared by every process opening the same lock file, which also stores a (generation, epoch) version stamp\n
+		- Constructor -
+		:param path: The lock file path (created if missing)
+		"""
+
+		self.__path__: str = str(path)
+		self.__descriptor__: typing.Optional[int] = os.open(self.__path__, os.O_RDWR | os.O_CREAT, 0o644)
+		self.__pid__: int = os.getpid()
+		self.__lock__: threading.RLock = threading.RLock()
+
+	def __fileno__(self) -> typing.Optional[int]:
+		with self.__lock__:
+			if self.__descriptor__ is not None and self.__pid__ != os.getpid():
+				self.__descriptor__ = os.open(self.__path__, os.O_RDWR | os.O_CREAT, 0o644)
+				self.__pid__ = os.getpid()
+
+			return self.__descriptor__
+
+	def __acquire__(self, descriptor: int, exclusive: bool) -> None:
+		if os.name == 'nt':
+			# Lock a byte past the stamp so stamp reads are never blocked by Windows' mandatory locks
+			os.lseek(descriptor, FileLock.__STAMP.size, os.SEEK_SET)
+
+			while True:
+				try:
+					msvcrt.locking(descriptor, msvcrt.LK_LOCK, 1)
+					return
+				except OSError:
+					continue
+		else:
+			fcntl.flock(descriptor, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+	def __release__(self, descriptor: int) -> None:
+		if os.name == 'nt':
+			os.lseek(descriptor, FileLock.__STAMP.size, os.SEEK_SET)
+			msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+		else:
+			fcntl.flock(descriptor, fcntl.LOCK_UN)
+
+	@contextlib.contextmanager
+	def __hold__(self, exclusive: bool) -> typing.Iterator[FileLock]:
+		with self.__lock__:
+			if (descriptor := self.__fileno__()) is None:
+				raise IOError('Operation on closed lock')
+
+			self.__acquire__(descriptor, exclusive)
+
+			try:
+				yield self
+			finally:
+				self.__release__(descriptor)
+
+	def exclusive(self) -> typing.ContextManager[FileLock]:
+		"""
+		:return: A context holding the lock exclusively
+		:raises IOError: If the lock is closed
+		"""
+
+		return self.__hold__(True)
+
+	def shared(self) -> typing.ContextManager[FileLock]:
+		"""
+		:return: A context holding the lock shared with other readers
+		:raises IOError: If the lock is closed
+		"""
+
+		return self.__hold__(False)
+
+	def close(self) -> None:
+		"""
+		Closes the lock file
+		"""
+
+		with self.__lock__:
+			if self.__descriptor__ is not None:
+				os.close(self.__descriptor__)
+				self.__descriptor__ = None
+
+	@property
+	def path(self) -> str:
+		"""
+		:return: The lock file path
+		"""
+
+		return self.__path__
+
+	@property
+	def stamp(self) -> tuple[int, int]:
+		"""
+		Reading the stamp does not take the lock and costs a single small read
+		:return: The (generation, epoch) stamp stored in the lock file ((0, 0) if never written)
+		"""
+
+		descriptor: typing.Optional[int] = self.__descriptor__ if self.__pid__ == os.getpid() else self.__fileno__()
+
+		if descriptor is None:
+			return 0, 0
+		elif hasattr(os, 'pread'):
+			data: bytes = os.pread(descriptor, FileLock.__STAMP.size, 0)
+		else:
+			with self.__lock__:
+				os.lseek(descriptor, 0, os.SEEK_SET)
+				data: bytes = os.read(descriptor, FileLock.__STAMP.size)
+
+		return FileLock.__STAMP.unpack(data) if len(data) == FileLock.__STAMP.size else (0, 0)
+
+	@stamp.setter
+	def stamp(self, stamp: tuple[int, int]) -> None:
+		"""
+		Must only be written while holding the lock exclusively
+		:param stamp: The new (generation, epoch) stamp
+		"""
+
+		data: bytes = FileLock.__STAMP.pack(*stamp)
+		descriptor: int = self.__fileno__()
+
+		if hasattr(os, 'pwrite'):
+			os.pwrite(descriptor, data, 0)
+		else:
+			os.lseek(descriptor, 0, os.SEEK_SET)
+			os.write(descriptor, data)
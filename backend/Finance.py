@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+import datetime
 import enum
 import pandas
 import typing
 import yfinance
+import zoneinfo
+
+import Metrics
+
+MARKET_TIMEZONE: zoneinfo.ZoneInfo = zoneinfo.ZoneInfo('America/New_York')
+MARKET_OPEN: datetime.time = datetime.time(9, 30)
+MARKET_CLOSE: datetime.time = datetime.time(16, 0)
 
 
 class FramePeriod(enum.StrEnum):
@@ -192,7 +200,9 @@ class CompanyInfo:
 		:return: A StockPrice instance
 		"""
 
-		data: dict[str, typing.Any] = self.__ticker__.info
+		with Metrics.upstream('yfinance'):
+			data: dict[str, typing.Any] = self.__ticker__.info
+
 		price_current: float = data.get('currentPrice')
 		price_open: float = data.get('open')
 		price_high: float = data.get('dayHigh')
@@ -208,7 +218,9 @@ class CompanyInfo:
 		:return: A StockPrice generator
 		"""
 
-		frame: pandas.DataFrame = self.__ticker__.history(period=period.value, interval=interval.value)
+		with Metrics.upstream('yfinance'):
+			frame: pandas.DataFrame = self.__ticker__.history(period=period.value, interval=interval.value)
+
 		keys: tuple[str, ...] = tuple(frame)
 		open_index: int = keys.index('Open') + 1
 		close_index: int = keys.index('Close') + 1
@@ -230,3 +242,43 @@ class CompanyInfo:
 		"""
 
 		return self.__company_code__
+
+
+def market_status(at: typing.Optional[datetime.datetime] = None) -> tuple[bool, datetime.datetime, datetime.datetime]:
+	"""
+	Gets the state of the regular US equity trading session (weekdays 09:30 - 16:00 New York time)\n
+	Exchange holidays are not accounted for and are treated as trading days
+	:param at: The time to check or None for now
+	:return: Whether the market is open, when the current state began (last open or close) and when it ends (next close or open)
+	"""
+
+	at = datetime.datetime.now(MARKET_TIMEZONE) if at is None else at.astimezone(MARKET_TIMEZONE)
+	day: datetime.date = at.date()
+	trading_day: bool = day.weekday() < 5
+	opening: datetime.datetime = datetime.datetime.combine(day, MARKET_OPEN, MARKET_TIMEZONE)
+	closing: datetime.datetime = datetime.datetime.combine(day, MARKET_CLOSE, MARKET_TIMEZONE)
+
+	if trading_day and opening <= at < closing:
+		return True, opening, closing
+
+	if trading_day and at >= closing:
+		last_close: datetime.datetime = closing
+	else:
+		previous: datetime.date = day - datetime.timedelta(days=1)
+
+		while previous.weekday() >= 5:
+			previous -= datetime.timedelta(days=1)
+
+		last_close = datetime.datetime.combine(previous, MARKET_CLOSE, MARKET_TIMEZONE)
+
+	if trading_day and at < opening:
+		next_open: datetime.datetime = opening
+	else:
+		following: datetime.date = day + datetime.timedelta(days=1)
+
+		while following.weekday() >= 5:
+			following += datetime.timedelta(days=1)
+
+		next_open = datetime.datetime.combine(following, MARKET_OPEN, MARKET_TIMEZONE)
+
+	return False, last_close, next_open
@@ -0,0 +1,377 @@
+# Concurrency limited gateway for chat model requests
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import concurrent.futures
+import os
+import queue
+import random
+import threading
+import typing
+
+import openai
+
+import Metrics
+
+
+class GatewayBusyError(RuntimeError):
+	"""
+	Raised when the gateway queue is full and a request is rejected
+	"""
+
+
+class GatewayClosedError(RuntimeError):
+	"""
+	Raised when the gateway's event loop stopped before a request finished
+	"""
+
+
+class OpenAIBackend:
+	"""
+	Gateway backend forwarding requests to the OpenAI Responses API
+	"""
+
+	def __init__(self, api_key: typing.Optional[str] = None):
+		"""
+		Gateway backend forwarding requests to the OpenAI Responses API\n
+		- Constructor -
+		:param api_key: The OpenAI API key or None to read 'OPENAI_API_KEY'
+		:raises ValueError: If no API key is available
+		"""
+
+		api_key = os.getenv('OPENAI_API_KEY') if api_key is None else api_key
+
+		if not api_key:
+			raise ValueError('OPENAI_API_KEY is missing. Check your .env file.')
+
+		self.__client__: openai.AsyncOpenAI = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+
+	async def complete(self, model: str, instructions: str, messages: list[dict[str, str]]) -> str:
+		"""
+		Generates a full reply
+		:param model: The model name
+		:param instructions: The system instructions
+		:param messages: The conversation in Responses API input format
+		:return: The reply text
+		"""
+
+		response = await self.__client__.responses.create(model=model, instructions=instructions, input=messages)
+		return response.output_text or ''
+
+	async def stream(self, model: str, instructions: str, messages: list[dict[str, str]]) -> collections.abc.AsyncIterator[str]:
+		"""
+		Generates a reply incrementally
+		:param model: The model name
+		:param instructions: The system instructions
+		:param messages: The conversation in Responses API input format
+		:return: An async iterator of reply text deltas
+		"""
+
+		stream = await self.__client__.responses.create(model=model, instructions=instructions, input=messages, stream=True)
+
+		try:
+			async for event in stream:
+				if event.type == 'response.output_text.delta' and event.delta:
+					yield event.delta
+		finally:
+			await stream.close()
+
+	@staticmethod
+	def is_retryable(err: BaseException) -> bool:
+		"""
+		:param err: The error raised by a request
+		:return: Whether the request may succeed if retried
+		"""
+
+		return isinstance(err, (asyncio.TimeoutError, openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
+	async def close(self) -> None:
+		"""
+		Releases the underlying HTTP client
+		"""
+
+		await self.__client__.close()
+
+
+class StubBackend:
+	"""
+	Gateway backend producing canned replies locally\n
+	Used for load testing without upstream calls
+	"""
+
+	def __init__(self, latency: float = 0.5, token_delay: float = 0.02, reply: str = 'This is a stubbed tutor reply used for load testing.'):
+		"""
+		Gateway backend producing canned replies locally\n
+		- Constructor -
+		:param latency: The seconds to wait before the first token
+		:param token_delay: The seconds to wait between streamed tokens
+		:param reply: The reply text
+		"""
+
+		self.__latency__: float = float(latency)
+		self.__token_delay__: float = float(token_delay)
+		self.__reply__: str = str(reply)
+
+	async def complete(self, model: str, instructions: str, messages: list[dict[str, str]]) -> str:
+		await asyncio.sleep(self.__latency__)
+		return self.__reply__
+
+	async def stream(self, model: str, instructions: str, messages: list[dict[str, str]]) -> collections.abc.AsyncIterator[str]:
+		await asyncio.sleep(self.__latency__)
+
+		for i, word in enumerate(self.__reply__.split(' ')):
+			if i > 0:
+				await asyncio.sleep(self.__token_delay__)
+
+			yield word if i == 0 else f' {word}'
+
+	@staticmethod
+	def is_retryable(err: BaseException) -> bool:
+		return isinstance(err, asyncio.TimeoutError)
+
+	async def close(self) -> None:
+		pass
+
+
+class OpenAIGateway:
+	"""
+	Runs chat model requests on a private asyncio loop with a fixed concurrency cap\n
+	Callers on worker threads block only on their own request; excess requests wait in a bounded queue or are rejected\n
+	A concurrency slot is only held during an attempt, so requests backing off before a retry leave it to others
+	"""
+
+	__POLL: float = 1
+
+	def __init__(self, backend: OpenAIBackend | StubBackend, *, max_concurrency: int = 8, max_queue: int = 32, timeout: float = 30, retries: int = 2, backoff: float = 0.5, max_backoff: float = 8):
+		"""
+		Runs chat model requests on a private asyncio loop with a fixed concurrency cap\n
+		- Constructor -
+		:param backend: The backend handling requests
+		:param max_concurrency: The maximum number of requests in flight upstream
+		:param max_queue: The maximum number of requests waiting for a free slot
+		:param timeout: The per-attempt timeout in seconds (for streams, the maximum wait between tokens)
+		:param retries: The number of times a failed attempt is retried
+		:param backoff: The base retry delay in seconds (doubled per attempt, full jitter applied)
+		:param max_backoff: The maximum retry delay in seconds
+		"""
+
+		assert isinstance(max_concurrency, int) and max_concurrency > 0, 'Invalid concurrency limit'
+		assert isinstance(max_queue, int) and max_queue >= 0, 'Invalid queue size'
+		self.__backend__: OpenAIBackend | StubBackend = backend
+		self.__max_concurrency__: int = int(max_concurrency)
+		self.__max_queue__: int = int(max_queue)
+		self.__timeout__: float = float(timeout)
+		self.__retries__: int = int(retries)
+		self.__backoff__: float = float(backoff)
+		self.__max_backoff__: float = float(max_backoff)
+		self.__pending__: int = 0
+		self.__pending_lock__: threading.Lock = threading.Lock()
+		self.__loop__: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+		self.__semaphore__: asyncio.Semaphore = ...
+		self.__thread__: threading.Thread = threading.Thread(target=self.__run__, name='OpenAIGateway', daemon=True)
+		self.__thread__.start()
+		asyncio.run_coroutine_threadsafe(self.__setup__(), self.__loop__).result()
+
+	def __run__(self) -> None:
+		asyncio.set_event_loop(self.__loop__)
+		self.__loop__.run_forever()
+
+	async def __setup__(self) -> None:
+		self.__semaphore__ = asyncio.Semaphore(self.__max_concurrency__)
+
+	def __admit__(self) -> None:
+		with self.__pending_lock__:
+			if self.__pending__ >= self.__max_concurrency__ + self.__max_queue__:
+				raise GatewayBusyError('Chat gateway is at capacity')
+
+			self.__pending__ += 1
+
+	def __release__(self) -> None:
+		with self.__pending_lock__:
+			self.__pending__ -= 1
+
+	async def __delay__(self, attempt: int) -> None:
+		await asyncio.sleep(random.uniform(0, min(self.__max_backoff__, self.__backoff__ * (2 ** attempt))))
+
+	async def __complete__(self, model: str, instructions: str, messages: list[dict[str, str]]) -> str:
+		for attempt in range(self.__retries__ + 1):
+			async with self.__semaphore__:
+				try:
+					return await asyncio.wait_for(self.__backend__.complete(model, instructions, messages), self.__timeout__)
+				except Exception as e:
+					if attempt >= self.__retries__ or not self.__backend__.is_retryable(e):
+						raise
+
+			await self.__delay__(attempt)
+
+	async def __stream__(self, model: str, instructions: str, messages: list[dict[str, str]], sink: queue.Queue) -> None:
+		for attempt in range(self.__retries__ + 1):
+			async with self.__semaphore__:
+				started: bool = False
+				tokens: collections.abc.AsyncIterator[str] = self.__backend__.stream(model, instructions, messages)
+
+				try:
+					while True:
+						try:
+							token: str = await asyncio.wait_for(anext(tokens), self.__timeout__)
+						except StopAsyncIteration:
+							sink.put(('done', None))
+							return
+
+						started = True
+						sink.put(('token', token))
+				except Exception as e:
+					if started or attempt >= self.__retries__ or not self.__backend__.is_retryable(e):
+						sink.put(('error', e))
+						return
+				finally:
+					await tokens.aclose()
+
+			await self.__delay__(attempt)
+
+	def __check__(self) -> None:
+		# Waiting callers poll this so a dead event loop cannot block them forever
+		if not self.__thread__.is_alive() or self.__loop__.is_closed():
+			raise GatewayClosedError('Chat gateway stopped')
+
+	def complete(self, model: str, instructions: str, messages: list[dict[str, str]]) -> str:
+		"""
+		Generates a full reply, blocking the calling thread until it is available
+		:param model: The model name
+		:param instructions: The system instructions
+		:param messages: The conversation in Responses API input format
+		:return: The reply text
+		:raises GatewayBusyError: If the gateway queue is full
+		:raises GatewayClosedError: If the gateway stopped before the reply was available
+		:raises TimeoutError: If every attempt timed out
+		"""
+
+		self.__admit__()
+
+		try:
+			future: concurrent.futures.Future = asyncio.run_coroutine_threadsafe(self.__complete__(model, instructions, messages), self.__loop__)
+
+			try:
+				while len(concurrent.futures.wait((future,), OpenAIGateway.__POLL).done) == 0:
+					self.__check__()
+
+				return future.result()
+			except BaseException:
+				future.cancel()
+				raise
+		finally:
+			self.__release__()
+
+	def stream(self, model: str, instructions: str, messages: list[dict[str, str]]) -> typing.Generator[str, None, None]:
+		"""
+		Generates a reply incrementally\n
+		Closing the returned generator cancels the upstream request
+		:param model: The model name
+		:param instructions: The system instructions
+		:param messages: The conversation in Responses API input format
+		:return: A generator of reply text deltas
+		:raises GatewayBusyError: If the gateway queue is full
+		:raises GatewayClosedError: If the gateway stopped before the reply was complete
+		:raises TimeoutError: If no token arrived in time on every attempt
+		"""
+
+		self.__admit__()
+		sink: queue.Queue = queue.Queue()
+		future: typing.Optional[concurrent.futures.Future] = None
+
+		try:
+			future = asyncio.run_coroutine_threadsafe(self.__stream__(model, instructions, messages, sink), self.__loop__)
+			future.add_done_callback(lambda done: None if done.cancelled() or done.exception() is None else sink.put(('error', done.exception())))
+
+			while True:
+				try:
+					kind, value = sink.get(timeout=OpenAIGateway.__POLL)
+				except queue.Empty:
+					self.__check__()
+					continue
+
+				if kind == 'token':
+					yield value
+				elif kind == 'error':
+					raise value
+				else:
+					return
+		finally:
+			if future is not None:
+				future.cancel()
+
+			self.__release__()
+
+	def close(self) -> None:
+		"""
+		Stops this gateway's event loop
+		Requests still in flight are cancelled
+		"""
+
+		if self.__loop__.is_closed():
+			return
+
+		asyncio.run_coroutine_threadsafe(self.__backend__.close(), self.__loop__).result()
+		self.__loop__.call_soon_threadsafe(self.__loop__.stop)
+		self.__thread__.join()
+		self.__loop__.close()
+
+	@property
+	def pending(self) -> int:
+		"""
+		:return: The number of requests currently queued or in flight
+		"""
+
+		return self.__pending__
+
+	@property
+	def capacity(self) -> int:
+		"""
+		:return: The maximum number of requests queued or in flight
+		"""
+
+		return self.__max_concurrency__ + self.__max_queue__
+
+
+_GATEWAY: typing.Optional[OpenAIGateway] = None
+_GATEWAY_LOCK: threading.Lock = threading.Lock()
+Metrics.register(Metrics.Gauge('chat_gateway_pending_requests', 'Chat requests queued or in flight in the gateway', function=lambda: 0 if _GATEWAY is None else _GATEWAY.pending))
+
+
+def instance() -> OpenAIGateway:
+	"""
+	Gets the shared gateway, creating it from the environment on first use\n
+	'OPENAI_BACKEND' selects 'openai' (default) or 'stub'; 'OPENAI_MAX_CONCURRENCY', 'OPENAI_MAX_QUEUE', 'OPENAI_TIMEOUT' and 'OPENAI_RETRIES' size it
+	:return: The shared gateway
+	:raises ValueError: If the OpenAI backend is selected and no API key is available
+	"""
+
+	global _GATEWAY
+
+	with _GATEWAY_LOCK:
+		if _GATEWAY is None:
+			backend: OpenAIBackend | StubBackend = StubBackend(latency=float(os.getenv('OPENAI_STUB_LATENCY', '0.5'))) if os.getenv('OPENAI_BACKEND', 'openai').lower() == 'stub' else OpenAIBackend()
+			_GATEWAY = OpenAIGateway(
+				backend,
+				max_concurrency=int(os.getenv('OPENAI_MAX_CONCURRENCY', '8')),
+				max_queue=int(os.getenv('OPENAI_MAX_QUEUE', '32')),
+				timeout=float(os.getenv('OPENAI_TIMEOUT', '30')),
+				retries=int(os.getenv('OPENAI_RETRIES', '2'))
+			)
+
+		return _GATEWAY
+
+
+def shutdown() -> None:
+	"""
+	Closes the shared gateway if it was created
+	"""
+
+	global _GATEWAY
+
+	with _GATEWAY_LOCK:
+		if _GATEWAY is not None:
+			_GATEWAY.close()
+			_GATEWAY = None
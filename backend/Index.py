@@ -0,0 +1,200 @@
+# Secondary indexes over nested fields of database sector values
+
+from __future__ import annotations
+
+import bisect
+import collections.abc
+import typing
+
+MISSING: typing.Any = object()
+
+
+def resolve(value: typing.Any, path: str | tuple[str, ...]) -> typing.Any:
+	"""
+	Gets a nested field of a JSON value\n
+	String paths are split on '.' only where the part before the dot is a key, so keys containing dots ('Meta Data.3. Sector') resolve
+	:param value: The JSON value
+	:param path: The dotted field path or a tuple of keys
+	:return: The field value or 'MISSING' if it does not exist
+	"""
+
+	if isinstance(path, tuple):
+		for key in path:
+			if not isinstance(value, collections.abc.Mapping) or key not in value:
+				return MISSING
+
+			value = value[key]
+
+		return value
+	elif not isinstance(value, collections.abc.Mapping):
+		return MISSING
+	elif path in value:
+		return value[path]
+
+	split: int = path.find('.')
+
+	while split >= 0:
+		if (head := path[:split]) in value and (found := resolve(value[head], path[split + 1:])) is not MISSING:
+			return found
+
+		split = path.find('.', split + 1)
+
+	return MISSING
+
+
+def order(value: typing.Any) -> typing.Optional[tuple[int, typing.Any]]:
+	"""
+	Gets the key a scalar is sorted by inside an index\n
+	Booleans, numbers and strings sort in separate groups so mixed types never compare
+	:param value: The scalar
+	:return: The sort key or None if the value cannot be indexed (including NaN)
+	"""
+
+	if isinstance(value, bool):
+		return 0, value
+	elif isinstance(value, (int, float)) and value == value:
+		return 1, value
+	elif isinstance(value, str):
+		return 2, value
+	else:
+		return None
+
+
+class SectorIndex:
+	"""
+	In-memory index from a nested field of each record to the keys of the records holding it\n
+	List fields index every element, so a record is found by any value it contains\n
+	Records are the top-level values of a sector or, with a root, the values of the mapping stored under that top-level key
+	"""
+
+	def __init__(self, path: str | tuple[str, ...], *, root: typing.Optional[str] = None):
+		"""
+		In-memory index from a nested field of each record to the keys of the records holding it\n
+		- Constructor -
+		:param path: The dotted field path or a tuple of keys, relative to each record
+		:param root: The top-level key holding the records or None to index top-level values
+		"""
+
+		assert isinstance(path, (str, tuple)) and len(path) > 0, 'Invalid index path'
+		assert root is None or isinstance(root, str), 'Invalid index root'
+		self.__path__: str | tuple[str, ...] = path
+		self.__root__: typing.Optional[str] = root
+		self.__keys__: dict[str, tuple[tuple[int, typing.Any], ...]] = {}
+		self.__buckets__: dict[tuple[int, typing.Any], dict[str, None]] = {}
+		self.__order__: list[tuple[int, typing.Any]] = []
+
+	def __len__(self) -> int:
+		"""
+		:return: The number of indexed records
+		"""
+
+		return len(self.__keys__)
+
+	def __values__(self, record: typing.Any) -> tuple[tuple[int, typing.Any], ...]:
+		field: typing.Any = resolve(record, self.__path__)
+		fields: typing.Iterable[typing.Any] = field if isinstance(field, (list, tuple)) else (field,)
+		return tuple(dict.fromkeys(key for item in fields if (key := order(item)) is not None))
+
+	def update(self, key: str, record: typing.Any = MISSING) -> None:
+		"""
+		Re-indexes a single record
+		:param key: The record key
+		:param record: The record or 'MISSING' if it was removed
+		"""
+
+		for value in self.__keys__.pop(key, ()):
+			bucket: dict[str, None] = self.__buckets__[value]
+			del bucket[key]
+
+			if len(bucket) == 0:
+				del self.__buckets__[value]
+				del self.__order__[bisect.bisect_left(self.__order__, value)]
+
+		if record is MISSING or len(values := self.__values__(record)) == 0:
+			return
+
+		self.__keys__[key] = values
+
+		for value in values:
+			if (bucket := self.__buckets__.get(value)) is None:
+				bucket = self.__buckets__[value] = {}
+				bisect.insort(self.__order__, value)
+
+			bucket[key] = None
+
+	def rebuild(self, records: typing.Any) -> None:
+		"""
+		Re-indexes all records
+		:param records: The mapping of record keys to records (anything else indexes nothing)
+		"""
+
+		self.clear()
+
+		if isinstance(records, collections.abc.Mapping):
+			for key, record in records.items():
+				self.update(key, record)
+
+	def clear(self) -> None:
+		"""
+		Removes all records from this index
+		"""
+
+		self.__keys__.clear()
+		self.__buckets__.clear()
+		self.__order__.clear()
+
+	def equal(self, value: typing.Any) -> list[str]:
+		"""
+		:param value: The field value
+		:return: The keys of the records whose field equals (or contains) 'value'
+		"""
+
+		key: typing.Optional[tuple[int, typing.Any]] = order(value)
+		return [] if key is None else list(self.__buckets__.get(key, ()))
+
+	def range(self, low: typing.Any = None, high: typing.Any = None, *, inclusive: tuple[bool, bool] = (True, True)) -> list[str]:
+		"""
+		Gets records whose field lies within bounds, ordered by field value\n
+		Only values of the bounds' type group (numbers or strings) are returned
+		:param low: The lower bound or None if unbounded
+		:param high: The upper bound or None if unbounded
+		:param inclusive: Whether the lower and upper bounds are inclusive
+		:return: The keys of the matching records
+		:raises TypeError: If a bound cannot be indexed or the bounds are of different types
+		"""
+
+		lower: typing.Optional[tuple[int, typing.Any]] = None if low is None else order(low)
+		upper: typing.Optional[tuple[int, typing.Any]] = None if high is None else order(high)
+
+		if (low is not None and lower is None) or (high is not None and upper is None):
+			raise TypeError('Index bounds must be booleans, numbers or strings')
+		elif lower is not None and upper is not None and lower[0] != upper[0]:
+			raise TypeError('Index bounds must be of the same type')
+
+		group: typing.Optional[int] = lower[0] if lower is not None else None if upper is None else upper[0]
+		start: int = 0 if group is None else bisect.bisect_left(self.__order__, (group,))
+		stop: int = len(self.__order__) if group is None else bisect.bisect_left(self.__order__, (group + 1,))
+
+		if lower is not None:
+			start = (bisect.bisect_left if inclusive[0] else bisect.bisect_right)(self.__order__, lower, start, stop)
+
+		if upper is not None:
+			stop = (bisect.bisect_right if inclusive[1] else bisect.bisect_left)(self.__order__, upper, start, stop)
+
+		return list(dict.fromkeys(key for value in self.__order__[start:stop] for key in self.__buckets__[value]))
+
+	@property
+	def path(self) -> str | tuple[str, ...]:
+		"""
+		:return: The indexed field path
+		"""
+
+		return self.__path__
+
+	@property
+	def root(self) -> typing.Optional[str]:
+		"""
+		:return: The top-level key holding the records or None if top-level values are indexed
+		"""
+
+		return self.__root__
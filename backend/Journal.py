@@ -0,0 +1,259 @@
+# Append-only write-ahead journal with group commit
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import typing
+import zlib
+
+
+def atomic_write(path: str, data: bytes) -> None:
+	"""
+	Replaces a file's contents so readers and crashes only ever observe the old or the new contents\n
+	Data is written and synced to a sibling temporary file which is then renamed over 'path'
+	:param path: The file path
+	:param data: The new contents
+	"""
+
+	temporary: str = f'{path}.tmp'
+
+	with open(temporary, 'wb') as output:
+		output.write(data)
+		output.flush()
+		os.fsync(output.fileno())
+
+	os.replace(temporary, path)
+
+	if os.name == 'posix':
+		directory: int = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+
+		try:
+			os.fsync(directory)
+		finally:
+			os.close(directory)
+
+
+class Journal:
+	"""
+	Append-only log of JSON records stored next to a sector file\n
+	Each record is framed with its length and CRC32 so a torn write at the tail is detected and discarded on replay\n
+	Concurrent appends share fsync calls (group commit): whichever caller syncs first makes every record written before it durable\n
+	With a cipher (any object with 'encrypt' and 'decrypt' taking and returning bytes) every record is encrypted on its own
+	"""
+
+	__FRAME: struct.Struct = struct.Struct('>II')
+
+	def __init__(self, path: str, *, cipher: typing.Any = None):
+		"""
+		Append-only log of JSON records stored next to a sector file\n
+		- Constructor -
+		:param path: The journal file path (created if missing)
+		:param cipher: The cipher records are encrypted with or None to store them as plain JSON
+		"""
+
+		self.__path__: str = str(path)
+		self.__cipher__: typing.Any = cipher
+		self.__file__: typing.Optional[typing.BinaryIO] = open(self.__path__, 'ab', buffering=0)
+		self.__size__: int = self.__file__.seek(0, os.SEEK_END)
+		self.__write_lock__: threading.Lock = threading.Lock()
+		self.__sync_lock__: threading.Lock = threading.Lock()
+		self.__written__: int = 0
+		self.__synced__: int = 0
+
+	@staticmethod
+	def frame(record: typing.Any, cipher: typing.Any = None) -> bytes:
+		"""
+		Encodes a single record
+		:param record: The JSON serializable record
+		:param cipher: The cipher to encrypt the record with or None
+		:return: The framed record bytes
+		"""
+
+		payload: bytes = json.dumps(record, separators=(',', ':')).encode('utf-8')
+		payload = payload if cipher is None else cipher.encrypt(payload)
+		return Journal.__FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+	@staticmethod
+	def read(path: str, cipher: typing.Any = None, offset: int = 0) -> tuple[list[typing.Any], int]:
+		"""
+		Reads the intact records of a journal file starting at a byte offset without modifying the file
+		:param path: The journal file path
+		:param cipher: The cipher records were encrypted with or None
+		:param offset: The offset of the first record to read
+		:return: The records in the order they were appended and the offset following the last intact one
+		:raises PermissionError: If an intact record does not decrypt with the cipher
+		"""
+
+		if not os.path.isfile(path):
+			return [], 0
+
+		with open(path, 'rb') as source:
+			source.seek(offset)
+			data: bytes = source.read()
+
+		records: list[typing.Any] = []
+		start: int = offset
+		offset = 0
+		header: int = Journal.__FRAME.size
+
+		while offset + header <= len(data):
+			length, checksum = Journal.__FRAME.unpack_from(data, offset)
+			payload: bytes = data[offset + header:offset + header + length]
+
+			if len(payload) != length or zlib.crc32(payload) != checksum:
+				break
+
+			payload = payload if cipher is None else cipher.decrypt(payload)
+
+			try:
+				records.append(json.loads(payload.decode('utf-8')))
+			except ValueError:
+				break
+
+			offset += header + length
+
+		return records, start + offset
+
+	@staticmethod
+	def replay(path: str, cipher: typing.Any = None) -> list[typing.Any]:
+		"""
+		Reads all intact records from a journal file\n
+		A torn or corrupt tail is truncated away
+		:param path: The journal file path
+		:param cipher: The cipher records were encrypted with or None
+		:return: The records in the order they were appended
+		:raises PermissionError: If an intact record does not decrypt with the cipher
+		"""
+
+		records, offset = Journal.read(path, cipher)
+
+		if os.path.isfile(path) and offset < os.path.getsize(path):
+			with open(path, 'r+b') as source:
+				source.truncate(offset)
+				os.fsync(source.fileno())
+
+		return records
+
+	def write(self, records: typing.Iterable[typing.Any]) -> int:
+		"""
+		Writes records to the journal without waiting for them to be durable
+		:param records: The JSON serializable records
+		:return: A ticket to pass to 'Journal.sync'
+		:raises IOError: If the journal is closed
+		"""
+
+		data: bytes = b''.join(Journal.frame(record, self.__cipher__) for record in records)
+
+		with self.__write_lock__:
+			if self.__file__ is None:
+				raise IOError('Operation on closed journal')
+
+			view: memoryview = memoryview(data)
+
+			while len(view) > 0:
+				view = view[self.__file__.write(view):]
+
+			self.__size__ += len(data)
+			self.__written__ += 1
+			return self.__written__
+
+	def sync(self, ticket: int) -> None:
+		"""
+		Blocks until the records written under the specified ticket are on disk
+		:param ticket: The ticket returned by 'Journal.write'
+		"""
+
+		with self.__sync_lock__:
+			if self.__synced__ >= ticket or self.__file__ is None:
+				return
+
+			with self.__write_lock__:
+				target: int = self.__written__
+				descriptor: int = self.__file__.fileno()
+
+			os.fsync(descriptor)
+			self.__synced__ = target
+
+	def append(self, records: typing.Iterable[typing.Any]) -> None:
+		"""
+		Writes records to the journal and waits until they are durable
+		:param records: The JSON serializable records
+		"""
+
+		self.sync(self.write(records))
+
+	def refresh(self) -> None:
+		"""
+		Re-reads the journal size after other processes appended to or emptied the file
+		"""
+
+		with self.__write_lock__:
+			if self.__file__ is not None:
+				self.__size__ = os.fstat(self.__file__.fileno()).st_size
+
+	def reset(self) -> None:
+		"""
+		Empties the journal (after its records were checkpointed into a snapshot)
+		"""
+
+		self.truncate(0)
+
+	def truncate(self, size: int) -> None:
+		"""
+		Cuts the journal file to a size, making everything before it durable
+		:param size: The new size in bytes
+		"""
+
+		with self.__sync_lock__, self.__write_lock__:
+			if self.__file__ is None:
+				return
+
+			self.__file__.truncate(size)
+			os.fsync(self.__file__.fileno())
+			self.__size__ = size
+			self.__synced__ = self.__written__
+
+	def close(self) -> None:
+		"""
+		Closes the journal file
+		"""
+
+		with self.__sync_lock__, self.__write_lock__:
+			if self.__file__ is not None:
+				self.__file__.close()
+				self.__file__ = None
+
+	@property
+	def path(self) -> str:
+		"""
+		:return: The journal file path
+		"""
+
+		return self.__path__
+
+	@property
+	def cipher(self) -> typing.Any:
+		"""
+		:return: The cipher records are encrypted with or None
+		"""
+
+		return self.__cipher__
+
+	@cipher.setter
+	def cipher(self, cipher: typing.Any) -> None:
+		"""
+		:param cipher: The cipher later records are encrypted with or None
+		"""
+
+		self.__cipher__ = cipher
+
+	@property
+	def size(self) -> int:
+		"""
+		:return: The journal size in bytes
+		"""
+
+		return self.__size__
@@ -1,74 +1,624 @@
 # Logging
+from __future__ import annotations
+
+import collections
 import datetime
 import gzip
+import io
+import json
+import os
+import queue
+import re
+import shutil
 import sys
+import threading
+import time
+import traceback
+import typing
 
 import CustomMethodsVI.FileSystem as FileSystem
 import CustomMethodsVI.Logger as Logger
-import CustomMethodsVI.Stream as Stream
-import CustomMethodsVI.Terminal.Struct as Struct
+
+import Metrics
+
+HEADER: str = '{%D} {%T} - [ {%TZ} ] [ {%C} ] -> Thread {%TID}: {%M}'
+ANSI: re.Pattern = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
+ARCHIVE: str = '%m-%d-%Y_%H-%M-%S'
+
+
+class RotatingLogFile(io.TextIOBase):
+	"""
+	Text file that moves itself aside once it grows past a size or age\n
+	Rotated files are renamed after their last modification time (keeping the extension) and gzipped on a background thread, then the oldest archives
+	past the retention count or age are deleted. Files left uncompressed by an earlier process are compressed as well\n
+	Rotation happens inside 'write', so callers should write whole lines
+	"""
+
+	def __init__(self, directory: str, name: str = 'latest.log', *, archive: bool = True, max_bytes: int = 64 << 20, max_seconds: float = 86400, keep: int = 30, keep_seconds: float = 30 * 86400):
+		"""
+		Text file that moves itself aside once it grows past a size or age\n
+		- Constructor -
+		:param directory: The log directory
+		:param name: The name of the file being written (other files with its extension in the directory are taken for its archives)
+		:param archive: Whether to archive an existing file (otherwise it is truncated)
+		:param max_bytes: The approximate size after which the file is rotated or 0 for no limit
+		:param max_seconds: The age after which the file is rotated or 0 for no limit
+		:param keep: The number of archives kept or 0 for no limit
+		:param keep_seconds: The age after which archives are deleted or 0 for no limit
+		"""
+
+		assert max_bytes >= 0 and max_seconds >= 0 and keep >= 0 and keep_seconds >= 0, 'Invalid rotation limits'
+		super().__init__()
+		self.__directory__: str = str(directory)
+		self.__path__: str = os.path.join(self.__directory__, name)
+		self.__extension__: str = os.path.splitext(name)[1]
+		self.__max_bytes__: int = int(max_bytes)
+		self.__max_seconds__: float = float(max_seconds)
+		self.__keep__: int = int(keep)
+		self.__keep_seconds__: float = float(keep_seconds)
+		self.__lock__: threading.Lock = threading.Lock()
+		self.__pending__: queue.Queue[str] = queue.Queue()
+		self.__compressor__: typing.Optional[threading.Thread] = None
+		self.__file__: typing.Optional[typing.TextIO] = None
+		self.__size__: int = 0
+		self.__opened__: float = 0
+
+		for entry in os.listdir(self.__directory__):
+			if entry.endswith('.gz.part'):
+				os.remove(os.path.join(self.__directory__, entry))
+			elif entry.endswith(self.__extension__) and entry != name:
+				self.__pending__.put(os.path.join(self.__directory__, entry))
+
+		if archive and os.path.isfile(self.__path__) and os.path.getsize(self.__path__) > 0:
+			self.__archive__()
+
+		self.__open__()
+		self.prune()
+		self.__schedule__()
+
+	def __open__(self) -> None:
+		self.__file__ = open(self.__path__, 'w', encoding='utf-8', buffering=1 << 16)
+		self.__size__ = 0
+		self.__opened__ = time.monotonic()
+
+	def __archive__(self) -> None:
+		modified: datetime.datetime = datetime.datetime.fromtimestamp(os.path.getmtime(self.__path__))
+		target: str = os.path.join(self.__directory__, f'{modified.strftime(ARCHIVE)}{self.__extension__}')
+		suffix: int = 0
+
+		while os.path.exists(target) or os.path.exists(f'{target}.gz'):
+			suffix += 1
+			target = os.path.join(self.__directory__, f'{modified.strftime(ARCHIVE)}_{suffix}{self.__extension__}')
+
+		# A rename is instant; compression of possibly gigabytes of text happens in the background
+		os.replace(self.__path__, target)
+		self.__pending__.put(target)
+		_ROTATIONS.inc()
+		self.__schedule__()
+
+	def __schedule__(self) -> None:
+		if self.__compressor__ is None and not self.__pending__.empty():
+			self.__compressor__ = threading.Thread(target=self.__compress__, name='Logging-compressor', daemon=True)
+			self.__compressor__.start()
+
+	def __compress__(self) -> None:
+		while True:
+			path: str = self.__pending__.get()
+
+			try:
+				# Written under a temporary name so an interrupted compression never leaves a truncated archive
+				with open(path, 'rb') as source, gzip.open(f'{path}.gz.part', 'wb', compresslevel=6) as target:
+					shutil.copyfileobj(source, target, 1 << 20)
+
+				modified: float = os.path.getmtime(path)
+				os.replace(f'{path}.gz.part', f'{path}.gz')
+				os.utime(f'{path}.gz', (modified, modified))
+				os.remove(path)
+			except OSError as e:
+				if os.path.isfile(f'{path}.gz.part'):
+					os.remove(f'{path}.gz.part')
+
+				if not isinstance(e, FileNotFoundError):
+					# Deleted by retention meanwhile otherwise
+					sys.__stderr__.write(f'Compression of log \'{path}\' failed:\n{''.join(traceback.format_exception(e))}')
+
+			self.prune()
+
+	def write(self, data: str) -> int:
+		"""
+		Writes text, rotating the file first if it is due
+		:param data: The text
+		:return: The number of characters written
+		:raises ValueError: If the file is closed
+		"""
+
+		with self.__lock__:
+			if self.__file__ is None:
+				raise ValueError('I/O operation on closed log')
+			elif self.__size__ > 0 and ((0 < self.__max_bytes__ <= self.__size__) or (0 < self.__max_seconds__ <= time.monotonic() - self.__opened__)):
+				self.__file__.close()
+				self.__archive__()
+				self.__open__()
+
+			self.__size__ += len(data)
+			return self.__file__.write(data)
+
+	def flush(self) -> None:
+		"""
+		Flushes the current file
+		"""
+
+		with self.__lock__:
+			if self.__file__ is not None:
+				self.__file__.flush()
+
+	def close(self) -> None:
+		"""
+		Closes the current file; pending compressions are resumed by the next process if this one exits first
+		"""
+
+		with self.__lock__:
+			if self.__file__ is not None:
+				self.__file__.close()
+				self.__file__ = None
+
+		super().close()
+
+	def prune(self) -> list[str]:
+		"""
+		Deletes archives past the retention count or age
+		:return: The deleted file names
+		"""
+
+		now: float = time.time()
+		archives: list[tuple[float, str]] = []
+
+		for entry in os.listdir(self.__directory__):
+			if entry.endswith(f'{self.__extension__}.gz') or (entry.endswith(self.__extension__) and os.path.join(self.__directory__, entry) != self.__path__):
+				try:
+					archives.append((os.path.getmtime(os.path.join(self.__directory__, entry)), entry))
+				except FileNotFoundError:
+					continue
+
+		archives.sort(reverse=True)
+		deleted: list[str] = []
+
+		for i, (modified, entry) in enumerate(archives):
+			if (0 < self.__keep__ <= i) or (0 < self.__keep_seconds__ <= now - modified):
+				try:
+					os.remove(os.path.join(self.__directory__, entry))
+					deleted.append(entry)
+				except FileNotFoundError:
+					continue
+
+		return deleted
+
+	def writable(self) -> bool:
+		"""
+		:return: True
+		"""
+
+		return True
+
+	@property
+	def path(self) -> str:
+		"""
+		:return: The path of the file being written
+		"""
+
+		return self.__path__
+
+
+class LogPipeline:
+	"""
+	Moves console output off the threads producing it\n
+	Writers only append to a queue; a background thread splits the queued text into lines, echoes it to the console,
+	strips ANSI escape codes and appends the non-blank lines to the log file, flushing once per batch.
+	A batch is written every 'interval' seconds or as soon as 'batch' writes are queued\n
+	Each line keeps the time and thread of the write that ended it
+	"""
+
+	def __init__(self, logstream: io.IOBase, *, timezone: datetime.tzinfo = datetime.timezone.utc, interval: float = 0.25, batch: int = 1024, capacity: int = 65536):
+		"""
+		Moves console output off the threads producing it\n
+		- Constructor -
+		:param logstream: The text stream log lines are written to
+		:param timezone: The timezone lines are stamped in
+		:param interval: The maximum seconds a write waits before it is written
+		:param batch: The number of queued writes that wakes the writer early
+		:param capacity: The number of queued writes after which further writes are dropped
+		"""
+
+		assert interval > 0, 'Invalid flush interval'
+		assert isinstance(batch, int) and isinstance(capacity, int) and 0 < batch <= capacity, 'Invalid queue limits'
+		self.__logstream__: io.IOBase = logstream
+		self.__timezone__: datetime.tzinfo = timezone
+		self.__zone__: str = str(timezone)
+		self.__interval__: float = float(interval)
+		self.__batch__: int = int(batch)
+		self.__capacity__: int = int(capacity)
+		self.__queue__: collections.deque[tuple[str, typing.TextIO, str, float, int]] = collections.deque()
+		self.__partial__: dict[tuple[str, typing.TextIO], str] = {}
+		self.__dropped__: int = 0
+		self.__wake__: threading.Event = threading.Event()
+		self.__stopped__: threading.Event = threading.Event()
+		self.__drain_lock__: threading.Lock = threading.Lock()
+		self.__thread__: typing.Optional[threading.Thread] = None
+
+	def __enqueue__(self, category: str, console: typing.TextIO, data: str) -> None:
+		# Runs on the writing thread: a deque append is atomic, so no lock is taken
+		queue: collections.deque = self.__queue__
+
+		if len(queue) >= self.__capacity__:
+			self.__dropped__ += 1
+			_DROPPED.inc()
+			return
+
+		queue.append((category, console, data, time.time(), threading.get_ident()))
+
+		if len(queue) >= self.__batch__:
+			self.__wake__.set()
+
+	def __line__(self, category: str, message: str, when: float, thread: int) -> str:
+		now: datetime.datetime = datetime.datetime.fromtimestamp(when, self.__timezone__)
+
+		return HEADER \
+			.replace('{%D}', now.strftime('%m/%d/%Y')) \
+			.replace('{%T}', now.strftime('%H:%M:%S.%f')) \
+			.replace('{%TZ}', self.__zone__) \
+			.replace('{%C}', category) \
+			.replace('{%TID}', str(thread)) \
+			.replace('{%M}', message)
+
+	def __drain__(self, final: bool = False) -> int:
+		with self.__drain_lock__:
+			queue: collections.deque = self.__queue__
+			echoed: dict[typing.TextIO, list[str]] = {}
+			lines: list[str] = []
+			count: int = 0
+
+			if final:
+				# Terminates lines still waiting for their newline
+				for category, console in tuple(self.__partial__):
+					queue.append((category, console, '\n', time.time(), threading.get_ident()))
+
+			# Bounded by the length at the start, so writers cannot keep one drain running forever
+			for _ in range(len(queue)):
+				category, console, data, when, thread = queue.popleft()
+				text: str = self.__partial__.pop((category, console), '') + data
+				head, newline, tail = text.rpartition('\n')
+
+				if len(tail) > 0:
+					self.__partial__[(category, console)] = tail
+
+				if len(newline) == 0:
+					continue
+
+				echoed.setdefault(console, []).append(head + newline)
+
+				for line in ANSI.sub('', head).split('\n'):
+					if len(line.strip()) > 0:
+						lines.append(self.__line__(category, line, when, thread) + '\n')
+
+				count += 1
+
+			try:
+				for console, parts in echoed.items():
+					console.write(''.join(parts))
+					console.flush()
+
+				if len(lines) > 0:
+					self.__logstream__.write(''.join(lines))
+					self.__logstream__.flush()
+			except (OSError, ValueError) as e:
+				sys.__stderr__.write(f'Log write failed:\n{''.join(traceback.format_exception(e))}')
+
+			return count
+
+	def __run__(self) -> None:
+		while not self.__stopped__.is_set():
+			self.__wake__.wait(self.__interval__)
+			self.__wake__.clear()
+			self.__drain__()
+
+	def stream(self, category: str, console: typing.TextIO) -> LogStream:
+		"""
+		:param category: The logger category lines written to the stream are logged under
+		:param console: The console stream written text is echoed to
+		:return: A text stream feeding this pipeline
+		"""
+
+		return LogStream(self, category, console)
+
+	def start(self) -> None:
+		"""
+		Starts the background writer thread
+		"""
+
+		if self.__thread__ is None:
+			self.__thread__ = threading.Thread(target=self.__run__, name='Logging-writer', daemon=True)
+			self.__thread__.start()
+
+	def flush(self) -> None:
+		"""
+		Writes every queued line now on the calling thread
+		"""
+
+		self.__drain__()
+
+	def stop(self) -> None:
+		"""
+		Stops the writer thread and writes everything still queued, including unterminated lines
+		"""
+
+		self.__stopped__.set()
+		self.__wake__.set()
+
+		if self.__thread__ is not None:
+			self.__thread__.join()
+
+		self.__drain__(True)
+
+	@property
+	def pending(self) -> int:
+		"""
+		:return: The number of queued writes
+		"""
+
+		return len(self.__queue__)
+
+	@property
+	def dropped(self) -> int:
+		"""
+		:return: The approximate number of writes dropped while the queue was full
+		"""
+
+		return self.__dropped__
+
+
+class JsonLinesSink:
+	"""
+	Writes JSON records as lines of a text stream from a background thread\n
+	'put' only appends to a queue; records are serialized and written every 'interval' seconds or as soon as 'batch' are queued, with one flush per batch
+	"""
+
+	def __init__(self, stream: io.IOBase, *, interval: float = 1, batch: int = 1024, capacity: int = 65536):
+		"""
+		Writes JSON records as lines of a text stream from a background thread\n
+		- Constructor -
+		:param stream: The text stream records are written to
+		:param interval: The maximum seconds a record waits before it is written
+		:param batch: The number of queued records that wakes the writer early
+		:param capacity: The number of queued records after which further records are dropped
+		"""
+
+		assert interval > 0, 'Invalid flush interval'
+		assert isinstance(batch, int) and isinstance(capacity, int) and 0 < batch <= capacity, 'Invalid queue limits'
+		self.__stream__: io.IOBase = stream
+		self.__interval__: float = float(interval)
+		self.__batch__: int = int(batch)
+		self.__capacity__: int = int(capacity)
+		self.__queue__: collections.deque[dict[str, typing.Any]] = collections.deque()
+		self.__dropped__: int = 0
+		self.__wake__: threading.Event = threading.Event()
+		self.__stopped__: threading.Event = threading.Event()
+		self.__drain_lock__: threading.Lock = threading.Lock()
+		self.__thread__: typing.Optional[threading.Thread] = None
+
+	def __drain__(self) -> int:
+		with self.__drain_lock__:
+			queue: collections.deque = self.__queue__
+			lines: list[str] = [json.dumps(queue.popleft(), separators=(',', ':'), default=str) for _ in range(len(queue))]
+
+			if len(lines) > 0:
+				try:
+					self.__stream__.write('\n'.join(lines) + '\n')
+					self.__stream__.flush()
+				except (OSError, ValueError) as e:
+					sys.__stderr__.write(f'Record write failed:\n{''.join(traceback.format_exception(e))}')
+
+			return len(lines)
+
+	def __run__(self) -> None:
+		while not self.__stopped__.is_set():
+			self.__wake__.wait(self.__interval__)
+			self.__wake__.clear()
+			self.__drain__()
+
+	def put(self, record: dict[str, typing.Any]) -> bool:
+		"""
+		Queues a record without blocking; it must not be modified afterwards
+		:param record: The JSON serializable record (other values are written as strings)
+		:return: Whether the record was queued (False if the queue is full)
+		"""
+
+		queue: collections.deque = self.__queue__
+
+		if len(queue) >= self.__capacity__:
+			self.__dropped__ += 1
+			return False
+
+		queue.append(record)
+
+		if len(queue) >= self.__batch__:
+			self.__wake__.set()
+
+		return True
+
+	def start(self) -> None:
+		"""
+		Starts the background writer thread
+		"""
+
+		if self.__thread__ is None:
+			self.__thread__ = threading.Thread(target=self.__run__, name='Logging-records', daemon=True)
+			self.__thread__.start()
+
+	def flush(self) -> None:
+		"""
+		Writes every queued record now on the calling thread
+		"""
+
+		self.__drain__()
+
+	def stop(self) -> None:
+		"""
+		Stops the writer thread and writes everything still queued
+		"""
+
+		self.__stopped__.set()
+		self.__wake__.set()
+
+		if self.__thread__ is not None:
+			self.__thread__.join()
+
+		self.__drain__()
+
+	@property
+	def pending(self) -> int:
+		"""
+		:return: The number of queued records
+		"""
+
+		return len(self.__queue__)
+
+	@property
+	def dropped(self) -> int:
+		"""
+		:return: The approximate number of records dropped while the queue was full
+		"""
+
+		return self.__dropped__
+
+
+class LogStream(io.TextIOBase):
+	"""
+	Text stream handing writes to a 'LogPipeline'\n
+	'write' and 'flush' never block on I/O
+	"""
+
+	def __init__(self, pipeline: LogPipeline, category: str, console: typing.TextIO):
+		"""
+		Text stream handing writes to a 'LogPipeline'\n
+		- Constructor -
+		:param pipeline: The pipeline
+		:param category: The logger category lines are logged under
+		:param console: The console stream written text is echoed to
+		"""
+
+		super().__init__()
+		self.__pipeline__: LogPipeline = pipeline
+		self.__category__: str = str(category)
+		self.__console__: typing.TextIO = console
+
+	def write(self, data: str) -> int:
+		"""
+		Queues text for the pipeline
+		:param data: The text
+		:return: The number of characters written
+		"""
+
+		if not isinstance(data, str):
+			return 0
+		elif len(data) > 0:
+			self.__pipeline__.__enqueue__(self.__category__, self.__console__, data)
+
+		return len(data)
+
+	def flush(self) -> None:
+		"""
+		Does nothing; the pipeline flushes in batches
+		"""
+
+		pass
+
+	def writable(self) -> bool:
+		"""
+		:return: True
+		"""
+
+		return True
+
+	def isatty(self) -> bool:
+		"""
+		:return: False, as text is echoed to the console from another thread
+		"""
+
+		return False
+
+	@property
+	def encoding(self) -> str:
+		"""
+		:return: The console encoding
+		"""
+
+		return getattr(self.__console__, 'encoding', None) or 'utf-8'
+
+
+_PIPELINE: typing.Optional[LogPipeline] = None
+_LOGGER: typing.Optional[Logger.Logger] = None
+_LOCK: threading.Lock = threading.Lock()
+Metrics.register(Metrics.Gauge('log_queue_depth', 'Console writes waiting for the log writer', function=lambda: 0 if _PIPELINE is None else _PIPELINE.pending))
+_DROPPED: Metrics.Counter = Metrics.register(Metrics.Counter('log_dropped_total', 'Console writes dropped while the log queue was full'))
+_ROTATIONS: Metrics.Counter = Metrics.register(Metrics.Counter('log_rotations_total', 'Log files moved aside for compression'))
 
 
 def init(store_old_latest: bool = True) -> Logger.Logger:
+	"""
+	Redirects 'sys.stdout' and 'sys.stderr' to a background log pipeline writing 'logs/latest.log'\n
+	'LOG_FLUSH_INTERVAL' (seconds, default 0.25), 'LOG_FLUSH_BATCH' (writes, default 1024) and 'LOG_QUEUE_CAPACITY' (writes, default 65536) size the pipeline\n
+	The log is rotated past 'LOG_ROTATE_BYTES' (default 64 MiB) or 'LOG_ROTATE_SECONDS' (default one day) and the newest 'LOG_RETENTION_COUNT' archives (default 30)
+	younger than 'LOG_RETENTION_SECONDS' (default 30 days) are kept; 0 disables a limit
+	:param store_old_latest: Whether to archive the previous 'latest.log' (compressed in the background) instead of overwriting it
+	:return: The logger owning the log file
+	"""
+
+	global _PIPELINE, _LOGGER
+
 	backend: FileSystem.Directory = FileSystem.File(__file__).parent
 	logdir: FileSystem.Directory = backend.directory('logs')
 
 	if not logdir.exists():
 		logdir.create()
 
-	logfile: FileSystem.File = logdir.file('latest.log')
+	with _LOCK:
+		logstream: RotatingLogFile = RotatingLogFile(
+			logdir.dirpath,
+			archive=store_old_latest,
+			max_bytes=int(os.getenv('LOG_ROTATE_BYTES', str(64 << 20))),
+			max_seconds=float(os.getenv('LOG_ROTATE_SECONDS', '86400')),
+			keep=int(os.getenv('LOG_RETENTION_COUNT', '30')),
+			keep_seconds=float(os.getenv('LOG_RETENTION_SECONDS', str(30 * 86400)))
+		)
+		logger: Logger.Logger = Logger.Logger(logstream, header_format=HEADER)
+		pipeline: LogPipeline = LogPipeline(
+			logstream,
+			interval=float(os.getenv('LOG_FLUSH_INTERVAL', '0.25')),
+			batch=int(os.getenv('LOG_FLUSH_BATCH', '1024')),
+			capacity=int(os.getenv('LOG_QUEUE_CAPACITY', '65536'))
+		)
+		pipeline.start()
+		sys.stdout = pipeline.stream('DEBUG', sys.__stdout__)
+		sys.stderr = pipeline.stream('ERROR', sys.__stderr__)
+		_PIPELINE = pipeline
+		_LOGGER = logger
+		return logger
 
-	if logfile.exists() and store_old_latest:
-		ctime: datetime.datetime = logfile.time_modified
 
-		with logfile.open('rb') as input_stream:
-			with gzip.open(logdir.file(ctime.strftime('%m-%d-%Y_%H-%M-%S.log.gz')).filepath, 'wb') as output_stream:
-				while len(chunk := input_stream.read(1024)) > 0:
-					output_stream.write(chunk)
+def shutdown() -> None:
+	"""
+	Writes all queued output, restores 'sys.stdout' and 'sys.stderr' and closes the log file
+	"""
 
-	logstream: Stream.FileStream = logfile.open('w')
-	logger: Logger.Logger = Logger.Logger(logstream)
-	stdout: Stream.EventedStream[str] = Stream.EventedStream()
-	stderr: Stream.EventedStream[str] = Stream.EventedStream()
-	sys.stdout = stdout
-	sys.stderr = stderr
-	stdout_buffer: list[str] = []
-	stderr_buffer: list[str] = []
+	global _PIPELINE, _LOGGER
 
-	@stdout.on('write')
-	def on_stdout_write(data: str) -> None:
-		if not isinstance(data, str):
+	with _LOCK:
+		if _PIPELINE is None:
 			return
 
-		for char in data:
-			if char == '\n':
-				msg: str = ''.join(stdout_buffer) + '\n'
-				stdout_buffer.clear()
-				sys.__stdout__.write(msg)
-				no_ansi: str = Struct.AnsiStr(msg).raw
-
-				if len(no_ansi.strip()):
-					logger.debug(no_ansi, end='')
-					logstream.flush()
-			else:
-				stdout_buffer.append(char)
-
-	@stderr.on('write')
-	def on_stderr_write(data: str) -> None:
-		if not isinstance(data, str):
-			return
-
-		for char in data:
-			if char == '\n':
-				msg: str = ''.join(stderr_buffer) + '\n'
-				stderr_buffer.clear()
-				sys.__stderr__.write(msg)
-				no_ansi: str = Struct.AnsiStr(msg).raw
-
-				if len(no_ansi.strip()):
-					logger.error(no_ansi, end='')
-					logstream.flush()
-			else:
-				stderr_buffer.append(char)
-
-	return logger
+		sys.stdout = sys.__stdout__
+		sys.stderr = sys.__stderr__
+		_PIPELINE.stop()
+		_LOGGER.close()
+		_PIPELINE = None
+		_LOGGER = None
@@ -0,0 +1,443 @@
+# Request and upstream instrumentation exposed in Prometheus text format
+
+from __future__ import annotations
+
+import collections.abc
+import contextlib
+import math
+import threading
+import time
+import typing
+
+
+class Histogram:
+	"""
+	Log-linear (HDR style) histogram of non-negative durations\n
+	Values are recorded in microseconds into buckets with a bounded relative error of 2^-(precision-1)
+	"""
+
+	def __init__(self, precision: int = 5):
+		"""
+		Log-linear (HDR style) histogram of non-negative durations\n
+		- Constructor -
+		:param precision: The number of significant bits kept per value
+		"""
+
+		assert isinstance(precision, int) and 2 <= precision <= 16, 'Invalid histogram precision'
+		self.__precision__: int = int(precision)
+		self.__half__: int = 1 << (precision - 1)
+		self.__buckets__: dict[int, int] = {}
+		self.__count__: int = 0
+		self.__sum__: float = 0
+		self.__lock__: threading.Lock = threading.Lock()
+
+	def __bucket__(self, micros: int) -> int:
+		shift: int = micros.bit_length() - self.__precision__
+		return micros if shift <= 0 else shift * self.__half__ + (micros >> shift)
+
+	def __upper_bound__(self, index: int) -> int:
+		if index < (self.__half__ << 1):
+			return index
+
+		shift: int = index // self.__half__ - 1
+		mantissa: int = index - shift * self.__half__
+		return ((mantissa + 1) << shift) - 1
+
+	def record(self, seconds: float) -> None:
+		"""
+		Records a single duration
+		:param seconds: The duration in seconds
+		"""
+
+		micros: int = max(0, int(seconds * 1e6))
+		index: int = self.__bucket__(micros)
+
+		with self.__lock__:
+			self.__buckets__[index] = self.__buckets__.get(index, 0) + 1
+			self.__count__ += 1
+			self.__sum__ += seconds
+
+	def snapshot(self) -> tuple[list[tuple[float, int]], int, float]:
+		"""
+		:return: The sorted (bucket upper bound in seconds, count) pairs, the total count and the sum of recorded values
+		"""
+
+		with self.__lock__:
+			buckets: list[tuple[int, int]] = sorted(self.__buckets__.items())
+			count: int = self.__count__
+			total: float = self.__sum__
+
+		return [(self.__upper_bound__(index) / 1e6, hits) for index, hits in buckets], count, total
+
+	def quantile(self, q: float) -> float:
+		"""
+		:param q: The quantile in [0, 1]
+		:return: The approximate value at the quantile in seconds or NaN if nothing was recorded
+		"""
+
+		buckets, count, _ = self.snapshot()
+
+		if count == 0:
+			return math.nan
+
+		target: float = max(1, math.ceil(q * count))
+		seen: int = 0
+
+		for bound, hits in buckets:
+			seen += hits
+
+			if seen >= target:
+				return bound
+
+		return buckets[-1][0]
+
+	@property
+	def count(self) -> int:
+		"""
+		:return: The number of recorded values
+		"""
+
+		return self.__count__
+
+
+class MetricFamily:
+	"""
+	Base class for a named metric with labelled children
+	"""
+
+	TYPE: str = 'untyped'
+
+	def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+		"""
+		Base class for a named metric with labelled children\n
+		- Constructor -
+		:param name: The Prometheus metric name
+		:param documentation: The help text
+		:param labels: The label names
+		"""
+
+		self.__metric_name__: str = str(name)
+		self.__documentation__: str = str(documentation)
+		self.__labels__: tuple[str, ...] = tuple(labels)
+		self.__children__: dict[tuple[str, ...], typing.Any] = {}
+		self.__lock__: threading.Lock = threading.Lock()
+
+	def __key__(self, labels: dict[str, typing.Any]) -> tuple[str, ...]:
+		return tuple(str(labels.get(label, '')) for label in self.__labels__)
+
+	def __format_labels__(self, key: tuple[str, ...], extra: str = '') -> str:
+		pairs: list[str] = [f'{label}="{value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')}"' for label, value in zip(self.__labels__, key)]
+
+		if extra:
+			pairs.append(extra)
+
+		return f'{{{",".join(pairs)}}}' if len(pairs) > 0 else ''
+
+	def samples(self) -> collections.abc.Iterator[str]:
+		"""
+		:return: An iterator of sample lines in Prometheus text format
+		"""
+
+		raise NotImplementedError()
+
+	def render(self) -> str:
+		"""
+		:return: This metric family in Prometheus text format
+		"""
+
+		lines: list[str] = [f'# HELP {self.name} {self.__documentation__}', f'# TYPE {self.name} {self.TYPE}']
+		lines.extend(self.samples())
+		return '\n'.join(lines)
+
+	@property
+	def name(self) -> str:
+		"""
+		:return: This metric's name
+		"""
+
+		return self.__metric_name__
+
+
+class Counter(MetricFamily):
+	"""
+	Monotonically increasing labelled counter
+	"""
+
+	TYPE: str = 'counter'
+
+	def inc(self, amount: float = 1, **labels: typing.Any) -> None:
+		"""
+		Increments the counter
+		:param amount: The non-negative increment
+		:param labels: The label values
+		"""
+
+		key: tuple[str, ...] = self.__key__(labels)
+
+		with self.__lock__:
+			self.__children__[key] = self.__children__.get(key, 0) + amount
+
+	def samples(self) -> collections.abc.Iterator[str]:
+		with self.__lock__:
+			children: list[tuple[tuple[str, ...], float]] = list(self.__children__.items())
+
+		for key, value in children:
+			yield f'{self.name}{self.__format_labels__(key)} {value}'
+
+
+class Gauge(MetricFamily):
+	"""
+	Labelled value that can go up and down\n
+	A gauge may instead be backed by a callback evaluated at render time
+	"""
+
+	TYPE: str = 'gauge'
+
+	def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), function: typing.Optional[typing.Callable[[], float]] = None):
+		"""
+		Labelled value that can go up and down\n
+		- Constructor -
+		:param name: The Prometheus metric name
+		:param documentation: The help text
+		:param labels: The label names
+		:param function: A callback producing the unlabelled value at render time
+		"""
+
+		super().__init__(name, documentation, labels)
+		self.__function__: typing.Optional[typing.Callable[[], float]] = function
+
+	def inc(self, amount: float = 1, **labels: typing.Any) -> None:
+		"""
+		Increases the gauge
+		:param amount: The increment
+		:param labels: The label values
+		"""
+
+		key: tuple[str, ...] = self.__key__(labels)
+
+		with self.__lock__:
+			self.__children__[key] = self.__children__.get(key, 0) + amount
+
+	def dec(self, amount: float = 1, **labels: typing.Any) -> None:
+		"""
+		Decreases the gauge
+		:param amount: The decrement
+		:param labels: The label values
+		"""
+
+		self.inc(-amount, **labels)
+
+	def set(self, value: float, **labels: typing.Any) -> None:
+		"""
+		Sets the gauge
+		:param value: The new value
+		:param labels: The label values
+		"""
+
+		key: tuple[str, ...] = self.__key__(labels)
+
+		with self.__lock__:
+			self.__children__[key] = value
+
+	def samples(self) -> collections.abc.Iterator[str]:
+		if self.__function__ is not None:
+			yield f'{self.name} {float(self.__function__())}'
+			return
+
+		with self.__lock__:
+			children: list[tuple[tuple[str, ...], float]] = list(self.__children__.items())
+
+		for key, value in children:
+			yield f'{self.name}{self.__format_labels__(key)} {value}'
+
+
+class Timing(MetricFamily):
+	"""
+	Labelled latency histogram exported with fixed Prometheus buckets and HDR quantiles
+	"""
+
+	TYPE: str = 'histogram'
+	BOUNDS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+	QUANTILES: tuple[float, ...] = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+	def observe(self, seconds: float, **labels: typing.Any) -> None:
+		"""
+		Records a duration
+		:param seconds: The duration in seconds
+		:param labels: The label values
+		"""
+
+		key: tuple[str, ...] = self.__key__(labels)
+		histogram: typing.Optional[Histogram] = self.__children__.get(key)
+
+		if histogram is None:
+			with self.__lock__:
+				histogram = self.__children__.setdefault(key, Histogram())
+
+		histogram.record(seconds)
+
+	def histogram(self, **labels: typing.Any) -> typing.Optional[Histogram]:
+		"""
+		:param labels: The label values
+		:return: The underlying histogram for the labels or None if nothing was recorded
+		"""
+
+		return self.__children__.get(self.__key__(labels))
+
+	def samples(self) -> collections.abc.Iterator[str]:
+		with self.__lock__:
+			children: list[tuple[tuple[str, ...], Histogram]] = list(self.__children__.items())
+
+		for key, histogram in children:
+			buckets, count, total = histogram.snapshot()
+			cumulative: int = 0
+			position: int = 0
+
+			for bound in Timing.BOUNDS:
+				while position < len(buckets) and buckets[position][0] <= bound:
+					cumulative += buckets[position][1]
+					position += 1
+
+				yield f'{self.name}_bucket{self.__format_labels__(key, f'le="{bound}"')} {cumulative}'
+
+			yield f'{self.name}_bucket{self.__format_labels__(key, 'le="+Inf"')} {count}'
+			yield f'{self.name}_sum{self.__format_labels__(key)} {total}'
+			yield f'{self.name}_count{self.__format_labels__(key)} {count}'
+
+	def render(self) -> str:
+		lines: list[str] = [super().render(), f'# HELP {self.name}_quantile HDR quantiles of {self.name}', f'# TYPE {self.name}_quantile gauge']
+
+		with self.__lock__:
+			children: list[tuple[tuple[str, ...], Histogram]] = list(self.__children__.items())
+
+		for key, histogram in children:
+			for q in Timing.QUANTILES:
+				lines.append(f'{self.name}_quantile{self.__format_labels__(key, f'quantile="{q}"')} {histogram.quantile(q)}')
+
+		return '\n'.join(lines)
+
+
+class RequestContext:
+	"""
+	Per-request timing state bound to the handling thread
+	"""
+
+	def __init__(self, endpoint: str):
+		"""
+		Per-request timing state bound to the handling thread\n
+		- Constructor -
+		:param endpoint: The endpoint route
+		"""
+
+		self.endpoint: str = str(endpoint)
+		self.status: int = 200
+		self.start: float = time.perf_counter()
+		self.upstream: dict[str, float] = {}
+		self.duration: float = 0
+
+	@property
+	def upstream_seconds(self) -> float:
+		"""
+		:return: The total time spent waiting on upstream services
+		"""
+
+		return sum(self.upstream.values())
+
+
+_FAMILIES: dict[str, MetricFamily] = {}
+_FAMILY_LOCK: threading.Lock = threading.Lock()
+_CONTEXT: threading.local = threading.local()
+
+
+def register[T: MetricFamily](family: T) -> T:
+	"""
+	Registers a metric family for export, returning the already registered family of the same name if any
+	:param family: The metric family
+	:return: The registered metric family
+	"""
+
+	with _FAMILY_LOCK:
+		return _FAMILIES.setdefault(family.name, family)
+
+
+def render() -> str:
+	"""
+	:return: All registered metrics in Prometheus text format (version 0.0.4)
+	"""
+
+	with _FAMILY_LOCK:
+		families: list[MetricFamily] = list(_FAMILIES.values())
+
+	return '\n'.join(family.render() for family in families) + '\n'
+
+
+REQUEST_SECONDS: Timing = register(Timing('api_request_seconds', 'Total API endpoint handling time', ('endpoint',)))
+LOCAL_SECONDS: Timing = register(Timing('api_local_seconds', 'API endpoint handling time excluding upstream calls', ('endpoint',)))
+UPSTREAM_SECONDS: Timing = register(Timing('api_upstream_seconds', 'Time spent in upstream calls', ('endpoint', 'upstream')))
+REQUESTS: Counter = register(Counter('api_requests_total', 'API requests handled', ('endpoint', 'status')))
+ERRORS: Counter = register(Counter('api_errors_total', 'API requests failing with a server error', ('endpoint',)))
+UPSTREAM_ERRORS: Counter = register(Counter('api_upstream_errors_total', 'Upstream calls raising an error', ('upstream',)))
+IN_FLIGHT: Gauge = register(Gauge('api_in_flight_requests', 'API requests currently being handled', ('endpoint',)))
+
+
+@contextlib.contextmanager
+def request(endpoint: str) -> typing.Generator[RequestContext, None, None]:
+	"""
+	Times a single API request on the current thread\n
+	Upstream calls made inside the block are attributed to this request
+	:param endpoint: The endpoint route
+	:return: The request context (set 'status' to record the response status)
+	"""
+
+	context: RequestContext = RequestContext(endpoint)
+	parent: typing.Optional[RequestContext] = getattr(_CONTEXT, 'request', None)
+	_CONTEXT.request = context
+	IN_FLIGHT.inc(endpoint=context.endpoint)
+
+	try:
+		yield context
+	except BaseException:
+		context.status = 500
+		raise
+	finally:
+		context.duration = time.perf_counter() - context.start
+		_CONTEXT.request = parent
+		IN_FLIGHT.dec(endpoint=context.endpoint)
+		REQUEST_SECONDS.observe(context.duration, endpoint=context.endpoint)
+		LOCAL_SECONDS.observe(max(0.0, context.duration - context.upstream_seconds), endpoint=context.endpoint)
+		REQUESTS.inc(endpoint=context.endpoint, status=context.status)
+
+		if context.status >= 500:
+			ERRORS.inc(endpoint=context.endpoint)
+
+
+@contextlib.contextmanager
+def upstream(name: str) -> typing.Generator[None, None, None]:
+	"""
+	Times a call to an upstream service (yfinance, OpenAI, newsapi, ...)\n
+	The time is attributed to the request handled on the current thread, if any
+	:param name: The upstream service name
+	"""
+
+	start: float = time.perf_counter()
+
+	try:
+		yield
+	except Exception:
+		UPSTREAM_ERRORS.inc(upstream=name)
+		raise
+	finally:
+		elapsed: float = time.perf_counter() - start
+		context: typing.Optional[RequestContext] = getattr(_CONTEXT, 'request', None)
+		UPSTREAM_SECONDS.observe(elapsed, endpoint='' if context is None else context.endpoint, upstream=name)
+
+		if context is not None:
+			context.upstream[name] = context.upstream.get(name, 0) + elapsed
+
+
+def current() -> typing.Optional[RequestContext]:
+	"""
+	:return: The request being handled on the current thread or None
+	"""
+
+	return getattr(_CONTEXT, 'request', None)
@@ -0,0 +1,221 @@
+# Reference-counted registry of opened database sector handles
+
+from __future__ import annotations
+
+import collections
+import sys
+import threading
+import time
+import traceback
+import typing
+
+import CustomMethodsVI.Misc as Misc
+
+
+class SectorRegistry:
+	"""
+	Reference-counted cache of opened sector handles\n
+	Handles are found by name and names by handle in constant time; a handle released by all its users stays loaded
+	until it has been idle for a timeout or the loaded handles exceed a memory budget, and is saved before it is unloaded\n
+	Handles must provide 'save()', 'pending_modifications' and 'footprint' (approximate bytes held in memory)
+	"""
+
+	def __init__(self, *, budget: int, idle: float, on_evict: typing.Callable[[typing.Any], None]):
+		"""
+		Reference-counted cache of opened sector handles\n
+		- Constructor -
+		:param budget: The approximate number of bytes loaded handles may hold before released handles are evicted
+		:param idle: The seconds after which a released handle is evicted
+		:param on_evict: A callback unloading an evicted handle
+		"""
+
+		assert budget > 0 and idle > 0, 'Invalid registry limits'
+		assert callable(on_evict), 'Eviction callback is not callable'
+		self.__budget__: int = int(budget)
+		self.__idle__: float = float(idle)
+		self.__on_evict__: typing.Callable[[typing.Any], None] = on_evict
+		self.__lock__: threading.RLock = threading.RLock()
+		self.__handles__: dict[str, typing.Any] = {}
+		self.__names__: dict[int, str] = {}
+		self.__references__: dict[str, int] = {}
+		self.__released__: collections.OrderedDict[str, float] = collections.OrderedDict()
+
+	def __contains__(self, name: str) -> bool:
+		"""
+		:param name: The sector name
+		:return: Whether a handle is registered under 'name'
+		"""
+
+		with self.__lock__:
+			return name in self.__handles__
+
+	def __len__(self) -> int:
+		"""
+		:return: The number of loaded handles
+		"""
+
+		with self.__lock__:
+			return len(self.__handles__)
+
+	def acquire(self, name: str) -> typing.Optional[typing.Any]:
+		"""
+		Takes a reference to a loaded handle
+		:param name: The sector name
+		:return: The handle or None if not loaded
+		"""
+
+		with self.__lock__:
+			if (handle := self.__handles__.get(name)) is not None:
+				self.__references__[name] += 1
+				self.__released__.pop(name, None)
+
+			return handle
+
+	def register(self, name: str, handle: typing.Any) -> typing.Any:
+		"""
+		Adds a newly loaded handle holding a single reference
+		:param name: The sector name
+		:param handle: The handle
+		:return: The handle
+		:raises KeyError: If a handle is already registered under 'name'
+		"""
+
+		with self.__lock__:
+			Misc.raise_if(name in self.__handles__, KeyError(f'Sector \'{name}\' is already registered'))
+			self.__handles__[name] = handle
+			self.__names__[id(handle)] = name
+			self.__references__[name] = 1
+			return handle
+
+	def release(self, handle: typing.Any) -> bool:
+		"""
+		Drops a reference to a handle\n
+		Once no references remain the handle becomes a candidate for eviction
+		:param handle: The handle
+		:return: Whether the handle is registered (and so stays loaded for now)
+		"""
+
+		with self.__lock__:
+			if (name := self.__names__.get(id(handle))) is None:
+				return False
+
+			self.__references__[name] = max(0, self.__references__[name] - 1)
+
+			if self.__references__[name] == 0:
+				self.__released__[name] = time.monotonic()
+				self.__released__.move_to_end(name)
+
+			return True
+
+	def remove(self, name: str) -> typing.Optional[typing.Any]:
+		"""
+		Unregisters a handle regardless of its references without unloading it
+		:param name: The sector name
+		:return: The handle or None if not loaded
+		"""
+
+		with self.__lock__:
+			if (handle := self.__handles__.pop(name, None)) is not None:
+				del self.__names__[id(handle)]
+				del self.__references__[name]
+				self.__released__.pop(name, None)
+
+			return handle
+
+	def name(self, handle: typing.Any) -> typing.Optional[str]:
+		"""
+		:param handle: The handle
+		:return: The name the handle is registered under or None
+		"""
+
+		with self.__lock__:
+			return self.__names__.get(id(handle))
+
+	def references(self, name: str) -> int:
+		"""
+		:param name: The sector name
+		:return: The number of users holding the handle (0 if released or not loaded)
+		"""
+
+		with self.__lock__:
+			return self.__references__.get(name, 0)
+
+	def handles(self) -> dict[str, typing.Any]:
+		"""
+		:return: The loaded handles by name
+		"""
+
+		with self.__lock__:
+			return dict(self.__handles__)
+
+	def evict(self, *, force: bool = False) -> list[str]:
+		"""
+		Saves and unloads released handles that have been idle past the timeout, then the least recently released ones while over the memory budget\n
+		Saves run without holding the registry lock; a handle acquired again or modified meanwhile stays loaded
+		:param force: Whether to evict every released handle
+		:return: The names of the evicted handles
+		"""
+
+		evicted: list[str] = []
+		attempted: set[str] = set()
+
+		while (candidate := self.__candidate__(force, attempted)) is not None:
+			name, handle, released = candidate
+			attempted.add(name)
+
+			try:
+				handle.save()
+			except Exception as e:
+				sys.stderr.write(f'Eviction of sector \'{name}\' failed:\n{''.join(traceback.format_exception(e))}')
+				continue
+
+			with self.__lock__:
+				if self.__released__.get(name) != released or handle.pending_modifications > 0:
+					continue
+
+				self.remove(name)
+				self.__on_evict__(handle)
+				evicted.append(name)
+
+		return evicted
+
+	def __candidate__(self, force: bool, attempted: set[str]) -> typing.Optional[tuple[str, typing.Any, float]]:
+		with self.__lock__:
+			now: float = time.monotonic()
+			over_budget: bool = self.footprint > self.__budget__
+
+			for name, released in self.__released__.items():
+				if name in attempted:
+					continue
+				elif force or over_budget or now - released >= self.__idle__:
+					return name, self.__handles__[name], released
+				else:
+					return None
+
+			return None
+
+	@property
+	def footprint(self) -> int:
+		"""
+		:return: The approximate number of bytes held by loaded handles
+		"""
+
+		with self.__lock__:
+			return sum(handle.footprint for handle in self.__handles__.values())
+
+	@property
+	def over_budget(self) -> bool:
+		"""
+		:return: Whether released handles are waiting to be evicted for exceeding the memory budget
+		"""
+
+		with self.__lock__:
+			return len(self.__released__) > 0 and self.footprint > self.__budget__
+
+	@property
+	def lock(self) -> threading.RLock:
+		"""
+		:return: The registry lock, held to make look-up and registration of a newly loaded handle atomic
+		"""
+
+		return self.__lock__
@@ -0,0 +1,218 @@
+# Structured, sampled request logging
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import os
+import random
+import threading
+import typing
+
+import CustomMethodsVI.Connection as Connection
+
+import Logging
+import Metrics
+
+
+class RequestLogger:
+	"""
+	Writes one JSON line per API request through a non-blocking sink\n
+	Each endpoint is sampled at its own rate; server errors and requests slower than 'slow' seconds are always written.
+	Records carry the sampling rate they were kept at so counts can be scaled back up\n
+	Session tokens are bearer credentials, so records only carry a short one-way hash of them ('session_id')
+	"""
+
+	def __init__(self, sink: Logging.JsonLinesSink, rates: typing.Optional[dict[str, float]] = None, *, default: float = 0.05, slow: float = 1):
+		"""
+		Writes one JSON line per API request through a non-blocking sink\n
+		- Constructor -
+		:param sink: The started sink records are queued on
+		:param rates: The fraction of requests written per endpoint route (0 to 1)
+		:param default: The fraction of requests written for endpoints without a rate
+		:param slow: The duration in seconds from which requests are always written or 0 to only sample by rate
+		"""
+
+		rates = {} if rates is None else {f'/{str(route).strip('/\\')}': float(rate) for route, rate in rates.items()}
+		assert all(0 <= rate <= 1 for rate in rates.values()) and 0 <= default <= 1, 'Invalid sampling rate'
+		assert slow >= 0, 'Invalid slow request threshold'
+		self.__sink__: Logging.JsonLinesSink = sink
+		self.__rates__: dict[str, float] = rates
+		self.__default__: float = float(default)
+		self.__slow__: float = float(slow)
+
+	def __reason__(self, endpoint: str, status: int, duration: float) -> tuple[typing.Optional[str], float]:
+		rate: float = self.__rates__.get(endpoint, self.__default__)
+
+		if status >= 500:
+			return 'error', rate
+		elif 0 < self.__slow__ <= duration:
+			return 'slow', rate
+		elif rate > 0 and (rate >= 1 or random.random() < rate):
+			return 'sample', rate
+		else:
+			return None, rate
+
+	@staticmethod
+	def session_id(session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo]) -> typing.Optional[str]:
+		"""
+		:param session: The client session or None
+		:return: The identifier records carry for the session (a truncated SHA-256 of its token) or None
+		"""
+
+		return None if session is None else hashlib.sha256(session.token.bytes).hexdigest()[:12]
+
+	def __write__(self, record: dict[str, typing.Any]) -> None:
+		if self.__sink__.put(record):
+			_RECORDS.inc(reason=record['reason'])
+		else:
+			_DROPPED.inc()
+
+	def record(self, request: Metrics.RequestContext, session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo] = None, **fields) -> bool:
+		"""
+		Writes a finished request if it is an error, slow or sampled
+		:param request: The request context, after its block exited
+		:param session: The client session or None
+		:param fields: Additional JSON serializable fields of the record
+		:return: Whether a record was queued
+		"""
+
+		reason, rate = self.__reason__(request.endpoint, request.status, request.duration)
+
+		if reason is None:
+			return False
+
+		self.__write__({
+			'ts': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+			'endpoint': request.endpoint,
+			'session_id': RequestLogger.session_id(session),
+			'ip': None if session is None else str(session.ip),
+			'status': request.status,
+			'latency_ms': round(request.duration * 1e3, 3),
+			'local_ms': round(max(0.0, request.duration - request.upstream_seconds) * 1e3, 3),
+			'upstream_ms': {name: round(seconds * 1e3, 3) for name, seconds in request.upstream.items()},
+			'reason': reason,
+			'rate': rate,
+			**fields
+		})
+		return True
+
+	def event(self, endpoint: str, session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo] = None, *, status: int = 200, **fields) -> bool:
+		"""
+		Writes a session event not timed as a request (connects, disconnects), sampled as 'endpoint'
+		:param endpoint: The route the event is sampled and recorded as
+		:param session: The client session or None
+		:param status: The HTTP status the event resolved with
+		:param fields: Additional JSON serializable fields of the record
+		:return: Whether a record was queued
+		"""
+
+		reason, rate = self.__reason__(endpoint, status, 0)
+
+		if reason is None:
+			return False
+
+		self.__write__({
+			'ts': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+			'endpoint': endpoint,
+			'session_id': RequestLogger.session_id(session),
+			'ip': None if session is None else str(session.ip),
+			'status': status,
+			'reason': reason,
+			'rate': rate,
+			**fields
+		})
+		return True
+
+	@property
+	def sink(self) -> Logging.JsonLinesSink:
+		"""
+		:return: The sink records are queued on
+		"""
+
+		return self.__sink__
+
+
+_LOGGER: typing.Optional[RequestLogger] = None
+_STREAM: typing.Optional[Logging.RotatingLogFile] = None
+_LOCK: threading.Lock = threading.Lock()
+Metrics.register(Metrics.Gauge('request_log_queue_depth', 'Request log records waiting for the writer', function=lambda: 0 if _LOGGER is None else _LOGGER.sink.pending))
+_RECORDS: Metrics.Counter = Metrics.register(Metrics.Counter('request_log_records_total', 'Request log records queued', ('reason',)))
+_DROPPED: Metrics.Counter = Metrics.register(Metrics.Counter('request_log_dropped_total', 'Request log records dropped while the queue was full'))
+
+
+def start(rates: typing.Optional[dict[str, float]] = None) -> typing.Optional[RequestLogger]:
+	"""
+	Starts the shared request logger writing 'logs/requests/latest.jsonl' if not already running\n
+	'REQUEST_LOG' set to 'off' disables it; 'REQUEST_LOG_SAMPLE' (default 0.05) is the rate of endpoints without one and 'REQUEST_LOG_SLOW' (seconds, default 1) the slow request threshold\n
+	The file is rotated and its archives retained like the console log (see 'Logging.init')
+	:param rates: The fraction of requests written per endpoint route
+	:return: The shared request logger or None if disabled
+	"""
+
+	global _LOGGER, _STREAM
+
+	with _LOCK:
+		if _LOGGER is None and os.getenv('REQUEST_LOG', 'on').lower() != 'off':
+			directory: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'requests')
+			os.makedirs(directory, exist_ok=True)
+			_STREAM = Logging.RotatingLogFile(
+				directory,
+				'latest.jsonl',
+				max_bytes=int(os.getenv('LOG_ROTATE_BYTES', str(64 << 20))),
+				max_seconds=float(os.getenv('LOG_ROTATE_SECONDS', '86400')),
+				keep=int(os.getenv('LOG_RETENTION_COUNT', '30')),
+				keep_seconds=float(os.getenv('LOG_RETENTION_SECONDS', str(30 * 86400)))
+			)
+			sink: Logging.JsonLinesSink = Logging.JsonLinesSink(
+				_STREAM,
+				interval=float(os.getenv('LOG_FLUSH_INTERVAL', '0.25')),
+				batch=int(os.getenv('LOG_FLUSH_BATCH', '1024')),
+				capacity=int(os.getenv('LOG_QUEUE_CAPACITY', '65536'))
+			)
+			sink.start()
+			_LOGGER = RequestLogger(sink, rates, default=float(os.getenv('REQUEST_LOG_SAMPLE', '0.05')), slow=float(os.getenv('REQUEST_LOG_SLOW', '1')))
+
+		return _LOGGER
+
+
+def shutdown() -> None:
+	"""
+	Writes all queued records and closes the request log
+	"""
+
+	global _LOGGER, _STREAM
+
+	with _LOCK:
+		if _LOGGER is not None:
+			_LOGGER.sink.stop()
+			_STREAM.close()
+			_LOGGER = None
+			_STREAM = None
+
+
+def record(request: Metrics.RequestContext, session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo] = None, **fields) -> bool:
+	"""
+	Writes a finished request through the shared request logger, see 'RequestLogger.record'
+	:param request: The request context, after its block exited
+	:param session: The client session or None
+	:param fields: Additional JSON serializable fields of the record
+	:return: Whether a record was queued (False if the logger is not running)
+	"""
+
+	logger: typing.Optional[RequestLogger] = _LOGGER
+	return False if logger is None else logger.record(request, session, **fields)
+
+
+def event(endpoint: str, session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo] = None, *, status: int = 200, **fields) -> bool:
+	"""
+	Writes a session event through the shared request logger, see 'RequestLogger.event'
+	:param endpoint: The route the event is sampled and recorded as
+	:param session: The client session or None
+	:param status: The HTTP status the event resolved with
+	:param fields: Additional JSON serializable fields of the record
+	:return: Whether a record was queued (False if the logger is not running)
+	"""
+
+	logger: typing.Optional[RequestLogger] = _LOGGER
+	return False if logger is None else logger.event(endpoint, session, status=status, **fields)
@@ -1,12 +1,22 @@
 # Handles server API
 
 import base64
+import collections.abc
+import concurrent.futures
+import contextlib
 import cv2
 import datetime
 import flask
+import hashlib
+import itertools
+import json
+import math
 import numpy
 import os
 import requests
+import sys
+import time
+import traceback
 import typing
 import uuid
 
@@ -15,9 +25,235 @@ import CustomMethodsVI.Math.Plotter.Plotter as Plotter
 import CustomMethodsVI.Math.Plotter.Plot2D as Plot2D
 import CustomMethodsVI.Stream as Stream
 
+import Admission
 import Chatbot
 import Database
 import Finance
+import Gateway
+import Metrics
+import RequestLog
+
+
+class ManagedServerAPI(Connection.FlaskServerAPI):
+	"""
+	FlaskServerAPI whose endpoint handlers are wrapped with request instrumentation and admission control\n
+	Endpoints bound as batchable may also be invoked as sub-requests of a batch (see 'ManagedServerAPI.batch')
+	"""
+
+	def __init__(self, app: flask.Flask, route: str = '/api', *, admission: typing.Optional[Admission.AdmissionController] = None, batch_workers: int = 8, **kwargs):
+		"""
+		FlaskServerAPI whose endpoint handlers are wrapped with request instrumentation and admission control\n
+		- Constructor -
+		:param app: The flask app
+		:param route: The base api route
+		:param admission: The admission controller applied to every endpoint or None to admit all requests
+		:param batch_workers: The number of threads shared by all batches for running sub-requests
+		:param kwargs: API options passed to 'FlaskServerAPI.__init__'
+		"""
+
+		assert isinstance(batch_workers, int) and batch_workers > 0, 'Invalid batch worker count'
+		self.__admission__: typing.Optional[Admission.AdmissionController] = admission
+		self.__handlers__: dict[str, typing.Callable[[Connection.FlaskServerAPI.APISessionInfo, dict[str, ...]], typing.Any]] = {}
+		self.__validators__: dict[str, typing.Callable[[dict[str, ...]], typing.Optional[tuple[str, float]]]] = {}
+		self.__executor__: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=int(batch_workers), thread_name_prefix='ServerAPI-batch')
+		super().__init__(app, route, **kwargs)
+
+	@staticmethod
+	def status_of(response: typing.Any) -> int:
+		"""
+		Gets the HTTP status FlaskServerAPI will send for an endpoint return value
+		:param response: The endpoint return value
+		:return: The HTTP status code
+		"""
+
+		if response is NotImplemented:
+			return 501
+		elif isinstance(response, int) and not isinstance(response, bool):
+			return int(response)
+		else:
+			return 200
+
+	def __wrap__(self, route: str, callback: typing.Callable[[Connection.FlaskServerAPI.APISessionInfo, dict[str, ...]], typing.Any]) -> typing.Callable[[Connection.FlaskServerAPI.APISessionInfo, dict[str, ...]], typing.Any]:
+		"""
+		INTERNAL METHOD\n
+		Wraps an endpoint handler, timing it and writing it to the request log
+		:param route: The endpoint route
+		:param callback: The endpoint handler
+		:return: The wrapped handler
+		"""
+
+		def handler(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> typing.Any:
+			batched: bool = flask.g.get('batched', False)
+			error: typing.Optional[str] = None
+
+			try:
+				with Metrics.request(route) as request:
+					if self.revalidate(route, json):
+						request.status = 304
+						return 304
+
+					try:
+						ticket: Admission.AdmissionTicket | contextlib.nullcontext = self.admit(route, session)
+					except Admission.AdmissionRejected as rejected:
+						request.status = rejected.status
+						return rejected.status
+
+					with ticket:
+						response: typing.Any = callback(session, json)
+						request.status = ManagedServerAPI.status_of(response)
+						return response
+			except Exception as e:
+				error = type(e).__name__
+				raise
+			finally:
+				RequestLog.record(request, session, batched=batched, error=error)
+
+		return handler
+
+	def revalidate(self, route: str, body: dict[str, ...]) -> bool:
+		"""
+		Computes the strong ETag of a cacheable endpoint's response from its data version, before the response itself is built\n
+		The ETag and 'Cache-Control' headers are added to the response (see 'init'); sub-requests of a batch are not revalidated
+		:param route: The endpoint route
+		:param body: The request JSON
+		:return: Whether the client's 'If-None-Match' matches and a 304 should be sent instead
+		"""
+
+		validator: typing.Optional[typing.Callable[[dict[str, ...]], typing.Optional[tuple[str, float]]]] = self.__validators__.get(route)
+
+		if validator is None or flask.g.get('batched', False) or (validation := validator(body)) is None:
+			return False
+
+		version, max_age = validation
+		request: str = json.dumps({key: value for key, value in body.items() if key != 'auth'}, sort_keys=True, default=str)
+		etag: str = f'"{hashlib.sha256(f'{route}\0{request}\0{version}'.encode()).hexdigest()[:32]}"'
+		flask.g.etag = etag
+		flask.g.max_age = max(0, int(max_age))
+		matches: tuple[str, ...] = tuple(tag.strip().removeprefix('W/') for tag in flask.request.headers.get('If-None-Match', '').split(','))
+		return etag in matches or '*' in matches
+
+	def admit(self, route: str, session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo]) -> Admission.AdmissionTicket | contextlib.nullcontext:
+		"""
+		Admits a request to the specified endpoint\n
+		Rate limits are tracked per session token, or per client IP for unauthenticated requests\n
+		The suggested retry delay of a rejection is sent back in a 'Retry-After' header
+		:param route: The endpoint route
+		:param session: The client session
+		:return: The admission ticket, to be released when the request completes
+		:raises AdmissionRejected: If the request is rate limited or shed
+		"""
+
+		if self.__admission__ is None:
+			return contextlib.nullcontext()
+
+		try:
+			return self.__admission__.admit(route, flask.request.remote_addr if session is None else session.token)
+		except Admission.AdmissionRejected as rejected:
+			flask.g.retry_after = rejected.retry_after
+			raise
+
+	def endpoint(self, route: str, callback: typing.Optional[typing.Callable[[Connection.FlaskServerAPI.APISessionInfo, dict[str, ...]], typing.Any]] = ..., *, batchable: bool = False, cache: typing.Optional[typing.Callable[[dict[str, ...]], typing.Optional[tuple[str, float]]]] = None, **kwargs) -> typing.Optional[typing.Callable]:
+		"""
+		Binds a callback to the specified API endpoint, see 'FlaskServerAPI.endpoint'
+		:param route: The API endpoint
+		:param callback: The callback or ... if used as a decorator
+		:param batchable: Whether the endpoint may be invoked from a batch (only endpoints without side effects should be)
+		:param cache: A callable returning the data version and max-age in seconds of a request's response (or None if not cacheable) to enable ETag revalidation
+		:param kwargs: Endpoint options passed to 'FlaskServerAPI.endpoint'
+		:return: None or a binder if used as a decorator
+		"""
+
+		if callback is None or callback is ...:
+			def binder(func: typing.Callable[[Connection.FlaskServerAPI.APISessionInfo, dict[str, ...]], typing.Any]) -> None:
+				self.endpoint(route, func, batchable=batchable, cache=cache, **kwargs)
+
+			return binder
+		elif callable(callback):
+			name: str = f'/{str(route).strip('/\\')}'
+			callback = self.__wrap__(name, callback)
+			super().endpoint(route, callback, **kwargs)
+
+			if batchable:
+				self.__handlers__[name] = callback
+
+			if cache is not None:
+				self.__validators__[name] = cache
+		else:
+			return super().endpoint(route, callback, **kwargs)
+
+	def invoke(self, route: str, session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> tuple[int, typing.Any, typing.Optional[float]]:
+		"""
+		Invokes a batchable endpoint directly\n
+		Return values and errors are converted the same way 'FlaskServerAPI' converts them to responses\n
+		The retry delay is returned rather than left on 'flask.g', as sub-requests run in a copy of the request context
+		:param route: The endpoint route
+		:param session: The client session
+		:param json: The request JSON
+		:return: The HTTP status, JSON response body and suggested retry delay in seconds if admission rejected the request (or None)
+		"""
+
+		handler: typing.Optional[typing.Callable[[Connection.FlaskServerAPI.APISessionInfo, dict[str, ...]], typing.Any]] = self.__handlers__.get(f'/{str(route).strip('/\\')}')
+
+		if handler is None:
+			return 404, {'error': 'HTTP/404'}, None
+
+		try:
+			flask.g.batched = True
+			flask.g.pop('retry_after', None)
+			response: typing.Any = handler(session, json)
+		except Exception as e:
+			sys.stderr.write(''.join(traceback.format_exception(e)))
+			return 500, {'error': 'An internal error has occurred'}, None
+
+		retry_after: typing.Optional[float] = flask.g.pop('retry_after', None)
+
+		if response is None or response is ...:
+			return 200, {}, retry_after
+		elif response is NotImplemented:
+			return 501, {'error': 'NotImplemented'}, retry_after
+		elif isinstance(response, int):
+			return int(response), {'error': f'HTTP/{response}'}, retry_after
+		elif isinstance(response, (collections.abc.Mapping, collections.abc.Sequence)):
+			return 200, response, retry_after
+		else:
+			return 500, {'error': 'An internal error has occurred'}, retry_after
+
+	def batch(self, session: Connection.FlaskServerAPI.APISessionInfo, sub_requests: list[dict[str, typing.Any]]) -> list[dict[str, typing.Any]]:
+		"""
+		Runs several sub-requests concurrently on this API's shared batch executor\n
+		Identical sub-requests (same endpoint and body) are only run once\n
+		If admission rejected any sub-request, the longest suggested retry delay is sent in the batch response's 'Retry-After' header
+		:param session: The client session
+		:param sub_requests: The sub-requests, each a dictionary with an 'endpoint' route and optional 'body'
+		:return: One result per sub-request in order, each a dictionary with the 'endpoint', 'status' and 'body'
+		"""
+
+		futures: dict[str, concurrent.futures.Future] = {}
+		keys: list[str] = []
+
+		for sub_request in sub_requests:
+			route: str = f'/{str(sub_request['endpoint']).strip('/\\')}'
+			body: dict[str, typing.Any] = sub_request.get('body') or {}
+			key: str = json.dumps((route, body), sort_keys=True, default=str)
+			keys.append(key)
+
+			if key not in futures:
+				futures[key] = self.__executor__.submit(flask.copy_current_request_context(self.invoke), route, session, body)
+
+		results: list[dict[str, typing.Any]] = []
+		delays: list[float] = []
+
+		for sub_request, key in zip(sub_requests, keys):
+			status, body, retry_after = futures[key].result()
+			results.append({'endpoint': sub_request['endpoint'], 'status': status, 'body': body})
+
+			if retry_after is not None:
+				delays.append(retry_after)
+
+		if len(delays) > 0:
+			flask.g.retry_after = max(delays + [flask.g.get('retry_after') or 0])
+
+		return results
 
 
 def get_json_key(json: dict[str, ...], key: str, *types: type, can_be_none: bool = False, acceptor: typing.Callable[[typing.Any], bool] = None, default: typing.Optional[typing.Any] = None) -> typing.Any:
@@ -50,20 +286,61 @@ def axis_label(axis: str, point: tuple[float, ...]) -> str:
 	return datetime.datetime.fromtimestamp(x).strftime('%m/%d/%Y (%H:%M)') if axis == 'time' else f'${y:,.2f}'
 
 
-def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
+def market_freshness(interval: Finance.FrameInterval, settle: float = 900) -> tuple[str, float]:
+	"""
+	Gets the data version and max-age of stock history at the specified interval\n
+	While the market is open (or settling after the close) the latest bar keeps changing, so versions advance every 1/60th of an interval (15s - 5min)\n
+	While the market is closed the history does not change until it reopens
+	:param interval: The history interval
+	:param settle: The number of seconds after the close during which data is still treated as changing
+	:return: The data version and the number of seconds until it changes
+	"""
+
+	now: float = time.time()
+	is_open, since, until = Finance.market_status()
+
+	if is_open or now - since.timestamp() < settle:
+		step: int = max(15, min(300, interval.seconds() // 60))
+		return f'open:{step}:{int(now // step)}', step - now % step
+	else:
+		return f'closed:{since.isoformat()}', min(until.timestamp() - now, 21600)
+
+
+def sse_event(event: str, data: typing.Any) -> str:
+	"""
+	Formats a single server-sent event
+	:param event: The event name
+	:param data: The JSON serializable event payload
+	:return: The encoded event block
+	"""
+
+	return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def handle_implicit_api(server: flask.Flask, cors: dict[str, str], admission: typing.Optional[Admission.AdmissionController] = None) -> None:
 	"""
 	Handles internal server API communication\n
 	API communication with front-end
 	:param server: The flask server instance
 	:param cors: The CORS headers
+	:param admission: The admission controller applied to front-end requests or None to admit all requests
 	"""
 
-	api: Connection.FlaskServerAPI = Connection.FlaskServerAPI(server, '/react', requires_auth=True, is_timeout_daemon=True, global_response_headers=cors)
-	company_data: Database.MyDatabase = Database.MyDatabase.open('companies', create_if_not_found=False)
-	companies: dict[str, typing.Any] = company_data['Stocks'].wait()
+	api: ManagedServerAPI = ManagedServerAPI(server, '/react', admission=admission, requires_auth=True, is_timeout_daemon=True, global_response_headers=cors)
+	company_data: Database.MyDatabase = Database.MyDatabase.open('companies', create_if_not_found=False, read_mode=Database.ReadMode.FROZEN)
+	companies: dict[str, typing.Any] = company_data['Stocks']
+	companies_version: str = hashlib.sha256(json.dumps(companies, sort_keys=True).encode()).hexdigest()
 	chat_bots: dict[uuid.UUID, Chatbot.ChatBot] = {}
 	company_data.close()
 
+	def history_version(request: dict[str, ...]) -> typing.Optional[tuple[str, float]]:
+		try:
+			interval: Finance.FrameInterval = Finance.FrameInterval[get_json_key(request, 'interval', str, can_be_none=False, default='DAY')]
+		except (AssertionError, KeyError):
+			return None
+
+		return market_freshness(interval)
+
 	@api.connector
 	def on_connect(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> int:
 		"""
@@ -73,7 +350,7 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 		:return: HTTP success code (200 = OK)
 		"""
 
-		print(f'React-API Connect: {session.token} @ {session.ip}')
+		RequestLog.event('/connect', session)
 		return 200
 
 	@api.disconnector
@@ -84,9 +361,9 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 		:param json: The request JSON
 		"""
 
-		print(f'React-API Disconnect: {session.token}')
+		RequestLog.event('/disconnect', session)
 
-	@api.endpoint('/companies')
+	@api.endpoint('/companies', batchable=True, cache=lambda request: (companies_version, 3600))
 	def on_companies(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> list[dict[str, str | float]]:
 		"""
 		*API endpoint*\n
@@ -100,7 +377,7 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 		page_size: int = 10
 		return Stream.LinqStream(companies.items()).skip(page * page_size).take(page_size).sort().transform(lambda pair: {'symbol': pair[0], 'name': pair[1]['Meta Data']['2. Name'], 'price': -1}).collect(list)
 
-	@api.endpoint('/company-current')
+	@api.endpoint('/company-current', batchable=True)
 	def on_company_current(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> dict[str, typing.Any]:
 		"""
 		*API endpoint*\n
@@ -114,7 +391,7 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 		company: Finance.CompanyInfo = Finance.CompanyInfo(company_code)
 		return company.frame().to_dict()
 
-	@api.endpoint('/company-history')
+	@api.endpoint('/company-history', batchable=True, cache=history_version)
 	def on_company_history(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> list[dict[str, typing.Any]]:
 		"""
 		*API endpoint*\n
@@ -130,7 +407,7 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 		company: Finance.CompanyInfo = Finance.CompanyInfo(company_code)
 		return list(frame.to_dict() for frame in company.frames(period, interval))
 
-	@api.endpoint('/company-history-image')
+	@api.endpoint('/company-history-image', batchable=True, cache=history_version)
 	def on_company_candlestick(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> dict[str, str]:
 		"""
 		*API endpoint*\n
@@ -162,7 +439,7 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 		else:
 			return {'image-base64': base64.b64encode(buffer).decode()}
 
-	@api.endpoint('/news')
+	@api.endpoint('/news', batchable=True)
 	def on_news(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> int | dict:
 		"""
 		*API endpoint*\n
@@ -174,7 +451,8 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 
 		is_everything: bool = get_json_key(json, 'is-everything', bool, can_be_none=False, default=False)
 		url: str = f'https://newsapi.org/v2/{'everything?domains=wsj.com' if is_everything else 'everything?q=invest'}&apiKey={os.getenv('newsapikey')}'
-		response: requests.Response = requests.get(url)
+		with Metrics.upstream('newsapi'):
+			response: requests.Response = requests.get(url)
 
 		if not response.ok:
 			return 502
@@ -186,18 +464,151 @@ def handle_implicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 
 		return content['articles']
 
+	@api.endpoint('/batch')
+	def on_batch(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> int | dict[str, list[dict[str, typing.Any]]]:
+		"""
+		*API endpoint*\n
+		Runs several read-only sub-requests concurrently in one round trip\n
+		Each sub-request is a dictionary with an 'endpoint' route (for example '/company-history') and an optional 'body'
+		:param session: The client session
+		:param json: The request JSON
+		:return: The result of each sub-request in order, each with its own 'status' and 'body'
+		"""
+
+		sub_requests: typing.Any = json.get('requests')
+
+		if not isinstance(sub_requests, list) or not all(isinstance(sub_request, dict) and isinstance(sub_request.get('endpoint'), str) and isinstance(sub_request.get('body', {}), (dict, type(None))) for sub_request in sub_requests):
+			return 400
+		elif len(sub_requests) > 32:
+			return 413
+
+		return {'results': api.batch(session, sub_requests)}
+
 	@api.endpoint("/chatbot")
 	def on_chatbot(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> int | dict:
 		user_input: str = get_json_key(json, "user_input", str)
 		session_key: uuid.UUID = session.token
 		bot: Chatbot.ChatBot = chat_bots.setdefault(session_key, Chatbot.ChatBot())
-		reply = bot.get_response(user_input)
+
+		try:
+			reply = bot.get_response(user_input)
+		except Gateway.GatewayBusyError:
+			return 429
+		except TimeoutError:
+			return 504
 
 		return {
 			"reply": reply,
 			"session_key": str(session_key),  # optional: helpful for debugging
 		}
 
+	@server.route('/react/chatbot-stream', methods=('POST', 'OPTIONS'))
+	def on_chatbot_stream() -> flask.Response:
+		"""
+		*Streaming API endpoint*\n
+		Relays chatbot reply tokens to the client as server-sent events while they are generated\n
+		Emits 'token' events followed by a single 'done' or 'error' event\n
+		The upstream request is cancelled if the client disconnects
+		:return: A 'text/event-stream' response
+		"""
+
+		if flask.request.method == 'OPTIONS':
+			return flask.Response(status=200, headers=cors)
+
+		# Holds the request timing and admission until the stream ends; closing it again is a no-op
+		scope: contextlib.ExitStack = contextlib.ExitStack()
+		request: Metrics.RequestContext = scope.enter_context(Metrics.request('/chatbot-stream'))
+		session: typing.Optional[Connection.FlaskServerAPI.APISessionInfo] = None
+		finished: bool = False
+
+		def finish(status: int, error: typing.Optional[str] = None) -> None:
+			nonlocal finished
+
+			if finished:
+				return
+
+			finished = True
+			request.status = status
+			scope.close()
+			RequestLog.record(request, session, stream=True, error=error)
+
+		def failure(status: int, error: str) -> flask.Response:
+			finish(status)
+			return flask.Response(json.dumps({'error': error}), status=status, content_type='application/json', headers=cors)
+
+		def respond() -> flask.Response:
+			nonlocal session
+			request_json: typing.Optional[dict[str, ...]] = flask.request.get_json(silent=True)
+
+			if not isinstance(request_json, dict):
+				return failure(415, 'invalid-content-type')
+
+			auth: typing.Optional[uuid.UUID] = Connection.FlaskServerAPI.__parse_auth_token__(request_json.get('auth'))
+			session = None if auth is None else api.get_session_by_token(auth)
+
+			if session is None or session.closed:
+				return failure(401, 'not-authenticated')
+
+			try:
+				user_input: str = get_json_key(request_json, 'user_input', str)
+			except AssertionError:
+				return failure(400, 'HTTP/400')
+
+			bot: Chatbot.ChatBot = chat_bots.setdefault(session.token, Chatbot.ChatBot())
+			client_disconnected: typing.Callable[[], bool] = flask.request.environ.get('waitress.client_disconnected', lambda: False)
+
+			try:
+				scope.enter_context(api.admit('/chatbot-stream', session))
+			except Admission.AdmissionRejected as rejected:
+				return failure(rejected.status, f'HTTP/{rejected.status}')
+
+			tokens: typing.Generator[str, None, None] = bot.stream_response(user_input)
+
+			try:
+				first: typing.Optional[str] = next(tokens, None)
+			except Gateway.GatewayBusyError:
+				return failure(429, 'HTTP/429')
+			except TimeoutError:
+				return failure(504, 'HTTP/504')
+
+			def relay() -> typing.Generator[str, None, None]:
+				reply: list[str] = []
+				# 499: the client closed the connection before the reply was complete
+				status: int = 499
+				error: typing.Optional[str] = None
+
+				try:
+					for token in itertools.chain(() if first is None else (first,), tokens):
+						if client_disconnected():
+							return
+
+						reply.append(token)
+						yield sse_event('token', {'delta': token})
+
+					status = 200
+					yield sse_event('done', {'reply': ''.join(reply).strip(), 'session_key': str(session.token)})
+				except Exception as e:
+					# Headers were already sent with 200; the request is logged as the server error it ended with
+					status = 500
+					error = type(e).__name__
+					sys.stderr.write(''.join(traceback.format_exception(e)))
+					yield sse_event('error', {'error': 'An internal error has occurred'})
+				finally:
+					tokens.close()
+					finish(status, error)
+
+			response: flask.Response = flask.Response(relay(), status=200, content_type='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'} | cors)
+			# A stream closed before its first chunk never runs the relay's 'finally'
+			response.call_on_close(tokens.close)
+			response.call_on_close(lambda: finish(499))
+			return response
+
+		try:
+			return respond()
+		except BaseException as e:
+			finish(500, type(e).__name__)
+			raise
+
 
 def handle_explicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 	"""
@@ -207,24 +618,39 @@ def handle_explicit_api(server: flask.Flask, cors: dict[str, str]) -> None:
 	:param cors: The CORS headers
 	"""
 
-	api: Connection.FlaskServerAPI = Connection.FlaskServerAPI(server, '/api', requires_auth=False, global_response_headers=cors)
+	api: ManagedServerAPI = ManagedServerAPI(server, '/api', requires_auth=False, global_response_headers=cors)
 
 	@api.endpoint('/test')
 	def on_test(session: Connection.FlaskServerAPI.APISessionInfo, json: dict[str, ...]) -> dict[str, ...]:
-		print(f'API Request @ \'/test\': {session.token}')
 		return {
 			'purpose': 'This is a test of the API system',
 			'time': datetime.datetime.now(datetime.timezone.utc).timestamp()
 		}
 
 
-def init(server: flask.Flask, internal_cors: dict[str, str], external_cors) -> None:
+def init(server: flask.Flask, internal_cors: dict[str, str], external_cors, admission: typing.Optional[Admission.AdmissionController] = None) -> None:
 	"""
 	Initializes all flask server API endpoints
 	:param server: The flask server instance
 	:param internal_cors: The CORS header for internal API
 	:param external_cors: The CORS header for external API
+	:param admission: The admission controller applied to the internal API or None to admit all requests
 	"""
 
-	handle_implicit_api(server, internal_cors)
+	@server.after_request
+	def add_retry_after(response: flask.Response) -> flask.Response:
+		if (retry_after := flask.g.get('retry_after')) is not None:
+			response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+
+		return response
+
+	@server.after_request
+	def add_cache_headers(response: flask.Response) -> flask.Response:
+		if (etag := flask.g.get('etag')) is not None and response.status_code in (200, 304):
+			response.headers['ETag'] = etag
+			response.headers['Cache-Control'] = f'private, max-age={flask.g.get('max_age', 0)}'
+
+		return response
+
+	handle_implicit_api(server, internal_cors, admission)
 	handle_explicit_api(server, external_cors)
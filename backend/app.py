@@ -2,14 +2,22 @@
 
 import atexit
 import flask
+import hmac
+import os
 import psutil
 import sys
+import traceback
 
 import CustomMethodsVI.Connection as Connection
 import CustomMethodsVI.FileSystem as FileSystem
 import CustomMethodsVI.Logger as Logger
 
+import Admission
+import Autosave
 import Database
+import Gateway
+import Metrics
+import RequestLog
 import Socketio
 import ServerAPI
 import Logging
@@ -18,16 +26,34 @@ import Logging
 CORS: dict[str, str] = {
     'Access-Control-Allow-Origin': 'https://senior-project-ii.vercel.app',
     'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+    'Access-Control-Expose-Headers': 'ETag, Retry-After',
     'Access-Control-Allow-Credentials': 'true'
 }
+METRICS_TOKEN: str = os.getenv('METRICS_TOKEN', '')
+THREADS: int = max(psutil.cpu_count(False) >> 1, 4)
+ADMISSION: Admission.AdmissionController | None = None if os.getenv('API_ADMISSION', 'on').lower() == 'off' else Admission.AdmissionController({
+    '/company-history-image': Admission.EndpointPolicy(1, 5, max_concurrent=max(THREADS >> 1, 1), max_waiting=THREADS, expensive=True),
+    '/chatbot': Admission.EndpointPolicy(0.5, 3, max_concurrent=max(THREADS >> 1, 1), max_waiting=THREADS, expensive=True),
+    '/chatbot-stream': Admission.EndpointPolicy(0.5, 3, max_concurrent=max(THREADS >> 1, 1), max_waiting=THREADS, expensive=True),
+    '/company-history': Admission.EndpointPolicy(5, 20),
+    '/companies': Admission.EndpointPolicy(5, 20),
+}, default=Admission.EndpointPolicy(10, 30), shed_threshold=THREADS - 1)
 
 logger: Logger.Logger = Logging.init(False)
+RequestLog.start({
+    '/chatbot': 1.0,
+    '/company-history-image': 0.5,
+    '/connect': 1.0,
+    '/disconnect': 1.0,
+    '/test': 1.0,
+})
 app: flask.Flask = flask.Flask(__name__, static_folder='static', template_folder='template')
 Database.MyDatabase.load(FileSystem.File(__file__).parent.directory('database'))
+Autosave.start()
 server: Connection.FlaskSocketioServer = Connection.FlaskSocketioServer(app)
 Socketio.init(server)
-ServerAPI.init(app, CORS, {})
+ServerAPI.init(app, CORS, {}, ADMISSION)
 
 
 @app.after_request
@@ -48,20 +74,41 @@ def candlestick() -> flask.Response:
     return flask.Response(flask.render_template('candlestick.html'), status=200, headers=CORS)
 
 
+@app.route('/metrics')
+def metrics() -> flask.Response:
+    # Metrics expose internal state, so scrapes must present 'METRICS_TOKEN' as a bearer token; the route is hidden without one
+    if len(METRICS_TOKEN) == 0:
+        return flask.Response('Not Found', status=404)
+    elif not hmac.compare_digest(flask.request.headers.get('Authorization', '').encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+        return flask.Response('Unauthorized', status=401, headers={'WWW-Authenticate': 'Bearer realm="metrics"'})
+
+    return flask.Response(Metrics.render(), status=200, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # General Functions
 def main() -> None:
     import waitress
-    waitress.serve(app, port=5004, threads=max(psutil.cpu_count(False) >> 1, 4))
+    waitress.serve(app, port=5004, threads=THREADS)
 
 
 def nomain() -> None:
     print('=' * 100)
     print('\033[38;2;255;224;128m[!] Closing...\033[0m')
-    Database.MyDatabase.unload(save=True)
-    print('\033[38;2;255;128;128m[!] Server closed.\033[0m')
-    sys.stdout = sys.__stdout__
-    sys.stderr = sys.__stderr__
-    logger.close()
+
+    try:
+        Gateway.shutdown()
+        Autosave.shutdown()
+        Database.MyDatabase.unload(save=True)
+        print('\033[38;2;255;128;128m[!] Server closed.\033[0m')
+    except BaseException as e:
+        # Written while the log pipeline still runs so the failure reaches the log file
+        sys.stderr.write(''.join(traceback.format_exception(e)))
+        raise
+    finally:
+        try:
+            RequestLog.shutdown()
+        finally:
+            Logging.shutdown()
 
 
 # Cleanup
@@ -0,0 +1,403 @@
+# End-to-end load test for the /react API
+# Starts app.py under waitress in a child process with stubbed yfinance, OpenAI and newsapi backends, drives a weighted endpoint mix at fixed concurrency levels and saves the results as JSON
+#
+# Usage (from backend/):
+#   python benchmark/ApiBenchmark.py --levels 1,4,16 --duration 10
+#   python benchmark/ApiBenchmark.py --mix companies=5,chatbot=1 --compare benchmark/results/<old>.json
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import typing
+
+import Report
+
+BACKEND: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYMBOLS: tuple[str, ...] = ('AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'JPM', 'V', 'WMT')
+QUESTIONS: tuple[str, ...] = ('What is a stock?', 'What is a bond?', 'What is an ETF?', 'How do dividends work?', 'What is diversification?', 'What does P/E ratio mean?', 'What is a bear market?', 'What is compound interest?')
+DEFAULT_MIX: str = 'companies=40,company-current=20,company-history=20,company-history-image=5,chatbot=15'
+PERIOD_DAYS: dict[str, int] = {'1d': 1, '5d': 5, '7d': 7, '1mo': 30, '3mo': 90, '6mo': 180, '1y': 365, '2y': 730, '5y': 1825, '10yr': 3650, 'ytd': 180, 'max': 7300}
+INTERVAL_SECONDS: dict[str, int] = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '1d': 86400, '5d': 432000, '1wk': 604800, '1mo': 2635200, '3mo': 7905600}
+
+
+### Stubbed upstream services (installed in the server process)
+class StubTicker:
+	"""
+	Stand-in for 'yfinance.Ticker' producing deterministic prices locally
+	"""
+
+	latency: float = 0
+
+	def __init__(self, code: str):
+		self.__code__: str = str(code)
+		self.__seed__: int = int.from_bytes(hashlib.sha256(self.__code__.encode()).digest()[:4], 'big')
+
+	@property
+	def info(self) -> dict[str, float]:
+		time.sleep(StubTicker.latency)
+		base: float = 50 + self.__seed__ % 400
+		return {'currentPrice': base * 1.01, 'open': base, 'dayHigh': base * 1.02, 'dayLow': base * 0.98}
+
+	def history(self, period: str = '1mo', interval: str = '1d'):
+		time.sleep(StubTicker.latency)
+		return StubTicker.__frame__(self.__code__, self.__seed__, period, interval).copy()
+
+	@staticmethod
+	@functools.lru_cache(maxsize=256)
+	def __frame__(code: str, seed: int, period: str, interval: str):
+		import numpy
+		import pandas
+
+		count: int = max(2, min(2000, PERIOD_DAYS.get(period, 30) * 86400 // INTERVAL_SECONDS.get(interval, 86400)))
+		rng: numpy.random.Generator = numpy.random.default_rng(seed)
+		close: numpy.ndarray = (50 + seed % 400) * numpy.exp(numpy.cumsum(rng.normal(0, 0.01, count)))
+		open_price: numpy.ndarray = numpy.concatenate(((close[0],), close[:-1]))
+		spread: numpy.ndarray = numpy.abs(rng.normal(0, 0.005, count)) * close
+		index: pandas.DatetimeIndex = pandas.date_range(end=pandas.Timestamp.now().normalize(), periods=count, freq=pandas.Timedelta(seconds=INTERVAL_SECONDS.get(interval, 86400)))
+		return pandas.DataFrame({'Open': open_price, 'High': numpy.maximum(open_price, close) + spread, 'Low': numpy.minimum(open_price, close) - spread, 'Close': close, 'Volume': rng.integers(1e5, 1e7, count)}, index=index)
+
+
+class StubNewsResponse:
+	"""
+	Stand-in for the newsapi 'requests.Response'
+	"""
+
+	ok: bool = True
+
+	@staticmethod
+	def json() -> dict[str, typing.Any]:
+		return {'status': 'ok', 'totalResults': 3, 'articles': [{'title': f'Market update {i}', 'url': f'https://example.com/{i}', 'source': {'name': 'Stub'}} for i in range(3)]}
+
+
+class StubRequests:
+	"""
+	Stand-in for the 'requests' module as used by the news endpoint
+	"""
+
+	latency: float = 0
+	Response: type = StubNewsResponse
+
+	@staticmethod
+	def get(url: str, *args, **kwargs) -> StubNewsResponse:
+		time.sleep(StubRequests.latency)
+		return StubNewsResponse()
+
+
+def serve(port: int, threads: typing.Optional[int], upstream_latency: float, chat_latency: float, admission: bool) -> None:
+	"""
+	Runs the app under waitress with stubbed upstream services (server process entry point)
+	:param port: The port to listen on
+	:param threads: The waitress thread count or None to use the app default
+	:param upstream_latency: The seconds added to each stubbed yfinance and newsapi call
+	:param chat_latency: The seconds the stubbed chat model waits before replying
+	:param admission: Whether admission control stays enabled
+	"""
+
+	os.environ['OPENAI_BACKEND'] = 'stub'
+	os.environ['OPENAI_STUB_LATENCY'] = str(chat_latency)
+	os.environ['API_ADMISSION'] = 'on' if admission else 'off'
+	sys.path.insert(0, BACKEND)
+
+	import waitress
+	import yfinance
+
+	StubTicker.latency = StubRequests.latency = upstream_latency
+	yfinance.Ticker = StubTicker
+
+	import app
+	import ServerAPI
+
+	ServerAPI.requests = StubRequests
+	waitress.serve(app.app, host='127.0.0.1', port=port, threads=app.THREADS if threads is None else threads, _quiet=True)
+
+
+### Load generation
+class Worker(threading.Thread):
+	"""
+	A single client holding its own session and keep-alive connection
+	"""
+
+	def __init__(self, port: int, endpoints: list[str], weights: list[float], seed: int, start: threading.Barrier, stop: threading.Event, warmup: int):
+		super().__init__(daemon=True)
+		self.__port__: int = port
+		self.__endpoints__: list[str] = endpoints
+		self.__weights__: list[float] = weights
+		self.__random__: random.Random = random.Random(seed)
+		self.__start__: threading.Barrier = start
+		self.__stop__: threading.Event = stop
+		self.__warmup__: int = warmup
+		self.__connection__: typing.Optional[http.client.HTTPConnection] = None
+		self.__auth__: typing.Optional[str] = None
+		self.samples: list[tuple[str, int, float]] = []
+
+	def __post__(self, path: str, body: dict[str, typing.Any]) -> tuple[int, bytes]:
+		if self.__connection__ is None:
+			self.__connection__ = http.client.HTTPConnection('127.0.0.1', self.__port__, timeout=120)
+
+		try:
+			self.__connection__.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+			response: http.client.HTTPResponse = self.__connection__.getresponse()
+			return response.status, response.read()
+		except (OSError, http.client.HTTPException):
+			self.__connection__.close()
+			self.__connection__ = None
+			raise
+
+	def payload(self, endpoint: str) -> dict[str, typing.Any]:
+		"""
+		:param endpoint: The endpoint name
+		:return: A randomized request body for the endpoint
+		"""
+
+		symbol: str = self.__random__.choice(SYMBOLS)
+
+		if endpoint == 'companies':
+			return {'page': self.__random__.randrange(10)}
+		elif endpoint == 'company-current':
+			return {'company': symbol}
+		elif endpoint == 'company-history':
+			return {'company': symbol, 'period': self.__random__.choice(('LAST_MONTH', 'LAST_QUARTER', 'LAST_YEAR')), 'interval': 'DAY'}
+		elif endpoint == 'company-history-image':
+			return {'company': symbol, 'period': 'LAST_QUARTER', 'interval': 'DAY', 'size': 512}
+		elif endpoint == 'chatbot':
+			return {'user_input': self.__random__.choice(QUESTIONS)}
+		else:
+			return {}
+
+	def request(self, endpoint: str) -> tuple[int, float]:
+		"""
+		Sends a single request
+		:param endpoint: The endpoint name
+		:return: The HTTP status (0 on connection failure) and latency in seconds
+		"""
+
+		body: dict[str, typing.Any] = self.payload(endpoint)
+		body['auth'] = self.__auth__
+		started: float = time.perf_counter()
+
+		try:
+			status, _ = self.__post__(f'/react/{endpoint}', body)
+		except (OSError, http.client.HTTPException):
+			status = 0
+
+		return status, time.perf_counter() - started
+
+	def run(self) -> None:
+		try:
+			status, content = self.__post__('/react/connect', {})
+			self.__auth__ = json.loads(content)['auth'] if status == 200 else None
+
+			for _ in range(self.__warmup__):
+				self.request(self.__random__.choices(self.__endpoints__, self.__weights__)[0])
+		finally:
+			self.__start__.wait()
+
+		while not self.__stop__.is_set():
+			endpoint: str = self.__random__.choices(self.__endpoints__, self.__weights__)[0]
+			status, latency = self.request(endpoint)
+			self.samples.append((endpoint, status, latency))
+
+		try:
+			self.__post__('/react/disconnect', {'auth': self.__auth__})
+		except (OSError, http.client.HTTPException):
+			pass
+
+		if self.__connection__ is not None:
+			self.__connection__.close()
+
+
+def summarize(samples: list[tuple[str, int, float]], elapsed: float) -> dict[str, typing.Any]:
+	"""
+	Summarizes the samples of one concurrency level
+	:param samples: The (endpoint, status, latency) samples
+	:param elapsed: The measured wall time in seconds
+	:return: Throughput, status counts and latency percentiles (overall and per endpoint)
+	"""
+
+	def section(selected: list[tuple[str, int, float]]) -> dict[str, typing.Any]:
+		statuses: dict[str, int] = {}
+
+		for _, status, _ in selected:
+			statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+		ok: list[float] = [latency for _, status, latency in selected if status == 200]
+		return {
+			'requests': len(selected),
+			'errors': len(selected) - len(ok),
+			'throughput': round(len(selected) / elapsed, 2),
+			'ok_throughput': round(len(ok) / elapsed, 2),
+			'statuses': statuses,
+			'latency_ms': Report.summarize(ok)
+		}
+
+	result: dict[str, typing.Any] = section(samples)
+	result['endpoints'] = {endpoint: section([sample for sample in samples if sample[0] == endpoint]) for endpoint in sorted({sample[0] for sample in samples})}
+	return result
+
+
+def run_level(port: int, concurrency: int, endpoints: list[str], weights: list[float], duration: float, warmup: int, seed: int) -> dict[str, typing.Any]:
+	"""
+	Drives the endpoint mix at a fixed concurrency for a fixed duration
+	:param port: The server port
+	:param concurrency: The number of concurrent clients
+	:param endpoints: The endpoint names
+	:param weights: The relative endpoint weights
+	:param duration: The measured duration in seconds
+	:param warmup: The number of unmeasured requests each client sends first
+	:param seed: The random seed
+	:return: The level summary
+	"""
+
+	start: threading.Barrier = threading.Barrier(concurrency + 1)
+	stop: threading.Event = threading.Event()
+	workers: list[Worker] = [Worker(port, endpoints, weights, seed * 1000003 + i, start, stop, warmup) for i in range(concurrency)]
+
+	for worker in workers:
+		worker.start()
+
+	start.wait()
+	started: float = time.perf_counter()
+	time.sleep(duration)
+	stop.set()
+
+	for worker in workers:
+		worker.join()
+
+	elapsed: float = time.perf_counter() - started
+	result: dict[str, typing.Any] = {'concurrency': concurrency, 'duration': round(elapsed, 3)}
+	result.update(summarize([sample for worker in workers for sample in worker.samples], elapsed))
+	return result
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+	"""
+	Parses an endpoint mix such as 'companies=40,chatbot=10'
+	:param mix: The mix string
+	:return: The weight of each endpoint
+	:raises ValueError: If the mix is malformed or empty
+	"""
+
+	weights: dict[str, float] = {}
+
+	for part in mix.split(','):
+		if len(part := part.strip()) == 0:
+			continue
+
+		name, _, weight = part.partition('=')
+		weights[name.strip().strip('/').removeprefix('react/')] = float(weight or 1)
+
+	if len(weights) == 0 or any(weight < 0 for weight in weights.values()) or sum(weights.values()) <= 0:
+		raise ValueError(f'Invalid endpoint mix: \'{mix}\'')
+
+	return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def free_port() -> int:
+	"""
+	:return: A currently unused local TCP port
+	"""
+
+	with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+		sock.bind(('127.0.0.1', 0))
+		return sock.getsockname()[1]
+
+
+def wait_ready(port: int, server: subprocess.Popen, timeout: float) -> None:
+	"""
+	Blocks until the server answers requests
+	:param port: The server port
+	:param server: The server process
+	:param timeout: The maximum number of seconds to wait
+	:raises RuntimeError: If the server exits or does not answer in time
+	"""
+
+	deadline: float = time.monotonic() + timeout
+
+	while time.monotonic() < deadline:
+		if server.poll() is not None:
+			raise RuntimeError(f'Server exited during startup with code {server.returncode}')
+
+		try:
+			connection: http.client.HTTPConnection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+			connection.request('GET', '/')
+
+			if connection.getresponse().status == 200:
+				connection.close()
+				return
+		except (OSError, http.client.HTTPException):
+			time.sleep(0.25)
+
+	raise RuntimeError('Server did not start in time')
+
+
+def main() -> None:
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Load test the /react API against stubbed upstream services')
+	parser.add_argument('--levels', default='1,4,16,32', help='Comma separated client concurrency levels')
+	parser.add_argument('--duration', type=float, default=10, help='Measured seconds per concurrency level')
+	parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per client before each level')
+	parser.add_argument('--mix', default=DEFAULT_MIX, help='Endpoint weights, for example \'companies=40,chatbot=15\'')
+	parser.add_argument('--threads', type=int, default=None, help='Waitress thread count (defaults to the app setting)')
+	parser.add_argument('--upstream-latency', type=float, default=0.05, help='Seconds added to each stubbed yfinance and newsapi call')
+	parser.add_argument('--chat-latency', type=float, default=0.5, help='Seconds the stubbed chat model waits before replying')
+	parser.add_argument('--admission', action='store_true', help='Keep per-session rate limiting and admission control enabled')
+	parser.add_argument('--seed', type=int, default=0, help='Random seed for request selection')
+	parser.add_argument('--output', default=None, help='Report path (defaults to benchmark/results/api-<commit>-<time>.json)')
+	parser.add_argument('--compare', default=None, help='Saved report to print changes against')
+	parser.add_argument('--verbose', action='store_true', help='Show server output')
+	parser.add_argument('--serve', type=int, default=None, help=argparse.SUPPRESS)
+	args: argparse.Namespace = parser.parse_args()
+
+	if args.serve is not None:
+		serve(args.serve, args.threads, args.upstream_latency, args.chat_latency, args.admission)
+		return
+
+	mix: dict[str, float] = parse_mix(args.mix)
+	levels: list[int] = [int(level) for level in args.levels.split(',') if len(level.strip())]
+	assert all(level > 0 for level in levels), 'Invalid concurrency level'
+	port: int = free_port()
+	command: list[str] = [sys.executable, os.path.abspath(__file__), '--serve', str(port), '--upstream-latency', str(args.upstream_latency), '--chat-latency', str(args.chat_latency)]
+	command += ([] if args.threads is None else ['--threads', str(args.threads)]) + (['--admission'] if args.admission else [])
+	output: typing.Optional[int] = None if args.verbose else subprocess.DEVNULL
+	server: subprocess.Popen = subprocess.Popen(command, cwd=BACKEND, stdout=output, stderr=output)
+	results: list[dict[str, typing.Any]] = []
+
+	try:
+		wait_ready(port, server, 120)
+
+		for concurrency in levels:
+			result: dict[str, typing.Any] = run_level(port, concurrency, list(mix.keys()), list(mix.values()), args.duration, args.warmup, args.seed)
+			latency: dict[str, float] = result['latency_ms']
+			print(f'c={concurrency:<4} {result['throughput']:>9.1f} req/s  ok={result['requests'] - result['errors']:<7} errors={result['errors']:<5} p50={latency.get('p50', float('nan')):>9.2f}ms  p95={latency.get('p95', float('nan')):>9.2f}ms  p99={latency.get('p99', float('nan')):>9.2f}ms')
+			results.append(result)
+	finally:
+		server.terminate()
+
+		try:
+			server.wait(10)
+		except subprocess.TimeoutExpired:
+			server.kill()
+
+	report: dict[str, typing.Any] = {
+		'environment': Report.environment(),
+		'config': {'levels': levels, 'duration': args.duration, 'warmup': args.warmup, 'mix': mix, 'threads': args.threads, 'upstream_latency': args.upstream_latency, 'chat_latency': args.chat_latency, 'admission': args.admission, 'seed': args.seed},
+		'levels': results
+	}
+	print(f'Saved {Report.save('api', report, args.output)}')
+
+	if args.compare is not None:
+		Report.print_comparison(args.compare, report)
+
+
+if __name__ == '__main__':
+	main()
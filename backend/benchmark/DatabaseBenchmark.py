@@ -0,0 +1,315 @@
+# Micro-benchmarks for Database.MyDatabase
+# Measures item access, updates, atomic batches, change feed publishing, iteration, key range scans, copies, indexed queries, journaled, full and incrementally re-encrypted saves across sector sizes and reader/writer thread counts
+#
+# Usage (from backend/):
+#   python benchmark/DatabaseBenchmark.py --sizes 1KB,1MB,100MB --threads 1,4,16
+#   python benchmark/DatabaseBenchmark.py --sizes 10MB --compare benchmark/results/<old>.json
+
+from __future__ import annotations
+
+import argparse
+import copy
+import datetime
+import functools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import typing
+
+import Report
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import CustomMethodsVI.Concurrent as Concurrent
+
+import Database
+import Feed
+
+SECTORS: tuple[str, ...] = ('Technology', 'Healthcare', 'Financials', 'Energy', 'Industrials', 'Utilities', 'Consumer Staples')
+UNITS: dict[str, int] = {'B': 1, 'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+PASSWORD: str = 'benchmark-password'
+
+
+def parse_size(size: str) -> int:
+	"""
+	Parses a byte size such as '10MB'
+	:param size: The size string
+	:return: The size in bytes
+	:raises ValueError: If the size is malformed
+	"""
+
+	size = size.strip().upper()
+
+	for unit in sorted(UNITS, key=len, reverse=True):
+		if size.endswith(unit):
+			return int(float(size.removesuffix(unit)) * UNITS[unit])
+
+	return int(size)
+
+
+def record(rng: random.Random, symbol: str, weeks: int = 10) -> dict[str, typing.Any]:
+	"""
+	Generates a company record shaped like the entries of the 'companies' sector (about 1 KB with 10 weeks)
+	:param rng: The random source
+	:param symbol: The company symbol
+	:param weeks: The number of weekly price entries
+	:return: The record
+	"""
+
+	price: float = rng.uniform(10, 500)
+	series: dict[str, dict[str, str]] = {}
+	day: datetime.date = datetime.date(2026, 1, 26)
+
+	for week in range(weeks):
+		close: float = price * rng.uniform(0.95, 1.05)
+		series[(day - datetime.timedelta(weeks=week)).isoformat()] = {'1. open': f'{price:.4f}', '2. high': f'{max(price, close) * 1.01:.4f}', '3. low': f'{min(price, close) * 0.99:.4f}', '4. close': f'{close:.4f}'}
+		price = close
+
+	return {'Meta Data': {'1. Symbol': symbol, '2. Name': f'{symbol} Holdings Inc.', '3. Sector': rng.choice(SECTORS)}, 'Time Series (Weekly)': series}
+
+
+def contents(size: int, seed: int) -> dict[str, typing.Any]:
+	"""
+	Generates sector contents of approximately the specified serialized size
+	:param size: The target size in bytes
+	:param seed: The random seed
+	:return: The sector contents
+	"""
+
+	rng: random.Random = random.Random(seed)
+	sample: int = len(json.dumps({'S000000': record(rng, 'S000000')}))
+	return {f'S{i:06}': record(rng, f'S{i:06}') for i in range(max(1, round(size / sample)))}
+
+
+def measure(operation: typing.Callable[[], typing.Any], *, repeats: int, budget: float, setup: typing.Optional[typing.Callable[[], typing.Any]] = None) -> list[float]:
+	"""
+	Times an operation repeatedly
+	:param operation: The operation
+	:param repeats: The minimum number of timed runs
+	:param budget: The number of seconds after which no further runs start once 'repeats' is reached
+	:param setup: An untimed callable run before each timed run
+	:return: The duration of each run in seconds
+	"""
+
+	samples: list[float] = []
+	deadline: float = time.perf_counter() + budget
+
+	while len(samples) < repeats or (time.perf_counter() < deadline and len(samples) < repeats * 1000):
+		if setup is not None:
+			setup()
+
+		started: float = time.perf_counter()
+		operation()
+		samples.append(time.perf_counter() - started)
+
+	return samples
+
+
+def bench_sector(name: str, size: int, *, repeats: int, budget: float, seed: int) -> dict[str, typing.Any]:
+	"""
+	Benchmarks single-threaded sector operations at one sector size
+	:param name: The size label
+	:param size: The target sector size in bytes
+	:param repeats: The minimum number of runs per operation
+	:param budget: The time budget per operation in seconds
+	:param seed: The random seed
+	:return: Per-operation latency summaries in microseconds
+	"""
+
+	data: dict[str, typing.Any] = contents(size, seed)
+	keys: list[str] = list(data.keys())
+	rng: random.Random = random.Random(seed)
+	sector_name: str = f'bench{name.lower()}'
+	plain: Database.MyDatabase = Database.MyDatabase.create(sector_name)
+	plain.set(data).wait()
+	plain.save()
+	nbytes: int = os.path.getsize(plain.__handle__.filepath)
+	encrypted: Database.MyDatabase = Database.MyDatabase.create(f'{sector_name}crypt', crypt=PASSWORD)
+	encrypted.set(data).wait()
+	encrypted.save()
+	binary: Database.MyDatabase = Database.MyDatabase.create(f'{sector_name}binary', codec='binary')
+	binary.set(data).wait()
+	binary.save()
+	subscription: Feed.Subscription = binary.subscribe(lambda events: None)
+	frozen: Database.MyDatabase = Database.MyDatabase.create(f'{sector_name}frozen', read_mode=Database.ReadMode.FROZEN)
+	frozen.set(data).wait()
+	frozen.create_index('sector', 'Meta Data.3. Sector').wait()
+	batch: dict[str, typing.Any] = {key: data[key] for key in rng.sample(keys, min(100, len(keys)))}
+	value: dict[str, typing.Any] = data[keys[0]]
+
+	def locked_lookup() -> typing.Any:
+		with plain.reader():
+			return plain.__contents__[rng.choice(keys)]
+
+	def touch(sector: Database.MyDatabase) -> typing.Callable[[], None]:
+		return lambda: sector.__setitem__(keys[0], value)
+
+	operations: dict[str, list[float]] = {
+		'getitem': measure(lambda: plain[rng.choice(keys)], repeats=repeats * 20, budget=budget),
+		'setitem': measure(lambda: plain.__setitem__(rng.choice(keys), value), repeats=repeats * 20, budget=budget),
+		'setitem_subscribed': measure(lambda: binary.__setitem__(rng.choice(keys), value), repeats=repeats * 20, budget=budget),
+		'update': measure(lambda: plain.update(batch).wait(), repeats=repeats * 5, budget=budget),
+		'batch_commit': measure(lambda: functools.reduce(lambda pending, item: pending.put(*item), batch.items(), plain.batch()).commit().wait(), repeats=repeats * 5, budget=budget),
+		'batch_compare_and_set': measure(lambda: functools.reduce(lambda pending, item: pending.put(item[0], item[1][0], expect=item[1][1]), plain.get_versioned(*batch).wait().items(), plain.batch()).commit().wait(), repeats=repeats * 5, budget=budget),
+		'contains': measure(lambda: rng.choice(keys) in plain, repeats=repeats * 20, budget=budget),
+		'iterate': measure(lambda: sum(1 for _ in plain), repeats=repeats, budget=budget),
+		'copy': measure(lambda: plain.copy().wait(), repeats=repeats, budget=budget),
+		'getitem_frozen': measure(lambda: frozen[rng.choice(keys)], repeats=repeats * 20, budget=budget),
+		'setitem_frozen': measure(lambda: frozen.__setitem__(rng.choice(keys), value), repeats=repeats * 20, budget=budget),
+		'iterate_frozen': measure(lambda: sum(1 for _ in frozen), repeats=repeats, budget=budget),
+		'scan_prefix': measure(lambda: sum(1 for _ in frozen.scan(prefix=rng.choice(keys)[:-2])), repeats=repeats * 5, budget=budget),
+		'copy_frozen': measure(lambda: frozen.copy().wait(), repeats=repeats, budget=budget, setup=touch(frozen)),
+		'query_index': measure(lambda: frozen.query('sector', rng.choice(SECTORS)).wait(), repeats=repeats * 5, budget=budget),
+		'query_scan': measure(lambda: (sector := rng.choice(SECTORS)) and [key for key, item in frozen if item['Meta Data']['3. Sector'] == sector], repeats=repeats, budget=budget),
+		'save_async': measure(lambda: plain.save_async().wait(), repeats=repeats, budget=budget, setup=touch(plain)),
+		'save': measure(plain.save, repeats=repeats, budget=budget, setup=touch(plain)),
+		'save_full': measure(plain.compact, repeats=repeats, budget=budget),
+		'save_full_binary': measure(binary.compact, repeats=repeats, budget=budget),
+		'save_encrypted': measure(encrypted.save, repeats=repeats, budget=budget, setup=touch(encrypted)),
+		'save_full_encrypted': measure(encrypted.compact, repeats=repeats, budget=budget, setup=touch(encrypted)),
+		'open': measure(lambda: Database.MyDatabase(plain.__handle__).close(), repeats=repeats, budget=budget),
+		'open_binary': measure(lambda: Database.MyDatabase(binary.__handle__, codec='binary').close(), repeats=repeats, budget=budget),
+		'open_encrypted': measure(lambda: Database.MyDatabase(encrypted.__handle__, crypt=PASSWORD).close(), repeats=repeats, budget=budget),
+
+		# Components of a single item read ('spawn' is the per-call thread start MyDatabase used before the synchronous fast path)
+		'spawn': measure(lambda: Concurrent.ThreadedFunction(lambda: None)().wait(), repeats=repeats * 20, budget=budget),
+		'deepcopy': measure(lambda: copy.deepcopy(data[rng.choice(keys)]), repeats=repeats * 20, budget=budget),
+		'locked_lookup': measure(locked_lookup, repeats=repeats * 20, budget=budget)
+	}
+
+	result: dict[str, typing.Any] = {
+		'name': name,
+		'bytes': nbytes,
+		'bytes_binary': os.path.getsize(binary.__handle__.filepath),
+		'records': len(keys),
+		'operations': {operation: Report.summarize(samples, 1e6) for operation, samples in operations.items()},
+	}
+
+	result['operations']['iterate']['per_record'] = round(result['operations']['iterate']['p50'] / len(keys), 4)
+	result['save_mb_per_second'] = round(nbytes / (1 << 20) / (result['operations']['save_full']['p50'] / 1e6), 2)
+	result['save_encrypted_mb_per_second'] = round(nbytes / (1 << 20) / (result['operations']['save_full_encrypted']['p50'] / 1e6), 2)
+	subscription.close()
+	plain.close()
+	encrypted.close()
+	binary.close()
+	frozen.close()
+	Database.MyDatabase.delete(sector_name)
+	Database.MyDatabase.delete(f'{sector_name}crypt')
+	Database.MyDatabase.delete(f'{sector_name}binary')
+	Database.MyDatabase.delete(f'{sector_name}frozen')
+	return result
+
+
+def bench_threads(size: int, threads: int, *, operations: int, write_ratio: float, seed: int) -> dict[str, typing.Any]:
+	"""
+	Benchmarks concurrent mixed reads and writes against one sector
+	:param size: The target sector size in bytes
+	:param threads: The number of client threads
+	:param operations: The number of operations per thread
+	:param write_ratio: The fraction of operations that are writes
+	:param seed: The random seed
+	:return: Throughput and latency summaries in microseconds
+	"""
+
+	data: dict[str, typing.Any] = contents(size, seed)
+	keys: list[str] = list(data.keys())
+	sector_name: str = f'benchthreads{threads}'
+	sector: Database.MyDatabase = Database.MyDatabase.create(sector_name)
+	sector.set(data).wait()
+	barrier: threading.Barrier = threading.Barrier(threads + 1)
+	reads: list[list[float]] = [[] for _ in range(threads)]
+	writes: list[list[float]] = [[] for _ in range(threads)]
+
+	def client(index: int) -> None:
+		rng: random.Random = random.Random(seed * 1000003 + index)
+		barrier.wait()
+
+		for _ in range(operations):
+			key: str = rng.choice(keys)
+			started: float = time.perf_counter()
+
+			if rng.random() < write_ratio:
+				sector[key] = data[key]
+				writes[index].append(time.perf_counter() - started)
+			else:
+				sector[key]
+				reads[index].append(time.perf_counter() - started)
+
+	clients: list[threading.Thread] = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(threads)]
+
+	for thread in clients:
+		thread.start()
+
+	barrier.wait()
+	started: float = time.perf_counter()
+
+	for thread in clients:
+		thread.join()
+
+	elapsed: float = time.perf_counter() - started
+	sector.close()
+	Database.MyDatabase.delete(sector_name)
+	return {
+		'concurrency': threads,
+		'operations': threads * operations,
+		'throughput': round(threads * operations / elapsed, 2),
+		'read_us': Report.summarize((sample for samples in reads for sample in samples), 1e6),
+		'write_us': Report.summarize((sample for samples in writes for sample in samples), 1e6)
+	}
+
+
+def main() -> None:
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Micro-benchmark MyDatabase sector operations')
+	parser.add_argument('--sizes', default='1KB,10KB,100KB,1MB,10MB,100MB', help='Comma separated sector sizes')
+	parser.add_argument('--threads', default='1,2,4,8,16', help='Comma separated client thread counts')
+	parser.add_argument('--thread-size', default='1MB', help='Sector size used for the thread count benchmark')
+	parser.add_argument('--thread-operations', type=int, default=2000, help='Operations per thread in the thread count benchmark')
+	parser.add_argument('--write-ratio', type=float, default=0.1, help='Fraction of writes in the thread count benchmark')
+	parser.add_argument('--repeats', type=int, default=5, help='Minimum runs per whole-sector operation (single key operations run 20x as many)')
+	parser.add_argument('--budget', type=float, default=2, help='Seconds after which an operation stops repeating once it reached its minimum runs')
+	parser.add_argument('--seed', type=int, default=0, help='Random seed for generated data and key selection')
+	parser.add_argument('--output', default=None, help='Report path (defaults to benchmark/results/database-<commit>-<time>.json)')
+	parser.add_argument('--compare', default=None, help='Saved report to print changes against')
+	args: argparse.Namespace = parser.parse_args()
+	sizes: list[str] = [size.strip().upper() for size in args.sizes.split(',') if len(size.strip())]
+	threads: list[int] = [int(count) for count in args.threads.split(',') if len(count.strip())]
+	assert all(count > 0 for count in threads), 'Invalid thread count'
+	assert 0 <= args.write_ratio <= 1, 'Invalid write ratio'
+
+	with tempfile.TemporaryDirectory(prefix='mydatabase-bench-') as root:
+		Database.MyDatabase.load(root)
+		results: list[dict[str, typing.Any]] = []
+		concurrency: list[dict[str, typing.Any]] = []
+
+		for size in sizes:
+			result: dict[str, typing.Any] = bench_sector(size, parse_size(size), repeats=args.repeats, budget=args.budget, seed=args.seed)
+			operations: dict[str, dict[str, float]] = result['operations']
+			print(f'{size:>6} ({result['records']} records, {result['bytes'] / 1024:,.0f} KiB)')
+			print('       ' + '  '.join(f'{operation}={summary['p50']:,.1f}us' for operation, summary in operations.items()))
+			results.append(result)
+
+		for count in threads:
+			result = bench_threads(parse_size(args.thread_size), count, operations=args.thread_operations, write_ratio=args.write_ratio, seed=args.seed)
+			print(f'threads={count:<3} {result['throughput']:>10,.1f} ops/s  read p50={result['read_us'].get('p50', float('nan')):,.1f}us p99={result['read_us'].get('p99', float('nan')):,.1f}us  write p50={result['write_us'].get('p50', float('nan')):,.1f}us p99={result['write_us'].get('p99', float('nan')):,.1f}us')
+			concurrency.append(result)
+
+		Database.MyDatabase.unload(save=False)
+
+	report: dict[str, typing.Any] = {
+		'environment': Report.environment(),
+		'config': {'sizes': sizes, 'threads': threads, 'thread_size': args.thread_size, 'thread_operations': args.thread_operations, 'write_ratio': args.write_ratio, 'repeats': args.repeats, 'budget': args.budget, 'seed': args.seed},
+		'sizes': results,
+		'threads': concurrency
+	}
+	print(f'Saved {Report.save('database', report, args.output)}')
+
+	if args.compare is not None:
+		Report.print_comparison(args.compare, report)
+
+
+if __name__ == '__main__':
+	main()
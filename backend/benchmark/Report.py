@@ -0,0 +1,169 @@
+# Shared helpers for benchmark reports
+
+from __future__ import annotations
+
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import typing
+
+RESULTS: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(ordered: typing.Sequence[float], fraction: float) -> float:
+	"""
+	Gets a nearest-rank percentile
+	:param ordered: The samples in ascending order
+	:param fraction: The percentile as a fraction (0.99 for p99)
+	:return: The sample at the percentile or NaN if there are no samples
+	"""
+
+	if len(ordered) == 0:
+		return math.nan
+
+	return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def summarize(samples: typing.Iterable[float], scale: float = 1e3) -> dict[str, float | int]:
+	"""
+	Summarizes latency samples
+	:param samples: The samples in seconds
+	:param scale: The multiplier applied to reported values (1e3 reports milliseconds)
+	:return: The sample count, mean, min, max, p50, p95 and p99
+	"""
+
+	ordered: list[float] = sorted(samples)
+
+	if len(ordered) == 0:
+		return {'count': 0}
+
+	return {
+		'count': len(ordered),
+		'mean': round(sum(ordered) / len(ordered) * scale, 4),
+		'min': round(ordered[0] * scale, 4),
+		'p50': round(percentile(ordered, 0.50) * scale, 4),
+		'p95': round(percentile(ordered, 0.95) * scale, 4),
+		'p99': round(percentile(ordered, 0.99) * scale, 4),
+		'max': round(ordered[-1] * scale, 4)
+	}
+
+
+def commit() -> typing.Optional[str]:
+	"""
+	:return: The current git commit hash or None if unavailable
+	"""
+
+	try:
+		return subprocess.run(('git', 'rev-parse', '--short', 'HEAD'), capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def environment() -> dict[str, typing.Any]:
+	"""
+	:return: Information identifying the machine and interpreter a benchmark ran on
+	"""
+
+	return {
+		'commit': commit(),
+		'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+		'python': sys.version.split()[0],
+		'platform': platform.platform(),
+		'cpus': os.cpu_count()
+	}
+
+
+def save(name: str, report: dict[str, typing.Any], path: typing.Optional[str] = None) -> str:
+	"""
+	Saves a benchmark report as JSON
+	:param name: The benchmark name, used in the default file name
+	:param report: The report
+	:param path: The output path or None to write '<name>-<commit>-<time>.json' into 'benchmark/results'
+	:return: The path written to
+	"""
+
+	if path is None:
+		info: dict[str, typing.Any] = report.get('environment', {})
+		stamp: str = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+		path = os.path.join(RESULTS, f'{name}-{info.get('commit') or 'nocommit'}-{stamp}.json')
+
+	os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+	with open(path, 'w') as output:
+		json.dump(report, output, indent=2)
+
+	return path
+
+
+def flatten(report: typing.Any, prefix: str = '') -> dict[str, float]:
+	"""
+	Flattens the numeric values of a report into dotted keys\n
+	List entries are keyed by their 'name' or 'concurrency' field when present, otherwise by index
+	:param report: The report
+	:param prefix: The key prefix
+	:return: The flattened values
+	"""
+
+	values: dict[str, float] = {}
+
+	if isinstance(report, dict):
+		for key, value in report.items():
+			if key != 'environment':
+				values.update(flatten(value, f'{prefix}{key}.'))
+	elif isinstance(report, list):
+		for i, value in enumerate(report):
+			label: typing.Any = value.get('name', value.get('concurrency', i)) if isinstance(value, dict) else i
+			values.update(flatten(value, f'{prefix}{label}.'))
+	elif isinstance(report, (int, float)) and not isinstance(report, bool):
+		values[prefix.rstrip('.')] = float(report)
+
+	return values
+
+
+def compare(baseline: dict[str, typing.Any], current: dict[str, typing.Any], threshold: float = 0.1) -> list[tuple[str, float, float, float]]:
+	"""
+	Compares two reports of the same benchmark
+	:param baseline: The earlier report
+	:param current: The later report
+	:param threshold: The minimum relative change reported
+	:return: A list of (key, baseline, current, relative change) for values that changed by at least 'threshold'
+	"""
+
+	before: dict[str, float] = flatten(baseline)
+	after: dict[str, float] = flatten(current)
+	changes: list[tuple[str, float, float, float]] = []
+
+	for key in before.keys() & after.keys():
+		old, new = before[key], after[key]
+
+		if old == new or math.isnan(old) or math.isnan(new):
+			continue
+
+		change: float = math.inf if old == 0 else (new - old) / abs(old)
+
+		if abs(change) >= threshold:
+			changes.append((key, old, new, change))
+
+	return sorted(changes, key=lambda entry: entry[0])
+
+
+def print_comparison(baseline_path: str, current: dict[str, typing.Any], threshold: float = 0.1) -> None:
+	"""
+	Prints the values that changed between a saved report and a new one
+	:param baseline_path: The saved report path
+	:param current: The new report
+	:param threshold: The minimum relative change printed
+	"""
+
+	with open(baseline_path) as source:
+		baseline: dict[str, typing.Any] = json.load(source)
+
+	changes: list[tuple[str, float, float, float]] = compare(baseline, current, threshold)
+	print(f'Compared against {baseline_path} ({baseline.get('environment', {}).get('commit')}): {len(changes)} change(s) >= {threshold:.0%}')
+
+	for key, old, new, change in changes:
+		print(f'  {key:<60} {old:>14.4f} -> {new:>14.4f} ({change:+.1%})')
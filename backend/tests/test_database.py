@@ -0,0 +1,124 @@
+# Crash recovery tests for Database.MyDatabase snapshots and journals
+#
+# Usage (from backend/):
+#   python -m unittest discover -s tests
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import CustomMethodsVI.FileSystem as FileSystem
+
+import Database
+import Journal
+
+
+class Crash(BaseException):
+	"""
+	Stands in for the process dying at the patched call
+	"""
+
+
+class CheckpointRecoveryTest(unittest.TestCase):
+	"""
+	Reopens sectors left behind by a checkpoint interrupted between writing the snapshot and emptying the journal
+	"""
+
+	def setUp(self) -> None:
+		self.__directory__: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+		self.path: str = os.path.join(self.__directory__.name, 'sector.json')
+		self.journal: str = os.path.join(self.__directory__.name, 'sector.journal')
+		open(self.path, 'wb').close()
+
+	def tearDown(self) -> None:
+		self.__directory__.cleanup()
+
+	def open(self, **kwargs) -> Database.MyDatabase:
+		sector: Database.MyDatabase = Database.MyDatabase(FileSystem.File(self.path), **kwargs)
+		self.addCleanup(sector.close)
+		return sector
+
+	def crash_checkpoint(self, sector: Database.MyDatabase) -> None:
+		with unittest.mock.patch.object(Journal.Journal, 'reset', side_effect=Crash):
+			with self.assertRaises(Crash):
+				sector.compact()
+
+	def test_interrupted_checkpoint_discards_journal(self) -> None:
+		sector: Database.MyDatabase = self.open()
+		sector['kept'] = 1
+		sector['deleted'] = 1
+		sector.save()
+		sector['kept'] = 2
+		del sector['deleted']
+		self.crash_checkpoint(sector)
+		self.assertGreater(os.path.getsize(self.journal), 0)
+
+		reopened: Database.MyDatabase = self.open()
+		self.assertEqual(reopened['kept'], 2)
+		self.assertNotIn('deleted', reopened)
+		self.assertEqual(os.path.getsize(self.journal), 0)
+
+	def test_saves_after_recovery_are_replayed(self) -> None:
+		sector: Database.MyDatabase = self.open()
+		sector['a'] = 1
+		sector.save()
+		sector['a'] = 2
+		self.crash_checkpoint(sector)
+
+		recovered: Database.MyDatabase = self.open()
+		recovered['b'] = 3
+		recovered.save()
+
+		reopened: Database.MyDatabase = self.open()
+		self.assertEqual(reopened['a'], 2)
+		self.assertEqual(reopened['b'], 3)
+
+	def test_interrupted_encrypted_checkpoint_discards_journal(self) -> None:
+		sector: Database.MyDatabase = self.open(crypt='checkpoint-password')
+		sector['kept'] = 1
+		sector.save()
+		sector['deleted'] = 1
+		sector.save()
+		del sector['deleted']
+		self.crash_checkpoint(sector)
+
+		reopened: Database.MyDatabase = self.open(crypt='checkpoint-password')
+		self.assertEqual(reopened['kept'], 1)
+		self.assertNotIn('deleted', reopened)
+
+	def test_interrupted_shared_checkpoint_discards_journal(self) -> None:
+		sector: Database.MyDatabase = self.open(shared=True)
+		sector['kept'] = 1
+		sector['deleted'] = 1
+		sector.save()
+		del sector['deleted']
+		self.crash_checkpoint(sector)
+
+		reopened: Database.MyDatabase = self.open(shared=True)
+		self.assertNotIn('deleted', reopened)
+		reopened['added'] = 1
+		reopened.save()
+		sector.refresh()
+		self.assertEqual(sector['added'], 1)
+		self.assertNotIn('deleted', sector)
+
+	def test_journal_without_generation_replays(self) -> None:
+		with open(self.path, 'wb') as output:
+			output.write(b'{"a": 1}')
+
+		with open(self.journal, 'wb') as output:
+			output.write(Journal.Journal.frame({'op': 'batch', 'ops': [{'op': 'set', 'key': 'b', 'value': 3}]}))
+
+		sector: Database.MyDatabase = self.open()
+		self.assertEqual(sector['a'], 1)
+		self.assertEqual(sector['b'], 3)
+
+
+if __name__ == '__main__':
+	unittest.main()